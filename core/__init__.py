@@ -9,6 +9,8 @@ __author__ = "Wildlife Detector AI Team"
 from .config import ConfigManager, AppConfig
 from .species_detector import SpeciesDetector, DetectionResult, create_detector
 from .batch_processor import BatchProcessor, ProcessingStats
+from .stats import StatsAggregator
+from .job_manager import Job, JobManager
 
 # Legacy support
 try:
@@ -24,5 +26,8 @@ __all__ = [
     "create_detector",
     "BatchProcessor",
     "ProcessingStats",
+    "StatsAggregator",
+    "Job",
+    "JobManager",
     "WildlifeDetector",  # Legacy
 ]
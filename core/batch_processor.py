@@ -8,59 +8,26 @@ import logging
 import time
 import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Callable
-from dataclasses import dataclass, field
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterable, Optional, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import queue
+from dataclasses import replace
 
 from .species_detector import SpeciesDetector, DetectionResult, create_detector
-
-
-@dataclass
-class ProcessingStats:
-    """Statistics for batch processing"""
-    total_images: int = 0
-    processed_images: int = 0
-    successful_detections: int = 0
-    failed_detections: int = 0
-    total_detections: int = 0
-    processing_time: float = 0.0
-    errors: List[Dict[str, str]] = field(default_factory=list)
-    species_counts: Dict[str, int] = field(default_factory=dict)
-    
-    @property
-    def average_time_per_image(self) -> float:
-        """Calculate average processing time per image"""
-        if self.processed_images == 0:
-            return 0.0
-        return self.processing_time / self.processed_images
-    
-    @property
-    def success_rate(self) -> float:
-        """Calculate success rate"""
-        if self.processed_images == 0:
-            return 0.0
-        return (self.successful_detections / self.processed_images) * 100
-    
-    def update_species_count(self, species_name: str):
-        """Update species count"""
-        if species_name:
-            self.species_counts[species_name] = self.species_counts.get(species_name, 0) + 1
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary"""
-        return {
-            'total_images': self.total_images,
-            'processed_images': self.processed_images,
-            'successful_detections': self.successful_detections,
-            'failed_detections': self.failed_detections,
-            'total_detections': self.total_detections,
-            'processing_time': self.processing_time,
-            'average_time_per_image': self.average_time_per_image,
-            'success_rate': self.success_rate,
-            'errors': self.errors,
-            'species_counts': self.species_counts
-        }
+from .memory_governor import MemoryGovernor
+from .concurrency import AdaptiveConcurrencyController, ConcurrencyStore
+from .stats import ProcessingStats, StatsAggregator
+from .eta import ETA, ETAEstimator
+from .progress import ProgressDispatcher, ProgressEvent
+from .hedging import Attempt, CancelToken, HedgedItem, HedgePolicy
+from .prefetch import Lookahead, Prefetcher
+from .scheduling import order_paths
+from .manifest import FileManifest
+from .distributed import LeaseHeartbeat, WorkQueue
+from .timing import StageTimer, TimingHooks, TimingHook
+from .warm_detector import shared_detector_cache
+from .retry import (RetryPolicy, QuarantineStore, classify_error, QUARANTINE_ERRORS,
+                    ERROR_QUARANTINED, ERROR_REJECTED, ERROR_TIMEOUT, ERROR_TOO_LARGE, ERROR_UNKNOWN)
 
 
 class BatchProcessor:
@@ -84,15 +51,61 @@ class BatchProcessor:
         self.batch_size = config.get('batch_size', 10)
         self.use_gpu = config.get('use_gpu', False)
         self.confidence_threshold = config.get('confidence_threshold', 0.5)
+        self.cancel_timeout = config.get('cancel_timeout', 1.0)
+        self.memory_limit_gb = config.get('memory_limit_gb', 0.0)
+        self.adaptive_workers = config.get('adaptive_workers', False)
+        cache_dir = Path(config.get('cache_directory', 'cache'))
+        self.cache_dir = cache_dir
+        self.concurrency_store = ConcurrencyStore(cache_dir / 'concurrency.json')
+        self.prefetch_depth = config.get('prefetch_depth', 0)
+        self.prefetch_workers = config.get('prefetch_workers', 2)
+        self.prefetch_buffer_mb = config.get('prefetch_buffer_mb', 256.0)
+        self.scheduling_policy = config.get('scheduling_policy', 'path')
+        self.progress_max_rate = config.get('progress_max_rate', 10.0)
+        self.hedging = config.get('hedging', False)
+        self.model_version = config.get('model_version', '5.0')
+        self.manifest_hash = config.get('manifest_hash', False)
+        self.lease_timeout = config.get('lease_timeout', 120.0)
+        self.heartbeat_interval = config.get('heartbeat_interval', 15.0)
+        self.sniff_files = config.get('sniff_files', False)
+        self.sniff_min_dimension = config.get('sniff_min_dimension', 0)
+        self.dedup_images = config.get('dedup_images', False)
+        
+        # Retries and quarantine of images that keep failing
+        self.retry_policy = RetryPolicy(
+            max_retries=config.get('max_retries', 2),
+            base_delay=config.get('retry_base_delay', 0.5),
+            max_delay=config.get('retry_max_delay', 30.0)
+        )
+        self.quarantine_timeout = config.get('quarantine_timeout', 30)
+        self.quarantine = None
+        if config.get('quarantine_enabled', True):
+            self.quarantine = QuarantineStore(cache_dir / 'quarantine.json')
         
         # State
         self.detector = None
+        self.memory_governor = None
+        self.concurrency_controller = None
+        self.prefetcher = None
+        self.timing_hooks = TimingHooks()
+        self.hedge_policy = None
+        self._hedges_started = 0
+        self._hedges_won = 0
         self.is_cancelled = False
+        self._cancel_event = threading.Event()
+        # Set while process_distributed() runs: one cancellation covers all leases
+        self._keep_cancel = False
         self.progress_queue = queue.Queue()
-        self.stats = ProcessingStats()
         
-        # Thread safety
-        self.stats_lock = threading.Lock()
+        # Statistics (per-worker shards, merged on read)
+        self._aggregator = StatsAggregator()
+        self.eta_estimator = ETAEstimator()
+        self._total_images = 0
+        self._total_source = None
+        self._completed_images = 0
+        self._status_counts = {'success': 0, 'failed': 0, 'skipped': 0}
+        self._run_start = time.monotonic()
+        self._progress = ProgressDispatcher()
         
     def initialize(self, progress_callback: Optional[Callable] = None) -> bool:
         """
@@ -108,14 +121,15 @@ class BatchProcessor:
             if progress_callback:
                 progress_callback("検出器を初期化しています...")
                 
-            # Create detector with configuration
-            detector_config = {
-                'country_code': self.config.get('country_code', 'JPN'),
-                'timeout': self.config.get('timeout', 300),
-                'batch_size': self.batch_size
-            }
-            
-            self.detector = create_detector(config=detector_config)
+            # Create detector with configuration (or reuse the warm one)
+            mode, detector_config = self.detector_settings(self.config)
+            if self.config.get('reuse_detector', False):
+                cache = shared_detector_cache()
+                if cache.matches(mode, detector_config):
+                    self.logger.info("Reusing warm detector")
+                self.detector = cache.get(mode, detector_config)
+            else:
+                self.detector = create_detector(mode=mode, config=detector_config)
             
             if progress_callback:
                 progress_callback("検出器の初期化が完了しました")
@@ -129,37 +143,161 @@ class BatchProcessor:
                 progress_callback(f"初期化エラー: {str(e)}")
             return False
     
+    @staticmethod
+    def detector_settings(config: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Detector mode and configuration derived from a processor configuration
+        
+        Returns:
+            (mode, detector_config) as passed to create_detector
+        """
+        return config.get('detection_mode'), {
+            'country_code': config.get('country_code', 'JPN'),
+            'timeout': config.get('timeout', 300),
+            'batch_size': config.get('batch_size', 10),
+            'mock_delay': config.get('mock_delay', 0.1),
+            'model_version': config.get('model_version', '5.0')
+        }
+    
     def process_batch(self, 
                      image_paths: List[str], 
-                     progress_callback: Optional[Callable] = None) -> List[DetectionResult]:
+                     progress_callback: Optional[Callable] = None,
+                     event_callback: Optional[Callable[[ProgressEvent], None]] = None) -> List[DetectionResult]:
         """
         Process batch of images
         
+        Both callbacks are rate limited to progress_max_rate updates per
+        second; intermediate updates are coalesced and the final one is
+        always delivered. With dedup_images, byte-identical files are
+        inferred once and the result is copied to the other paths
+        (metadata['duplicate_of']).
+        
         Args:
             image_paths: List of image file paths
             progress_callback: Optional callback(current, total, status, filename)
+            event_callback: Optional callback receiving ProgressEvent objects
+                with throughput, ETA and counts by status
             
         Returns:
             List of DetectionResult objects
         """
         if not self.detector:
             raise RuntimeError("Detector not initialized. Call initialize() first.")
+        
+        sniffer = self._create_sniffer()
+        if sniffer:
+            image_paths = sniffer.check(image_paths)
+        duplicates = self._find_duplicates(image_paths) if self.dedup_images else None
+        if duplicates:
+            image_paths = duplicates.unique_paths
+        image_paths = order_paths(image_paths, self.scheduling_policy)
+        results = self._run_batch(image_paths, len(image_paths), None, progress_callback, event_callback,
+                                  sniffer)
+        if duplicates and duplicates.groups:
+            results.extend(self._fan_out_duplicates(results, duplicates))
+        if sniffer:
+            results.extend(self._rejected_results(sniffer))
+        return results
+    
+    def process_stream(self,
+                       image_paths: Iterable[str],
+                       total_estimate: Optional[Callable[[], int]] = None,
+                       progress_callback: Optional[Callable] = None,
+                       event_callback: Optional[Callable[[ProgressEvent], None]] = None) -> List[DetectionResult]:
+        """
+        Process images while they are still being discovered
+        
+        Paths are consumed lazily (e.g. from a DiscoveryFeed), so inference
+        starts on the first image found instead of after the whole listing.
+        Images run in arrival order; scheduling_policy and dedup_images
+        (which need the whole list) are not applied.
+        
+        Args:
+            image_paths: Iterable of image paths (may block while discovery continues)
+            total_estimate: Optional callable returning the current estimate of
+                the total, shown in progress events until the stream ends
+            progress_callback: Optional callback(current, total, status, filename)
+            event_callback: Optional callback receiving ProgressEvent objects
             
+        Returns:
+            List of DetectionResult objects
+        """
+        if not self.detector:
+            raise RuntimeError("Detector not initialized. Call initialize() first.")
+        
+        sniffer = self._create_sniffer()
+        if sniffer:
+            image_paths = sniffer.filter(image_paths)
+        consumed = 0
+        exhausted = False
+        
+        def counted():
+            nonlocal consumed, exhausted
+            for path in image_paths:
+                consumed += 1
+                yield path
+            exhausted = True
+        
+        def current_total() -> Tuple[int, bool]:
+            if exhausted:
+                return consumed, False
+            estimate = total_estimate() if total_estimate else 0
+            if sniffer:
+                estimate -= sniffer.rejected_count
+            return max(consumed, estimate), True
+        
+        try:
+            results = self._run_batch(counted(), 0, current_total, progress_callback, event_callback,
+                                      sniffer)
+        finally:
+            self._total_source = None
+            self._total_images = consumed
+            self._aggregator.update(total_images=consumed)
+        if sniffer:
+            results.extend(self._rejected_results(sniffer))
+        return results
+    
+    def _run_batch(self,
+                   image_paths: Iterable[str],
+                   total: int,
+                   total_source: Optional[Callable[[], Tuple[int, bool]]],
+                   progress_callback: Optional[Callable],
+                   event_callback: Optional[Callable[[ProgressEvent], None]],
+                   sniffer=None) -> List[DetectionResult]:
+        """Run the pipeline over image paths (a list, or a stream with a live total)"""
         # Reset state
-        self.is_cancelled = False
-        self.stats = ProcessingStats(total_images=len(image_paths))
+        if not self._keep_cancel:
+            self.is_cancelled = False
+            self._cancel_event.clear()
+        self.detector.reset_cancel()
+        self._aggregator = StatsAggregator(total_images=total)
+        self._total_images = total
+        self._total_source = total_source
+        self._completed_images = 0
+        self._status_counts = {'success': 0, 'failed': 0, 'skipped': 0}
+        self._run_start = time.monotonic()
+        self._progress = ProgressDispatcher(progress_callback, event_callback, self.progress_max_rate)
+        self.hedge_policy = self._create_hedge_policy()
+        self._hedges_started = 0
+        self._hedges_won = 0
+        self.eta_estimator.start()
+        self.memory_governor = MemoryGovernor(self.memory_limit_gb)
+        self.concurrency_controller = self._create_concurrency_controller()
+        if self.prefetch_depth > 0:
+            self.prefetcher = Prefetcher(self.prefetch_depth, self.prefetch_workers,
+                                         self.prefetch_buffer_mb)
         
         # Start processing
         start_time = time.time()
         results = []
         
         try:
-            if self.max_workers == 1:
+            if self.max_workers == 1 and not self.concurrency_controller:
                 # Sequential processing
-                results = self._process_sequential(image_paths, progress_callback)
+                results = self._process_sequential(image_paths)
             else:
                 # Parallel processing
-                results = self._process_parallel(image_paths, progress_callback)
+                results = self._process_parallel(image_paths)
                 
         except Exception as e:
             self.logger.error(f"Batch processing error: {e}")
@@ -167,113 +305,556 @@ class BatchProcessor:
             
         finally:
             # Update total processing time
-            self.stats.processing_time = time.time() - start_time
+            self._aggregator.update(processing_time=time.time() - start_time,
+                                    cancelled=self.is_cancelled)
+            self._record_memory_stats()
+            self._record_concurrency()
+            self._aggregator.update(hedges_started=self._hedges_started,
+                                    hedges_won=self._hedges_won)
+            if sniffer:
+                self._record_rejections(sniffer)
+            if self.quarantine is not None:
+                self.quarantine.flush()
+            if self.prefetcher:
+                self.prefetcher.close()
+                self.prefetcher = None
             
         return results
     
-    def _process_sequential(self, 
-                          image_paths: List[str], 
-                          progress_callback: Optional[Callable]) -> List[DetectionResult]:
+    def result_fingerprint(self) -> str:
+        """Identify the model and settings that determine a result (for manifests)"""
+        mode = self.detector.mode.value if self.detector else self.config.get('detection_mode') or 'speciesnet'
+        # The confidence threshold is not part of it: raw detections are kept
+        return f"{mode}:{self.model_version}:{self.config.get('country_code', 'JPN')}:raw"
+    
+    def process_incremental(self, 
+                            image_paths: List[str], 
+                            root: Optional[str] = None,
+                            progress_callback: Optional[Callable] = None,
+                            event_callback: Optional[Callable[[ProgressEvent], None]] = None) -> List[DetectionResult]:
+        """
+        Process only new or changed images, reusing earlier results
+        
+        A manifest per input root (cache/manifests) remembers the size, mtime
+        and result of every image. Unchanged images with a result from the
+        same model version are merged in without inference; progress covers
+        the images that are actually processed.
+        
+        Args:
+            image_paths: List of image file paths
+            root: Input folder (default: common parent of the images)
+            progress_callback: Optional callback(current, total, status, filename)
+            event_callback: Optional callback receiving ProgressEvent objects
+            
+        Returns:
+            List of DetectionResult objects in input order
+        """
+        if not self.detector:
+            raise RuntimeError("Detector not initialized. Call initialize() first.")
+        if not image_paths:
+            return self.process_batch([], progress_callback, event_callback)
+        
+        root = root or os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in image_paths])
+        manifest = FileManifest.for_root(self.cache_dir, root, self.result_fingerprint(),
+                                         self.manifest_hash, self.config.get('hash_workers', 4))
+        try:
+            changed, reused = manifest.partition(image_paths)
+            new_results = self.process_batch(changed, progress_callback, event_callback)
+            manifest.record(new_results)
+        finally:
+            manifest.close()
+        
+        # Reused results follow the current threshold; count them like
+        # processed ones, so totals cover the whole root
+        reused_stats = ProcessingStats()
+        for path, result in reused.items():
+            reused[path] = result = result.with_threshold(self.confidence_threshold)
+            reused_stats.record_result(result)
+        self._aggregator.add_shard(reused_stats)
+        self._aggregator.update(total_images=len(image_paths))
+        
+        by_path = {r.image_path: r for r in new_results}
+        by_path.update(reused)
+        return [by_path[p] for p in image_paths if p in by_path]
+    
+    def process_distributed(self, 
+                            queue_dir: str, 
+                            node_id: Optional[str] = None,
+                            progress_callback: Optional[Callable] = None,
+                            event_callback: Optional[Callable[[ProgressEvent], None]] = None,
+                            poll_interval: float = 2.0) -> List[DetectionResult]:
+        """
+        Work on a shared-directory queue until every lease is done
+        
+        Claims leases created by WorkQueue.create() (possibly on another
+        machine), heartbeats them while processing, writes a result shard
+        per lease and reclaims leases of nodes that stopped heartbeating.
+        Use WorkQueue.merge() afterwards for the combined results.
+        
+        Args:
+            queue_dir: Shared queue directory
+            node_id: Name of this node (default: host and process id)
+            progress_callback: Optional callback(current, total, status, filename) per lease
+            event_callback: Optional callback receiving ProgressEvent objects per lease
+            poll_interval: Wait between checks while other nodes hold the remaining leases
+            
+        Returns:
+            Results processed by this node
+        """
+        if not self.detector:
+            raise RuntimeError("Detector not initialized. Call initialize() first.")
+        
+        work_queue = WorkQueue(queue_dir, node_id, self.lease_timeout)
+        node_results: List[DetectionResult] = []
+        node_stats: List[ProcessingStats] = []
+        self.is_cancelled = False
+        self._cancel_event.clear()
+        self._keep_cancel = True
+        
+        try:
+            while not self._cancel_event.is_set():
+                work_queue.reclaim_expired()
+                lease = work_queue.claim()
+                if lease is None:
+                    if work_queue.finished:
+                        break
+                    # Remaining leases are held by other nodes; wait in case one dies
+                    self._cancel_event.wait(poll_interval)
+                    continue
+                if self.is_cancelled:
+                    # Cancelled while claiming: hand the lease back untouched
+                    work_queue.release(lease)
+                    break
+                
+                self.logger.info(f"{work_queue.node_id}: processing {lease.name} "
+                                 f"({len(lease.image_paths)} images)")
+                with LeaseHeartbeat(work_queue, lease, self.heartbeat_interval, on_lost=self.detector.cancel):
+                    results = self.process_batch(lease.image_paths, progress_callback, event_callback)
+                
+                if lease.lost:
+                    # Another node owns it now; our partial work is discarded
+                    continue
+                if self.is_cancelled:
+                    work_queue.release(lease)
+                    break
+                
+                stats = self.get_statistics()
+                work_queue.complete(lease, results, stats)
+                node_results.extend(results)
+                node_stats.append(stats)
+        finally:
+            self._keep_cancel = False
+        
+        # Statistics of this node across all of its leases; each lease's
+        # snapshot already carries its total_images
+        self._aggregator = StatsAggregator()
+        for stats in node_stats:
+            self._aggregator.add_shard(stats)
+        self._aggregator.update(processing_time=sum(s.processing_time for s in node_stats),
+                                cancelled=self.is_cancelled)
+        return node_results
+    
+    def _process_sequential(self, image_paths: Iterable[str]) -> List[DetectionResult]:
         """Process images sequentially"""
         results = []
+        pending = Lookahead(image_paths)
         
-        for i, image_path in enumerate(image_paths):
-            if self.is_cancelled:
+        while not self.is_cancelled:
+            image_path = pending.next()
+            if image_path is None:
                 break
+            
+            # Only one image is in flight here; sampling keeps peak usage
+            # and throttle events in the statistics
+            self.memory_governor.should_pause(0)
+            if self.prefetcher:
+                self.prefetcher.schedule(self._prefetchable([image_path] + pending.peek(self.prefetch_depth)))
                 
             # Update progress
-            if progress_callback:
-                filename = Path(image_path).name
-                progress_callback(i, len(image_paths), "処理中", filename)
+            self._publish_progress(len(results), "処理中", Path(image_path).name)
             
             # Process image
-            result = self._process_single_image(image_path)
-            results.append(result)
+            result = self._run_image(image_path)
             
-            # Update stats
-            self._update_stats(result)
+            # Results interrupted by cancellation are not kept
+            if self.is_cancelled and not result.success:
+                break
+            
+            results.append(result)
+            self._record_completion(result)
             
         # Final progress update
-        if progress_callback:
-            progress_callback(len(results), len(image_paths), "完了", "")
+        self._publish_progress(len(results), self._final_status(), final=True)
             
         return results
     
-    def _process_parallel(self, 
-                        image_paths: List[str], 
-                        progress_callback: Optional[Callable]) -> List[DetectionResult]:
-        """Process images in parallel"""
+    def _process_parallel(self, image_paths: Iterable[str]) -> List[DetectionResult]:
+        """
+        Process images in parallel
+        
+        Only max_workers images are in flight at any time so that a
+        cancellation never has to wait for a backlog of queued futures.
+        With hedging, stragglers get a duplicate attempt on an idle worker
+        and only the first attempt of each image to finish is kept.
+        """
         results = []
         processed_count = 0
+        pending = Lookahead(image_paths)
+        future_to_attempt: Dict[Any, Attempt] = {}
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_path = {
-                executor.submit(self._process_single_image, path): path 
-                for path in image_paths
-            }
+        executor = ThreadPoolExecutor(max_workers=self._executor_size())
+        try:
+            self._submit_available(executor, pending, future_to_attempt)
             
-            # Process completed tasks
-            for future in as_completed(future_to_path):
-                if self.is_cancelled:
-                    # Cancel remaining tasks
-                    for f in future_to_path:
-                        f.cancel()
-                    break
-                    
-                path = future_to_path[future]
+            while future_to_attempt and not self.is_cancelled:
+                done, _ = wait(future_to_attempt, timeout=0.1, return_when=FIRST_COMPLETED)
                 
-                try:
-                    result = future.result()
-                    results.append(result)
-                    self._update_stats(result)
+                for future in done:
+                    attempt = future_to_attempt.pop(future)
+                    path = attempt.item.path
+                    if not attempt.item.claim(attempt, self._succeeded(future)):
+                        # The other attempt of a hedged image already won,
+                        # or this one failed while the other still runs
+                        continue
+                    result = self._collect_result(future, path)
+                    if self.is_cancelled and not result.success:
+                        continue
                     
-                except Exception as e:
-                    self.logger.error(f"Error processing {path}: {e}")
-                    # Create error result
-                    result = DetectionResult(
-                        image_path=path,
-                        detections=[],
-                        mode=self.detector.mode,
-                        processing_time=0.0,
-                        success=False,
-                        error_message=str(e)
-                    )
                     results.append(result)
-                    self._update_stats(result)
+                    self._record_completion(result)
+                    if self.concurrency_controller:
+                        self.concurrency_controller.record_completion()
+                    if self.hedge_policy:
+                        self.hedge_policy.record(result.processing_time)
+                        if attempt.hedge:
+                            self._hedges_won += 1
+                    
+                    # Update progress
+                    processed_count += 1
+                    self._publish_progress(processed_count, "処理中", Path(path).name)
                 
-                # Update progress
-                processed_count += 1
-                if progress_callback:
-                    filename = Path(path).name
-                    progress_callback(processed_count, len(image_paths), "処理中", filename)
+                # Deliver a coalesced update even when nothing finished
+                self._progress.poll()
+                if not self.is_cancelled:
+                    self._submit_available(executor, pending, future_to_attempt)
+                    if self.hedge_policy:
+                        self._start_hedges(executor, future_to_attempt)
+            
+            if self.is_cancelled and future_to_attempt:
+                # In-flight detections were killed; give them a bounded
+                # amount of time to return whatever finished.
+                done, _ = wait(future_to_attempt, timeout=self.cancel_timeout)
+                for future in done:
+                    attempt = future_to_attempt.pop(future)
+                    if not attempt.item.claim(attempt, self._succeeded(future)):
+                        continue
+                    result = self._collect_result(future, attempt.item.path)
+                    if result.success:
+                        results.append(result)
+                        self._record_completion(result)
+                if future_to_attempt:
+                    self.logger.warning(
+                        f"{len(future_to_attempt)} detection(s) still running after cancel"
+                    )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Final progress update
-        if progress_callback:
-            progress_callback(len(results), len(image_paths), "完了", "")
+        self._publish_progress(len(results), self._final_status(), final=True)
             
         return results
     
-    def _process_single_image(self, image_path: str) -> DetectionResult:
-        """Process a single image"""
+    def _submit_available(self, executor: ThreadPoolExecutor, pending: Lookahead, future_to_attempt: Dict):
+        """Top up in-flight work to the worker limit unless memory is running low"""
+        limit = self._current_concurrency()
+        while len(future_to_attempt) < limit:
+            if self.memory_governor and self.memory_governor.should_pause(len(future_to_attempt)):
+                break
+            path = pending.next()
+            if path is None:
+                break
+            attempt = HedgedItem(path).add_attempt()
+            future_to_attempt[executor.submit(self._run_image, path, time.monotonic(), attempt)] = attempt
+        
+        # Read the images after the in-flight ones while those are in inference
+        if self.prefetcher:
+            self.prefetcher.schedule(self._prefetchable(pending.peek(self.prefetch_depth)))
+    
+    def _start_hedges(self, executor: ThreadPoolExecutor, future_to_attempt: Dict):
+        """Duplicate straggling attempts onto workers left idle by an empty queue"""
+        limit = self._current_concurrency()
+        now = time.monotonic()
+        for attempt in list(future_to_attempt.values()):
+            if len(future_to_attempt) >= limit:
+                break
+            if not self.hedge_policy.should_hedge(attempt, now):
+                continue
+            
+            hedge = attempt.item.add_attempt(hedge=True)
+            future_to_attempt[executor.submit(self._run_image, hedge.item.path, now, hedge)] = hedge
+            self._hedges_started += 1
+            self.logger.info(
+                f"Hedging {Path(hedge.item.path).name}: running {now - attempt.started:.1f}s "
+                f"(threshold {self.hedge_policy.threshold():.1f}s)"
+            )
+    
+    def _create_hedge_policy(self) -> Optional[HedgePolicy]:
+        """Create the straggler policy if hedging is enabled"""
+        if not self.hedging:
+            return None
+        return HedgePolicy(
+            multiplier=self.config.get('hedge_multiplier', 3.0),
+            min_samples=self.config.get('hedge_min_samples', 20),
+            min_latency=self.config.get('hedge_min_latency', 1.0)
+        )
+    
+    def _create_sniffer(self):
+        """Create the pre-queue file check if sniffing is enabled"""
+        if not self.sniff_files:
+            return None
+        # Imported here: the utils package imports this module
+        from utils.file_sniffer import FileSniffer
+        return FileSniffer(self.config.get('sniff_workers', 4), self.sniff_min_dimension)
+    
+    def _find_duplicates(self, image_paths: List[str]):
+        """Group byte-identical images (digests cached in cache/hashes.sqlite)"""
+        # Imported here: the utils package imports this module
+        from utils.dedup import find_duplicates
+        from utils.file_manager import FileManager
+        
+        file_manager = FileManager(hash_cache=self.cache_dir / 'hashes.sqlite')
+        try:
+            return find_duplicates(image_paths, file_manager, self.config.get('hash_workers', 4))
+        finally:
+            file_manager.close()
+    
+    def _fan_out_duplicates(self, results: List[DetectionResult], duplicates) -> List[DetectionResult]:
+        """Copy each processed result to the duplicates of its image and count them"""
+        by_path = {r.image_path: r for r in results}
+        stats = ProcessingStats()
+        copies = []
+        for group in duplicates.groups:
+            result = by_path.get(group.primary)
+            if result is None:
+                continue  # Cancelled before it ran
+            for path in group.duplicates:
+                copy = replace(result, image_path=path, detections=list(result.detections),
+                               processing_time=0.0,
+                               metadata={**result.metadata, 'duplicate_of': group.primary})
+                stats.record_result(copy)
+                stats.duplicate_bytes += group.size
+                copies.append(copy)
+        
+        self._aggregator.add_shard(stats)
+        self._total_images += duplicates.duplicate_files
+        self._aggregator.update(total_images=self._total_images)
+        self.logger.info(f"Shared results with {len(copies)} duplicate image(s), "
+                         f"{stats.duplicate_bytes / (1024 * 1024):.1f}MB not processed")
+        return copies
+    
+    def _record_rejections(self, sniffer):
+        """Record files rejected before queueing, by reason"""
+        self._aggregator.update(rejected_files=sniffer.rejected_count,
+                                rejection_reasons=dict(sniffer.reasons))
+        if sniffer.rejected_count:
+            reasons = ', '.join(f"{reason}: {count}" for reason, count in sorted(sniffer.reasons.items()))
+            self.logger.warning(f"Rejected {sniffer.rejected_count} file(s) before processing ({reasons})")
+    
+    def _rejected_results(self, sniffer) -> List[DetectionResult]:
+        """Results for the files rejected before queueing, counted as skipped"""
+        stats = ProcessingStats()
+        results = []
+        for rejected in sniffer.rejected:
+            result = DetectionResult(
+                image_path=rejected.path,
+                detections=[],
+                mode=self.detector.mode,
+                processing_time=0.0,
+                success=False,
+                error_message=f"Skipped (not a usable image: {rejected.reason})",
+                metadata={'pipeline_stage': 'skipped', 'rejected': rejected.reason},
+                error_type=ERROR_REJECTED
+            )
+            stats.record_result(result)
+            results.append(result)
+        if results:
+            self._aggregator.add_shard(stats)
+            self._total_images += len(results)
+            self._aggregator.update(total_images=self._total_images)
+        return results
+    
+    def _prefetchable(self, paths: List[str]) -> List[str]:
+        """Leave quarantined images out of the read-ahead"""
+        if self.quarantine is None:
+            return paths
+        return [p for p in paths if not self.quarantine.is_quarantined(p)]
+    
+    @staticmethod
+    def _succeeded(future) -> bool:
+        """Whether a finished future returned a successful result"""
+        return future.exception() is None and future.result().success
+    
+    def _collect_result(self, future, path: str) -> DetectionResult:
+        """Get a future's result, converting exceptions into failed results"""
+        try:
+            return future.result()
+        except Exception as e:
+            self.logger.error(f"Error processing {path}: {e}")
+            result = DetectionResult(
+                image_path=path,
+                detections=[],
+                mode=self.detector.mode,
+                processing_time=0.0,
+                success=False,
+                error_message=str(e),
+                error_type=classify_error(e)
+            )
+            self._update_stats(result)
+            return result
+    
+    def _create_concurrency_controller(self) -> Optional[AdaptiveConcurrencyController]:
+        """Create the adaptive controller, seeded from the stored best level"""
+        if not self.adaptive_workers:
+            return None
+        
+        ceiling = self._executor_size()
+        stored = self.concurrency_store.get_best(self.detector.mode.value)
+        initial = min(stored, ceiling) if stored else 1
+        self.logger.info(f"Adaptive concurrency: starting at {initial} (max {ceiling})")
+        
+        return AdaptiveConcurrencyController(
+            max_limit=ceiling,
+            initial=initial,
+            window_seconds=self.config.get('adaptive_window_seconds', 5.0)
+        )
+    
+    def _executor_size(self) -> int:
+        """Number of threads the executor needs"""
+        if self.adaptive_workers:
+            return max(self.max_workers, os.cpu_count() or 1)
+        return self.max_workers
+    
+    def _record_concurrency(self):
+        """Report the concurrency level and persist the adaptive result"""
+        controller = self.concurrency_controller
+        self._aggregator.update(
+            adaptive_concurrency=controller is not None,
+            concurrency_level=controller.best_limit if controller else self.max_workers
+        )
+        
+        if controller and controller.history and not self.is_cancelled:
+            self.concurrency_store.save_best(
+                self.detector.mode.value, controller.best_limit, controller.best_throughput
+            )
+    
+    def _record_memory_stats(self):
+        """Copy memory governor counters into the statistics"""
+        governor = self.memory_governor
+        if not governor or not governor.enabled:
+            return
+        governor.finish()
+        self._aggregator.update(
+            memory_throttle_events=governor.throttle_events,
+            memory_throttled_time=governor.throttled_time,
+            peak_memory_mb=governor.peak_mb
+        )
+    
+    def _record_completion(self, result: DetectionResult):
+        """Feed a finished item to the ETA engine and the status counts"""
+        self._completed_images += 1
+        stage = result.metadata.get('pipeline_stage', 'inference')
+        self.eta_estimator.record(stage)
+        
+        if stage == 'skipped':
+            self._status_counts['skipped'] += 1
+        elif result.success:
+            self._status_counts['success'] += 1
+        else:
+            self._status_counts['failed'] += 1
+    
+    def _publish_progress(self, current: int, status: str, filename: str = "", final: bool = False):
+        """Offer a progress event to the dispatcher"""
+        if not self._progress.active:
+            return
+        
+        estimated = False
+        if self._total_source is not None:
+            self._total_images, estimated = self._total_source()
+        total = self._total_images
+        self._progress.publish(ProgressEvent(
+            current=current,
+            total=total,
+            status=status,
+            filename=filename,
+            elapsed=time.monotonic() - self._run_start,
+            throughput=self.eta_estimator.throughput(),
+            eta=self.get_eta(total - current),
+            status_counts=dict(self._status_counts),
+            final=final,
+            total_estimated=estimated
+        ))
+    
+    def get_eta(self, remaining: Optional[int] = None) -> ETA:
+        """
+        Estimate the remaining time of the current batch
+        
+        Args:
+            remaining: Items left (defaults to the rest of the current batch)
+            
+        Returns:
+            ETA with a 95% confidence interval
+        """
+        if remaining is None:
+            remaining = self._total_images - self._completed_images
+        return self.eta_estimator.estimate(remaining, concurrency=self._current_concurrency())
+    
+    def _current_concurrency(self) -> int:
+        """Concurrency level currently in use"""
+        if self.concurrency_controller:
+            return self.concurrency_controller.limit
+        return self.max_workers
+    
+    def _final_status(self) -> str:
+        """Status text for the final progress update"""
+        return "キャンセル" if self.is_cancelled else "完了"
+    
+    def _process_single_image(self, image_path: str, image_data=None,
+                              timeout: Optional[float] = None,
+                              timer: Optional[StageTimer] = None,
+                              cancel_token: Optional[CancelToken] = None) -> DetectionResult:
+        """Process a single image, optionally from bytes read by the prefetch stage"""
+        timer = timer or StageTimer()
         try:
             # Check file size
-            file_size_mb = Path(image_path).stat().st_size / (1024 * 1024)
+            file_size = len(image_data) if image_data is not None else Path(image_path).stat().st_size
+            file_size_mb = file_size / (1024 * 1024)
             max_size_mb = self.config.get('max_image_size_mb', 50.0)
             
             if file_size_mb > max_size_mb:
-                raise ValueError(f"Image file too large: {file_size_mb:.1f}MB (max: {max_size_mb}MB)")
+                return DetectionResult(
+                    image_path=image_path,
+                    detections=[],
+                    mode=self.detector.mode,
+                    processing_time=0.0,
+                    success=False,
+                    error_message=f"Image file too large: {file_size_mb:.1f}MB (max: {max_size_mb}MB)",
+                    error_type=ERROR_TOO_LARGE
+                )
             
             # Detect species
-            result = self.detector.detect_single(image_path)
+            result = self.detector.detect_single(image_path, image_data=image_data, timeout=timeout,
+                                                 cancel_token=cancel_token)
+            
+            # Detector stages of this attempt add up across retries
+            for stage, seconds in result.metadata.get('timings', {}).items():
+                timer.add(stage, seconds)
             
-            # Filter by confidence threshold
+            # Filter by confidence threshold, keeping the raw list so the
+            # threshold can be changed later without re-inference
             if result.success and result.detections:
-                filtered_detections = [
-                    det for det in result.detections 
-                    if det.get('confidence', 0) >= self.confidence_threshold
-                ]
-                result.detections = filtered_detections
+                with timer.stage('filter'):
+                    result.raw_detections = result.detections
+                    result.detections = result.detections_above(self.confidence_threshold)
             
             return result
             
@@ -285,42 +866,212 @@ class BatchProcessor:
                 mode=self.detector.mode if self.detector else None,
                 processing_time=0.0,
                 success=False,
-                error_message=str(e)
+                error_message=str(e),
+                error_type=classify_error(e)
             )
     
-    def _update_stats(self, result: DetectionResult):
-        """Update processing statistics"""
-        with self.stats_lock:
-            self.stats.processed_images += 1
+    def _process_with_retry(self, image_path: str, image_data=None,
+                            timer: Optional[StageTimer] = None,
+                            cancel_token: Optional[CancelToken] = None) -> DetectionResult:
+        """
+        Process an image, retrying transient failures with backoff
+        
+        After a timeout the single retry runs with the short
+        quarantine_timeout, so a poison image costs one full timeout at most.
+        Callers quarantine the final result (see _quarantine_failure).
+        """
+        timer = timer or StageTimer()
+        attempt = 1
+        timeout = None
+        total_time = 0.0
+        
+        while True:
+            result = self._process_single_image(image_path, image_data, timeout=timeout, timer=timer,
+                                                cancel_token=cancel_token)
+            total_time += result.processing_time
+            if result.success or self.detector.is_cancelled or (cancel_token and cancel_token.cancelled):
+                break
             
-            if result.success:
-                self.stats.successful_detections += 1
-                self.stats.total_detections += len(result.detections)
-                
-                # Update species counts
-                for detection in result.detections:
-                    species_name = detection.get('common_name', '不明')
-                    self.stats.update_species_count(species_name)
-            else:
-                self.stats.failed_detections += 1
-                if result.error_message:
-                    self.stats.errors.append({
-                        'image': result.image_path,
-                        'error': result.error_message
-                    })
+            error_type = result.error_type or ERROR_UNKNOWN
+            if not self.retry_policy.should_retry(error_type, attempt):
+                break
+            if error_type == ERROR_TIMEOUT:
+                timeout = self.quarantine_timeout
+            
+            delay = self.retry_policy.delay(attempt)
+            self.logger.warning(
+                f"Retrying {Path(image_path).name} in {delay:.1f}s "
+                f"(attempt {attempt} failed: {error_type})"
+            )
+            # Backoff ends early on cancel
+            with timer.stage('backoff'):
+                cancelled = self.detector.wait_cancellable(delay, cancel_token)
+            if cancelled:
+                break
+            attempt += 1
+        
+        result.processing_time = total_time
+        result.metadata['attempts'] = attempt
+        return result
+    
+    def _quarantine_failure(self, image_path: str, result: DetectionResult):
+        """Quarantine an image that still timed out, or is corrupt, so later runs skip it"""
+        if (not result.success and result.error_type in QUARANTINE_ERRORS
+                and self.quarantine is not None and not self.is_cancelled):
+            self.quarantine.add(image_path, result.error_type, result.error_message or '',
+                                result.metadata.get('attempts', 1))
+            result.metadata['quarantined'] = True
+    
+    def _quarantined_result(self, image_path: str) -> DetectionResult:
+        """Result for an image skipped because it is in quarantine"""
+        entry = self.quarantine.get(image_path) or {}
+        return DetectionResult(
+            image_path=image_path,
+            detections=[],
+            mode=self.detector.mode,
+            processing_time=0.0,
+            success=False,
+            error_message=f"Skipped (quarantined: {entry.get('error_type', ERROR_UNKNOWN)})",
+            metadata={'pipeline_stage': 'skipped'},
+            error_type=ERROR_QUARANTINED
+        )
+    
+    def _run_image(self, image_path: str, submitted_at: Optional[float] = None,
+                   attempt: Optional[Attempt] = None) -> DetectionResult:
+        """
+        Process one image and record it in the calling worker's stats shard
+        
+        Args:
+            image_path: Image to process
+            submitted_at: time.monotonic() of submission, for the queue stage
+            attempt: Attempt of a (possibly hedged) image; only the attempt
+                that claims the image first records statistics
+        """
+        start = time.monotonic()
+        cancel_token = None
+        if attempt:
+            attempt.started = start
+            if self.hedge_policy:
+                cancel_token = attempt.token
+        timer = StageTimer()
+        if submitted_at is not None:
+            timer.add('queue', start - submitted_at)
+        
+        prefetcher = self.prefetcher
+        if self.quarantine is not None and self.quarantine.is_quarantined(image_path):
+            if prefetcher:
+                prefetcher.discard(image_path)
+            result = self._quarantined_result(image_path)
+            if attempt is None or attempt.item.claim(attempt, success=False):
+                self._update_stats(result)
+            return result
+        
+        # Time spent waiting for the file is reported apart from compute
+        prefetched = None
+        if prefetcher:
+            with timer.stage('io_wait'):
+                prefetched = prefetcher.take(image_path)
+        
+        try:
+            result = self._process_with_retry(image_path, prefetched.data if prefetched else None, timer,
+                                              cancel_token)
+        finally:
+            if prefetched:
+                prefetched.release()
+        timer.add('detect', result.processing_time)
+        result.metadata['timings'] = timer.timings
+        
+        # Detections killed by a cancel, and losing hedge attempts, are dropped
+        if attempt is not None and not attempt.item.claim(attempt, result.success):
+            return result
+        self._quarantine_failure(image_path, result)
+        if not (self.is_cancelled and not result.success):
+            self._update_stats(result, time.monotonic() - start, timer.timings)
+            if self.timing_hooks:
+                self.timing_hooks.emit(image_path, timer.timings)
+        
+        return result
+    
+    def detect_image(self, image_path: str, cancel_token: Optional[CancelToken] = None) -> DetectionResult:
+        """
+        Process one image with retries, quarantine and threshold filtering
+        
+        Unlike process_batch() this touches no run state or statistics, so
+        schedulers sharing the warm detector (JobManager) can call it from
+        their own threads and keep statistics per job.
+        
+        Args:
+            image_path: Image to process
+            cancel_token: Optional token stopping just this detection
+        
+        Returns:
+            DetectionResult with stage timings in metadata['timings']
+        """
+        if not self.detector:
+            raise RuntimeError("Detector not initialized. Call initialize() first.")
+        if self.quarantine is not None and self.quarantine.is_quarantined(image_path):
+            return self._quarantined_result(image_path)
+        
+        timer = StageTimer()
+        result = self._process_with_retry(image_path, timer=timer, cancel_token=cancel_token)
+        self._quarantine_failure(image_path, result)
+        timer.add('detect', result.processing_time)
+        result.metadata['timings'] = timer.timings
+        return result
+    
+    def add_timing_hook(self, hook: TimingHook):
+        """
+        Register a callback receiving the stage timings of every image
+        
+        Args:
+            hook: Callable(image_path, timings) with timings in seconds per
+                stage (queue, io_wait, stat, metadata, spawn, inference,
+                parse, filter, backoff, detect); called from worker threads
+        """
+        self.timing_hooks.add(hook)
+    
+    def remove_timing_hook(self, hook: TimingHook):
+        """Unregister a timing hook"""
+        self.timing_hooks.remove(hook)
+    
+    def _update_stats(self, result: DetectionResult,
+                      latency: Optional[float] = None,
+                      stage_times: Optional[Dict[str, float]] = None):
+        """Update processing statistics"""
+        self._aggregator.record_result(result, latency, stage_times)
     
     def cancel_processing(self):
-        """Cancel ongoing processing"""
+        """
+        Cancel ongoing processing
+        
+        Queued images are dropped and running detections (including
+        SpeciesNet child processes) are killed. process_batch() returns the
+        partial results within cancel_timeout seconds.
+        """
         self.is_cancelled = True
+        self._cancel_event.set()
+        if self.detector:
+            self.detector.cancel()
         self.logger.info("Batch processing cancelled")
     
     def get_statistics(self) -> ProcessingStats:
-        """Get current processing statistics"""
-        with self.stats_lock:
-            return self.stats
+        """
+        Get current processing statistics
+        
+        Returns:
+            Merged snapshot; safe to read while processing continues
+        """
+        return self._aggregator.snapshot()
+    
+    @property
+    def stats(self) -> ProcessingStats:
+        """Snapshot of the current statistics (see get_statistics)"""
+        return self._aggregator.snapshot()
     
     def cleanup(self):
         """Cleanup resources"""
+        if self.quarantine is not None:
+            self.quarantine.flush()
         self.detector = None
         self.progress_queue = queue.Queue()
         self.logger.info("Batch processor cleaned up")
@@ -329,20 +1080,19 @@ class BatchProcessor:
         """
         Estimate processing time for given number of images
         
+        Uses the online ETA engine once the current or previous batch has
+        produced measurements; before that, falls back to a 2 s/image prior
+        divided by the concurrency level.
+        
         Args:
             num_images: Number of images to process
             
         Returns:
             Estimated time in seconds
         """
-        # Based on average processing time or default estimate
-        avg_time = self.stats.average_time_per_image if self.stats.processed_images > 0 else 2.0
+        eta = self.eta_estimator.estimate(num_images, concurrency=self._current_concurrency())
+        if eta.samples:
+            return eta.seconds
         
-        # Account for parallelization
-        if self.max_workers > 1:
-            estimated_time = (num_images * avg_time) / self.max_workers
-        else:
-            estimated_time = num_images * avg_time
-            
-        # Add some buffer
-        return estimated_time * 1.2
\ No newline at end of file
+        # No measurements yet: prior estimate with some buffer
+        return eta.seconds * 1.2
@@ -0,0 +1,174 @@
+"""
+Adaptive Concurrency Control for Wildlife Detector
+Tunes the number of in-flight images from measured throughput
+"""
+
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class AdaptiveConcurrencyController:
+    """
+    Hill-climbing controller for the worker count
+    
+    The controller measures images/second at the current level over a
+    window. While throughput keeps improving it adds one worker (additive
+    increase); when an increase no longer helps it settles on the best level
+    seen, and when throughput drops below that best it backs off
+    multiplicatively.
+    """
+    
+    def __init__(self,
+                 max_limit: int,
+                 initial: int = 1,
+                 min_limit: int = 1,
+                 window_seconds: float = 5.0,
+                 samples_per_worker: int = 2,
+                 tolerance: float = 0.05,
+                 backoff: float = 0.5):
+        """
+        Initialize controller
+        
+        Args:
+            max_limit: Upper bound on concurrency
+            initial: Starting concurrency
+            min_limit: Lower bound on concurrency
+            window_seconds: Minimum measurement window per level
+            samples_per_worker: Minimum completions per worker in a window
+            tolerance: Relative change treated as noise
+            backoff: Multiplicative decrease factor
+        """
+        self.logger = logging.getLogger(__name__)
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.window_seconds = window_seconds
+        self.samples_per_worker = samples_per_worker
+        self.tolerance = tolerance
+        self.backoff = backoff
+        
+        self.best_limit = self.limit
+        self.best_throughput = 0.0
+        self.settled = False
+        self.history: List[Tuple[int, float]] = []
+        
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+    
+    def record_completion(self, count: int = 1) -> int:
+        """
+        Record finished images and adjust the limit when a window closes
+        
+        Args:
+            count: Number of images completed
+        
+        Returns:
+            Current concurrency limit
+        """
+        with self._lock:
+            self._window_count += count
+            elapsed = time.monotonic() - self._window_start
+            
+            if (elapsed >= self.window_seconds and
+                    self._window_count >= self.limit * self.samples_per_worker):
+                self._evaluate(self._window_count / elapsed)
+                self._window_start = time.monotonic()
+                self._window_count = 0
+            
+            return self.limit
+    
+    def _evaluate(self, throughput: float):
+        """Move the limit based on the throughput of the finished window"""
+        previous = self.limit
+        self.history.append((self.limit, throughput))
+        
+        if throughput > self.best_throughput * (1 + self.tolerance):
+            # Still improving: remember it and probe one level higher
+            self.best_throughput = throughput
+            self.best_limit = self.limit
+            if not self.settled and self.limit < self.max_limit:
+                self.limit += 1
+        elif throughput < self.best_throughput * (1 - self.tolerance):
+            if self.limit > self.best_limit:
+                # The last increase hurt: return to the best level
+                self.limit = self.best_limit
+                self.settled = True
+            else:
+                # Conditions changed under us (contention, thermal, I/O)
+                self.limit = max(self.min_limit, int(self.limit * self.backoff))
+                self.best_limit = self.limit
+                self.best_throughput = throughput
+                self.settled = False
+        else:
+            # Plateau: extra workers no longer pay for themselves
+            if self.limit > self.best_limit:
+                self.limit = self.best_limit
+            self.settled = True
+        
+        if self.limit != previous:
+            self.logger.info(
+                f"Adaptive concurrency: {previous} -> {self.limit} workers "
+                f"({throughput:.2f} images/s, best {self.best_throughput:.2f} at {self.best_limit})"
+            )
+
+
+class ConcurrencyStore:
+    """
+    Persists the best concurrency level per backend and machine
+    """
+    
+    def __init__(self, path: str):
+        """
+        Initialize store
+        
+        Args:
+            path: JSON file used for persistence
+        """
+        self.path = Path(path)
+        self.logger = logging.getLogger(__name__)
+    
+    @staticmethod
+    def machine_key(backend: str) -> str:
+        """Build the lookup key for a backend on this machine"""
+        return f"{backend}|{platform.node()}|{os.cpu_count() or 1}"
+    
+    def _load(self) -> Dict[str, Any]:
+        """Load all stored entries"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable concurrency store {self.path}: {e}")
+            return {}
+    
+    def get_best(self, backend: str) -> Optional[int]:
+        """Get the stored best worker count for a backend, if any"""
+        entry = self._load().get(self.machine_key(backend))
+        return int(entry['best_workers']) if entry else None
+    
+    def save_best(self, backend: str, workers: int, throughput: float):
+        """Store the best worker count for a backend"""
+        data = self._load()
+        data[self.machine_key(backend)] = {
+            'best_workers': workers,
+            'throughput': throughput,
+            'updated': datetime.now().isoformat(timespec='seconds')
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Failed to save concurrency store: {e}")
@@ -5,7 +5,17 @@ import yaml
 import os
 from pathlib import Path
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+
+# config.yaml keys whose field name is not the key itself
+_KEY_ALIASES = {
+    'app.name': 'app_name',
+    'app.version': 'app_version',
+    'logging.enable': 'enable_logging',
+    'logging.level': 'log_level',
+    'cache.enable': 'enable_cache',
+    'cache.size_mb': 'cache_size_mb',
+}
 
 
 @dataclass
@@ -32,6 +42,35 @@ class AppConfig:
     memory_limit_gb: float = 4.0
     max_image_size_mb: float = 50.0
     resize_large_images: bool = True
+    adaptive_workers: bool = False
+    prefetch_depth: int = 8
+    prefetch_workers: int = 2
+    scheduling_policy: str = "path"
+    max_retries: int = 2
+    quarantine_timeout: int = 30
+    progress_max_rate: float = 10.0
+    hedging: bool = False
+    hedge_multiplier: float = 3.0
+    watch_settle_seconds: float = 2.0
+    watch_batch_size: int = 32
+    watch_batch_wait: float = 10.0
+    watch_poll_interval: float = 2.0
+    incremental: bool = False
+    manifest_hash: bool = False
+    lease_size: int = 100
+    lease_timeout: float = 120.0
+    heartbeat_interval: float = 15.0
+    warm_detector: bool = True
+    discovery_workers: int = 4
+    sniff_files: bool = True
+    sniff_min_dimension: int = 0
+    sniff_unknown_extensions: bool = True
+    dedup_images: bool = False
+    hash_workers: int = 4
+    service_host: str = "127.0.0.1"
+    service_port: int = 8765
+    service_max_batch_size: int = 16
+    service_max_delay: float = 0.02
     
     # Output settings
     default_output_directory: str = "output"
@@ -40,6 +79,7 @@ class AppConfig:
     generate_html_report: bool = True
     include_thumbnails: bool = True
     auto_save_results: bool = True
+    organize_mode: str = "move"
     
     # GUI settings
     window_title: str = "Wildlife Detector - 野生生物検出アプリケーション"
@@ -63,21 +103,28 @@ class AppConfig:
     
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]) -> 'AppConfig':
-        """Create AppConfig from dictionary"""
+        """
+        Create AppConfig from dictionary
+        
+        Accepts the sectioned layout of config.yaml (processing.max_workers
+        sets max_workers) as well as flat field names.
+        """
         app_config = cls()
+        names = {f.name for f in fields(cls)}
         
         # Flatten nested dictionary
         flat_dict = cls._flatten_dict(config_dict)
         
-        # Update attributes
+        # Update attributes: section.key maps to the field named key
         for key, value in flat_dict.items():
-            if hasattr(app_config, key):
-                setattr(app_config, key, value)
+            name = _KEY_ALIASES.get(key, key.rsplit('.', 1)[-1])
+            if name in names:
+                setattr(app_config, name, value)
                 
         return app_config
     
     @staticmethod
-    def _flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
+    def _flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '.') -> Dict[str, Any]:
         """Flatten nested dictionary"""
         items = []
         for k, v in d.items():
@@ -88,6 +135,39 @@ class AppConfig:
                 items.append((new_key, v))
         return dict(items)
     
+    def processor_config(self) -> Dict[str, Any]:
+        """BatchProcessor configuration for these settings (shared by the CLI and GUI)"""
+        return {
+            'max_workers': self.max_workers,
+            'batch_size': self.batch_size,
+            'use_gpu': self.use_gpu,
+            'confidence_threshold': self.confidence_threshold,
+            'country_code': self.country_code,
+            'timeout': self.timeout,
+            'max_image_size_mb': self.max_image_size_mb,
+            'memory_limit_gb': self.memory_limit_gb,
+            'adaptive_workers': self.adaptive_workers,
+            'prefetch_depth': self.prefetch_depth,
+            'prefetch_workers': self.prefetch_workers,
+            'scheduling_policy': self.scheduling_policy,
+            'max_retries': self.max_retries,
+            'quarantine_timeout': self.quarantine_timeout,
+            'progress_max_rate': self.progress_max_rate,
+            'hedging': self.hedging,
+            'hedge_multiplier': self.hedge_multiplier,
+            'model_version': self.model_version,
+            'manifest_hash': self.manifest_hash,
+            'lease_timeout': self.lease_timeout,
+            'heartbeat_interval': self.heartbeat_interval,
+            'sniff_files': self.sniff_files,
+            'sniff_min_dimension': self.sniff_min_dimension,
+            'sniff_workers': self.discovery_workers,
+            'dedup_images': self.dedup_images,
+            'hash_workers': self.hash_workers,
+            'cache_directory': self.cache_directory,
+            'reuse_detector': self.warm_detector
+        }
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
         return {
@@ -111,7 +191,36 @@ class AppConfig:
                 'use_gpu': self.use_gpu,
                 'memory_limit_gb': self.memory_limit_gb,
                 'max_image_size_mb': self.max_image_size_mb,
-                'resize_large_images': self.resize_large_images
+                'resize_large_images': self.resize_large_images,
+                'adaptive_workers': self.adaptive_workers,
+                'prefetch_depth': self.prefetch_depth,
+                'prefetch_workers': self.prefetch_workers,
+                'scheduling_policy': self.scheduling_policy,
+                'max_retries': self.max_retries,
+                'quarantine_timeout': self.quarantine_timeout,
+                'progress_max_rate': self.progress_max_rate,
+                'hedging': self.hedging,
+                'hedge_multiplier': self.hedge_multiplier,
+                'watch_settle_seconds': self.watch_settle_seconds,
+                'watch_batch_size': self.watch_batch_size,
+                'watch_batch_wait': self.watch_batch_wait,
+                'watch_poll_interval': self.watch_poll_interval,
+                'incremental': self.incremental,
+                'manifest_hash': self.manifest_hash,
+                'lease_size': self.lease_size,
+                'lease_timeout': self.lease_timeout,
+                'heartbeat_interval': self.heartbeat_interval,
+                'warm_detector': self.warm_detector,
+                'discovery_workers': self.discovery_workers,
+                'sniff_files': self.sniff_files,
+                'sniff_min_dimension': self.sniff_min_dimension,
+                'sniff_unknown_extensions': self.sniff_unknown_extensions,
+                'dedup_images': self.dedup_images,
+                'hash_workers': self.hash_workers,
+                'service_host': self.service_host,
+                'service_port': self.service_port,
+                'service_max_batch_size': self.service_max_batch_size,
+                'service_max_delay': self.service_max_delay
             },
             'output': {
                 'default_output_directory': self.default_output_directory,
@@ -119,7 +228,8 @@ class AppConfig:
                 'csv_encoding': self.csv_encoding,
                 'generate_html_report': self.generate_html_report,
                 'include_thumbnails': self.include_thumbnails,
-                'auto_save_results': self.auto_save_results
+                'auto_save_results': self.auto_save_results,
+                'organize_mode': self.organize_mode
             },
             'gui': {
                 'window_title': self.window_title,
@@ -0,0 +1,123 @@
+"""
+Columnar Detection Table for Wildlife Detector
+Re-applies confidence thresholds to stored raw detections with numpy
+"""
+
+from dataclasses import replace
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .species_detector import DetectionResult
+
+
+class DetectionTable:
+    """
+    Raw detections of many results as numpy columns
+    
+    Built once per result set; every threshold query afterwards is a
+    vectorized mask over the columns, so re-thresholding a million
+    detections takes milliseconds instead of a re-run.
+    """
+    
+    def __init__(self, results: Iterable[DetectionResult]):
+        """
+        Build table
+        
+        Args:
+            results: Detection results (raw detections are used when kept)
+        """
+        self.results: List[DetectionResult] = list(results)
+        self.detections: List[Dict[str, Any]] = []
+        self.species_names: List[str] = []
+        
+        image_index = []
+        confidence = []
+        species = []
+        species_codes: Dict[str, int] = {}
+        for i, result in enumerate(self.results):
+            if not result.success:
+                continue
+            source = result.raw_detections if result.raw_detections is not None else result.detections
+            for detection in source:
+                name = detection.get('common_name', '不明')
+                code = species_codes.get(name)
+                if code is None:
+                    code = species_codes[name] = len(self.species_names)
+                    self.species_names.append(name)
+                self.detections.append(detection)
+                image_index.append(i)
+                confidence.append(detection.get('confidence', 0.0))
+                species.append(code)
+        
+        self.image_index = np.asarray(image_index, dtype=np.int64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.species = np.asarray(species, dtype=np.int64)
+        # Detections ordered by image, then confidence (for best-per-image)
+        self._order = np.lexsort((self.confidence, self.image_index))
+    
+    def __len__(self) -> int:
+        return len(self.detections)
+    
+    def mask(self, threshold: float) -> np.ndarray:
+        """Boolean mask of detections at or above the threshold"""
+        return self.confidence >= threshold
+    
+    def counts(self, threshold: float) -> np.ndarray:
+        """Number of detections per result at the threshold"""
+        return np.bincount(self.image_index[self.mask(threshold)], minlength=len(self.results))
+    
+    def best(self, threshold: float) -> np.ndarray:
+        """
+        Index (into self.detections) of each result's most confident detection
+        
+        Returns:
+            Array with one entry per result, -1 where nothing passes
+        """
+        best = np.full(len(self.results), -1, dtype=np.int64)
+        kept = self._order[self.mask(threshold)[self._order]]
+        if kept.size:
+            images = self.image_index[kept]
+            last = np.ones(kept.size, dtype=bool)
+            last[:-1] = images[1:] != images[:-1]
+            best[images[last]] = kept[last]
+        return best
+    
+    def species_counts(self, threshold: float) -> Dict[str, int]:
+        """Detections per species at the threshold (like ProcessingStats.species_counts)"""
+        counts = np.bincount(self.species[self.mask(threshold)], minlength=len(self.species_names))
+        return {name: int(n) for name, n in zip(self.species_names, counts) if n}
+    
+    def species_mean_confidence(self, threshold: float) -> Dict[str, float]:
+        """Mean confidence per species at the threshold"""
+        mask = self.mask(threshold)
+        size = len(self.species_names)
+        counts = np.bincount(self.species[mask], minlength=size)
+        sums = np.bincount(self.species[mask], weights=self.confidence[mask], minlength=size)
+        return {name: float(sums[i] / counts[i]) for i, name in enumerate(self.species_names) if counts[i]}
+    
+    def total_detections(self, threshold: float) -> int:
+        """Number of detections at the threshold"""
+        return int(np.count_nonzero(self.mask(threshold)))
+    
+    def best_detection(self, result_index: int, threshold: float,
+                       best: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """Get the most confident detection of one result (pass best() to reuse it)"""
+        best = best if best is not None else self.best(threshold)
+        index = best[result_index]
+        return self.detections[index] if index >= 0 else None
+    
+    def apply(self, threshold: float) -> List[DetectionResult]:
+        """
+        Materialize results filtered at a threshold (for export and organize)
+        
+        Returns:
+            New DetectionResult copies; the stored raw detections are kept
+        """
+        kept = np.flatnonzero(self.mask(threshold))
+        filtered: List[List[Dict[str, Any]]] = [[] for _ in self.results]
+        for index, image in zip(kept.tolist(), self.image_index[kept].tolist()):
+            filtered[image].append(self.detections[index])
+        
+        return [replace(result, detections=detections) if result.success else result
+                for result, detections in zip(self.results, filtered)]
@@ -0,0 +1,332 @@
+"""
+Shared-Directory Work Queue for Wildlife Detector
+Lets several machines on the same NAS share one batch run through lease files
+"""
+
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .species_detector import DetectionResult
+from .stats import ProcessingStats
+
+# Layout of the queue directory
+JOB_FILE = 'job.json'
+PENDING_DIR = 'pending'
+CLAIMED_DIR = 'claimed'
+DONE_DIR = 'done'
+RESULTS_DIR = 'results'
+NODES_DIR = 'nodes'
+
+_LEASE_SUFFIX = '.json'
+_NODE_SEPARATOR = '@'
+
+
+def default_node_id() -> str:
+    """Node name used in lease file names (host and process id)"""
+    return sanitize_node_id(f"{socket.gethostname()}-{os.getpid()}")
+
+
+def sanitize_node_id(node_id: str) -> str:
+    """Restrict a node id to characters that are safe in file names"""
+    return re.sub(r'[^A-Za-z0-9._-]', '_', node_id) or 'node'
+
+
+def _write_json_atomic(path: Path, data: Any):
+    """Write JSON through a temporary file and rename it into place"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Lease:
+    """A claimed slice of the image list"""
+    
+    def __init__(self, name: str, path: Path, image_paths: List[str]):
+        self.name = name
+        self.path = path
+        self.image_paths = image_paths
+        self.lost = False
+
+
+class WorkQueue:
+    """
+    Work queue stored as files in a directory shared by all nodes
+    
+    The coordinator writes the image list as lease files into pending/.
+    A node claims a lease by renaming it into claimed/ with its node id
+    appended; rename is atomic on one file system (including NFS and SMB
+    servers), so exactly one node wins. The claim file's mtime is the
+    heartbeat: leases whose mtime is older than lease_timeout (compared
+    with the file server's clock, not the node's) are renamed back into
+    pending/ so another node can take them. Finished leases leave a
+    result shard in results/ and move to done/.
+    """
+    
+    def __init__(self, directory: Union[str, Path], node_id: Optional[str] = None,
+                 lease_timeout: float = 120.0):
+        """
+        Initialize queue handle
+        
+        Args:
+            directory: Shared queue directory
+            node_id: Name of this node (default: host and process id)
+            lease_timeout: Seconds without heartbeat after which a lease is reclaimed
+        """
+        self.directory = Path(directory)
+        self.node_id = sanitize_node_id(node_id) if node_id else default_node_id()
+        self.lease_timeout = lease_timeout
+        self.logger = logging.getLogger(__name__)
+    
+    def _dir(self, name: str) -> Path:
+        return self.directory / name
+    
+    @property
+    def exists(self) -> bool:
+        """Whether a job has been created in the directory"""
+        return (self.directory / JOB_FILE).exists()
+    
+    def create(self, image_paths: List[str], lease_size: int = 100,
+               metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Split an image list into lease files (coordinator)
+        
+        Args:
+            image_paths: Images of the run (absolute paths valid on all nodes)
+            lease_size: Images per lease
+            metadata: Extra information stored in job.json
+        
+        Returns:
+            Number of leases
+        
+        Raises:
+            FileExistsError: If the directory already holds a job
+        """
+        if self.exists:
+            raise FileExistsError(f"Work queue already exists: {self.directory}")
+        for name in (PENDING_DIR, CLAIMED_DIR, DONE_DIR, RESULTS_DIR, NODES_DIR):
+            self._dir(name).mkdir(parents=True, exist_ok=True)
+        
+        lease_size = max(1, lease_size)
+        leases = [image_paths[i:i + lease_size] for i in range(0, len(image_paths), lease_size)]
+        for index, paths in enumerate(leases):
+            _write_json_atomic(self._dir(PENDING_DIR) / f"lease-{index:06d}{_LEASE_SUFFIX}",
+                               {'images': paths})
+        
+        # Written last: workers start once job.json appears
+        _write_json_atomic(self.directory / JOB_FILE, {
+            'total_images': len(image_paths),
+            'leases': len(leases),
+            'lease_size': lease_size,
+            'created_by': self.node_id,
+            'created': time.time(),
+            **(metadata or {})
+        })
+        self.logger.info(f"Created work queue with {len(leases)} lease(s) in {self.directory}")
+        return len(leases)
+    
+    def job(self) -> Dict[str, Any]:
+        """Read job.json"""
+        with open(self.directory / JOB_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def shared_now(self) -> float:
+        """
+        Current time according to the file server
+        
+        Touches this node's liveness file and reads back its mtime, so lease
+        expiry is judged on one clock even if node clocks disagree.
+        """
+        alive = self._dir(NODES_DIR) / f"{self.node_id}.alive"
+        alive.touch()
+        return alive.stat().st_mtime
+    
+    def claim(self) -> Optional[Lease]:
+        """
+        Claim the next pending lease
+        
+        Returns:
+            Lease, or None if nothing is pending
+        """
+        try:
+            pending = sorted(os.listdir(self._dir(PENDING_DIR)))
+        except FileNotFoundError:
+            return None
+        
+        for filename in pending:
+            if not filename.endswith(_LEASE_SUFFIX) or filename.startswith('.'):
+                continue
+            name = filename[:-len(_LEASE_SUFFIX)]
+            claimed = self._dir(CLAIMED_DIR) / f"{name}{_NODE_SEPARATOR}{self.node_id}{_LEASE_SUFFIX}"
+            try:
+                # Refresh the mtime first: rename keeps it, and an old mtime
+                # would let another node reclaim the lease right away
+                os.utime(self._dir(PENDING_DIR) / filename)
+                os.rename(self._dir(PENDING_DIR) / filename, claimed)
+            except FileNotFoundError:
+                continue  # Another node was faster
+            with open(claimed, 'r', encoding='utf-8') as f:
+                images = json.load(f)['images']
+            self.logger.debug(f"{self.node_id} claimed {name} ({len(images)} images)")
+            return Lease(name, claimed, images)
+        return None
+    
+    def renew(self, lease: Lease) -> bool:
+        """
+        Heartbeat a lease
+        
+        Returns:
+            False if the lease was reclaimed by another node
+        """
+        try:
+            os.utime(lease.path)
+            return True
+        except FileNotFoundError:
+            lease.lost = True
+            return False
+    
+    def complete(self, lease: Lease, results: List[DetectionResult], stats: ProcessingStats) -> bool:
+        """
+        Store the result shard of a lease and mark it done
+        
+        The shard is written even if the lease was lost meanwhile; a lease
+        processed twice simply overwrites its shard.
+        
+        Returns:
+            True if this node still held the lease
+        """
+        # Keep the lease's image order (workers finish out of order)
+        by_path: Dict[str, List[DetectionResult]] = {}
+        for result in results:
+            by_path.setdefault(result.image_path, []).append(result)
+        ordered = [by_path[p].pop(0) for p in lease.image_paths if by_path.get(p)]
+        
+        _write_json_atomic(self._dir(RESULTS_DIR) / f"{lease.name}{_LEASE_SUFFIX}", {
+            'lease': lease.name,
+            'node': self.node_id,
+            'results': [r.to_dict() for r in ordered],
+            'stats': stats.to_dict()
+        })
+        try:
+            os.rename(lease.path, self._dir(DONE_DIR) / f"{lease.name}{_LEASE_SUFFIX}")
+            return True
+        except FileNotFoundError:
+            lease.lost = True
+            self.logger.warning(f"Lease {lease.name} was reclaimed before completion")
+            return False
+    
+    def release(self, lease: Lease):
+        """Give an unfinished lease back (e.g. on cancellation)"""
+        try:
+            os.rename(lease.path, self._dir(PENDING_DIR) / f"{lease.name}{_LEASE_SUFFIX}")
+        except FileNotFoundError:
+            pass
+    
+    def reclaim_expired(self) -> List[str]:
+        """
+        Return leases of dead nodes to pending/
+        
+        Returns:
+            Names of reclaimed leases
+        """
+        now = self.shared_now()
+        reclaimed = []
+        try:
+            claimed = os.listdir(self._dir(CLAIMED_DIR))
+        except FileNotFoundError:
+            return reclaimed
+        
+        for filename in claimed:
+            path = self._dir(CLAIMED_DIR) / filename
+            try:
+                age = now - path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age < self.lease_timeout:
+                continue
+            name = filename.split(_NODE_SEPARATOR, 1)[0]
+            if (self._dir(DONE_DIR) / f"{name}{_LEASE_SUFFIX}").exists():
+                continue
+            try:
+                os.rename(path, self._dir(PENDING_DIR) / f"{name}{_LEASE_SUFFIX}")
+            except FileNotFoundError:
+                continue  # Reclaimed or completed by someone else
+            reclaimed.append(name)
+            owner = filename[len(name) + 1:-len(_LEASE_SUFFIX)]
+            self.logger.warning(f"Reclaimed lease {name} from {owner} (no heartbeat for {age:.0f}s)")
+        return reclaimed
+    
+    def status(self) -> Dict[str, int]:
+        """Count leases by state"""
+        counts = {}
+        for state in (PENDING_DIR, CLAIMED_DIR, DONE_DIR):
+            try:
+                counts[state] = sum(1 for f in os.listdir(self._dir(state))
+                                    if f.endswith(_LEASE_SUFFIX) and not f.startswith('.'))
+            except FileNotFoundError:
+                counts[state] = 0
+        return counts
+    
+    @property
+    def finished(self) -> bool:
+        """Whether every lease is done"""
+        status = self.status()
+        return status[PENDING_DIR] == 0 and status[CLAIMED_DIR] == 0
+    
+    def merge(self) -> Tuple[List[DetectionResult], ProcessingStats]:
+        """
+        Combine all result shards
+        
+        Returns:
+            (results in image-list order, merged statistics)
+        """
+        results: List[DetectionResult] = []
+        stats = ProcessingStats()
+        shards = sorted(self._dir(RESULTS_DIR).glob(f"lease-*{_LEASE_SUFFIX}"))
+        for shard in shards:
+            with open(shard, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            results.extend(DetectionResult.from_dict(r) for r in data['results'])
+            stats.merge(ProcessingStats.from_dict(data['stats']))
+        
+        if self.exists:
+            stats.total_images = self.job().get('total_images', len(results))
+        return results, stats
+
+
+class LeaseHeartbeat:
+    """Background thread renewing a lease until stopped"""
+    
+    def __init__(self, queue: WorkQueue, lease: Lease, interval: float,
+                 on_lost: Optional[Callable[[], None]] = None):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval
+        self.on_lost = on_lost
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{lease.name}", daemon=True)
+    
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.queue.renew(self.lease):
+                logging.getLogger(__name__).warning(f"Lost lease {self.lease.name}")
+                if self.on_lost:
+                    self.on_lost()
+                return
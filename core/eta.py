@@ -0,0 +1,178 @@
+"""
+Online ETA Estimation for Wildlife Detector
+Exponentially weighted throughput per pipeline stage with a confidence interval
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# z-score for the reported confidence interval (95%)
+Z_95 = 1.96
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as H:MM:SS or M:SS"""
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+@dataclass
+class ETA:
+    """Remaining-time estimate with a 95% confidence interval"""
+    seconds: float
+    low: float
+    high: float
+    samples: int = 0
+    
+    def format(self) -> str:
+        """Human readable form, e.g. '4:10 (3:55-4:30)'"""
+        if self.samples == 0:
+            return f"~{format_duration(self.seconds)}"
+        return f"{format_duration(self.seconds)} ({format_duration(self.low)}-{format_duration(self.high)})"
+
+
+class _StageRate:
+    """EWMA of the time one item of a stage adds to the run"""
+    
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.samples = 0
+    
+    def update(self, gap: float):
+        """Fold in one observed gap (seconds)"""
+        if self.samples == 0:
+            self.mean = gap
+        else:
+            diff = gap - self.mean
+            incr = self.alpha * diff
+            self.mean += incr
+            self.var = (1 - self.alpha) * (self.var + diff * incr)
+        self.samples += 1
+    
+    @property
+    def effective_samples(self) -> float:
+        """Number of samples the EWMA effectively averages over"""
+        return min(self.samples, 2.0 / self.alpha - 1)
+
+
+class ETAEstimator:
+    """
+    Online ETA engine for batch processing
+    
+    Every completion contributes the gap since the previous completion to
+    the rate of its stage ('inference', 'cached', 'prefiltered', ...). Because
+    gaps are measured at the output of the pipeline they already reflect the
+    real concurrency level, and the EWMA follows changes in it. The first
+    warmup completions (pipeline fill, model load) are excluded.
+    """
+    
+    def __init__(self, alpha: float = 0.1, warmup: int = 2):
+        """
+        Initialize estimator
+        
+        Args:
+            alpha: EWMA smoothing factor (higher reacts faster)
+            warmup: Number of initial completions to ignore
+        """
+        self.alpha = alpha
+        self.warmup = warmup
+        self.rates: Dict[str, _StageRate] = {}
+        self.completed = 0
+        self._last_completion: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def start(self, now: Optional[float] = None):
+        """Mark the start of processing"""
+        with self._lock:
+            self.rates = {}
+            self.completed = 0
+            self._last_completion = now if now is not None else time.monotonic()
+    
+    def record(self, stage: str = 'inference', now: Optional[float] = None):
+        """
+        Record one completed item
+        
+        Args:
+            stage: Pipeline stage that produced the item
+            now: Optional timestamp (time.monotonic() by default)
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            if self._last_completion is None:
+                self._last_completion = now
+            gap = now - self._last_completion
+            self._last_completion = now
+            self.completed += 1
+            
+            if self.completed <= self.warmup:
+                return
+            if stage not in self.rates:
+                self.rates[stage] = _StageRate(self.alpha)
+            self.rates[stage].update(gap)
+    
+    def throughput(self) -> float:
+        """Current overall items/second"""
+        with self._lock:
+            total = sum(r.samples for r in self.rates.values())
+            if not total:
+                return 0.0
+            mean_gap = sum(r.mean * r.samples for r in self.rates.values()) / total
+            return 1.0 / mean_gap if mean_gap > 0 else 0.0
+    
+    def estimate(self,
+                 remaining: int,
+                 remaining_by_stage: Optional[Dict[str, int]] = None,
+                 fallback_per_item: float = 2.0,
+                 concurrency: int = 1) -> ETA:
+        """
+        Estimate remaining time
+        
+        Args:
+            remaining: Number of items still to complete
+            remaining_by_stage: Known split of the remaining items per stage;
+                if omitted, the mix observed so far is assumed
+            fallback_per_item: Seconds per item before any data exists
+            concurrency: Concurrency level used with the fallback
+        
+        Returns:
+            ETA with a 95% confidence interval
+        """
+        with self._lock:
+            samples = sum(r.samples for r in self.rates.values())
+            if remaining <= 0:
+                return ETA(0.0, 0.0, 0.0, samples)
+            
+            if not samples:
+                seconds = remaining * fallback_per_item / max(1, concurrency)
+                return ETA(seconds, seconds * 0.5, seconds * 2.0, 0)
+            
+            if remaining_by_stage is None:
+                remaining_by_stage = {
+                    stage: remaining * rate.samples / samples
+                    for stage, rate in self.rates.items()
+                }
+            
+            mean_gap = sum(r.mean * r.samples for r in self.rates.values()) / samples
+            seconds = 0.0
+            variance = 0.0
+            for stage, count in remaining_by_stage.items():
+                rate = self.rates.get(stage)
+                if rate is None:
+                    # Unseen stage: assume the overall average
+                    seconds += count * mean_gap
+                    continue
+                seconds += count * rate.mean
+                # Noise of the items themselves plus uncertainty in the mean
+                variance += count * rate.var + (count ** 2) * rate.var / max(1.0, rate.effective_samples)
+            
+            margin = Z_95 * math.sqrt(variance)
+            return ETA(seconds, max(0.0, seconds - margin), seconds + margin, samples)
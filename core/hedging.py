@@ -0,0 +1,164 @@
+"""
+Hedged Re-execution for Wildlife Detector
+Duplicates straggler images on idle workers; the first attempt to finish wins
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .stats import LatencyHistogram
+
+
+class CancelToken:
+    """
+    Cancellation handle for a single detection attempt
+    
+    Unlike SpeciesDetector.cancel(), which stops everything, a token only
+    stops the attempt it was handed to (e.g. the losing copy of a hedged
+    image). Callbacks registered by the detector kill its child process.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+    
+    def cancel(self):
+        """Cancel the attempt and run the registered callbacks"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+    
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() was called"""
+        return self._event.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for cancellation; True if cancelled"""
+        return self._event.wait(timeout)
+    
+    def add_callback(self, callback: Callable[[], None]):
+        """Run callback on cancel (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def remove_callback(self, callback: Callable[[], None]):
+        """Unregister a callback"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+class HedgedItem:
+    """One image of the batch, possibly running as several attempts"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.attempts: List['Attempt'] = []
+        self.winner: Optional['Attempt'] = None
+        self._lock = threading.Lock()
+    
+    def add_attempt(self, hedge: bool = False) -> 'Attempt':
+        """Create a new attempt for this image"""
+        attempt = Attempt(self, hedge)
+        with self._lock:
+            self.attempts.append(attempt)
+        return attempt
+    
+    @property
+    def hedged(self) -> bool:
+        """Whether a duplicate attempt was started"""
+        return len(self.attempts) > 1
+    
+    def claim(self, attempt: 'Attempt', success: bool = True) -> bool:
+        """
+        Claim the image's result for a finished attempt
+        
+        The first attempt to claim wins and cancels its twins right away;
+        later claims by other attempts return False. A failed attempt steps
+        aside (returns False) while a twin is still running, so the twin
+        can still succeed; it only wins once no twin is left running.
+        """
+        with self._lock:
+            attempt.finished = True
+            if self.winner is not None:
+                return self.winner is attempt
+            if not success and any(not a.finished for a in self.attempts):
+                return False
+            self.winner = attempt
+            losers = [a for a in self.attempts if a is not attempt]
+        for loser in losers:
+            loser.token.cancel()
+        return True
+
+
+class Attempt:
+    """A single execution of an image"""
+    
+    def __init__(self, item: HedgedItem, hedge: bool = False):
+        self.item = item
+        self.hedge = hedge
+        self.token = CancelToken()
+        self.started: Optional[float] = None
+        self.finished = False
+
+
+class HedgePolicy:
+    """
+    Decides when an in-flight image is a straggler worth duplicating
+    
+    An attempt is hedged once it has run longer than multiplier times the
+    observed p95 detection latency (and at least min_latency), after
+    min_samples images have completed.
+    """
+    
+    def __init__(self,
+                 multiplier: float = 3.0,
+                 min_samples: int = 20,
+                 min_latency: float = 1.0,
+                 percentile: float = 95.0):
+        """
+        Initialize policy
+        
+        Args:
+            multiplier: Multiple of the percentile latency that triggers a hedge
+            min_samples: Completed images required before hedging
+            min_latency: Never hedge attempts younger than this (seconds)
+            percentile: Latency percentile used as the baseline
+        """
+        self.logger = logging.getLogger(__name__)
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.min_latency = min_latency
+        self.percentile = percentile
+        self.latency = LatencyHistogram()
+    
+    def record(self, seconds: float):
+        """Record the latency of a completed (winning) attempt"""
+        self.latency.record(seconds)
+    
+    def threshold(self) -> Optional[float]:
+        """Running time after which an attempt is hedged (None: not yet)"""
+        if self.latency.count < self.min_samples:
+            return None
+        return max(self.min_latency, self.multiplier * self.latency.percentile(self.percentile))
+    
+    def should_hedge(self, attempt: Attempt, now: Optional[float] = None) -> bool:
+        """Check whether an in-flight attempt should get a duplicate"""
+        if attempt.hedge or attempt.started is None or attempt.item.hedged or attempt.item.winner:
+            return False
+        threshold = self.threshold()
+        if threshold is None:
+            return False
+        now = now if now is not None else time.monotonic()
+        return now - attempt.started > threshold
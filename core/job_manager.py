@@ -0,0 +1,373 @@
+"""
+Multi-Job Scheduler for Wildlife Detector
+Shares one warm detector between several jobs with weighted fair queuing
+"""
+
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .batch_processor import BatchProcessor
+from .eta import ETAEstimator
+from .hedging import CancelToken
+from .memory_governor import MemoryGovernor
+from .progress import ProgressDispatcher, ProgressEvent
+from .species_detector import DetectionResult
+from .stats import ProcessingStats, StatsAggregator
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+JOB_CANCELLED = 'cancelled'
+JOB_COMPLETED = 'completed'
+
+FINISHED_STATES = (JOB_CANCELLED, JOB_COMPLETED)
+
+
+class Job:
+    """One image list scheduled by the JobManager"""
+    
+    def __init__(self, image_paths: List[str], weight: float = 1.0, name: Optional[str] = None,
+                 progress_callback: Optional[Callable] = None,
+                 event_callback: Optional[Callable[[ProgressEvent], None]] = None,
+                 progress_max_rate: float = 10.0):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.name = name or self.job_id
+        self.weight = max(weight, 1e-6)
+        self.image_paths = list(image_paths)
+        self.state = JOB_QUEUED
+        self.cancel_token = CancelToken()
+        
+        # Scheduling state (guarded by the manager's lock)
+        self.virtual_time = 0.0
+        self.next_index = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.busy_time = 0.0
+        self.status_counts = {'success': 0, 'failed': 0, 'skipped': 0}
+        self.results: List[Optional[DetectionResult]] = [None] * len(self.image_paths)
+        
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._aggregator = StatsAggregator(total_images=len(self.image_paths))
+        self.eta_estimator = ETAEstimator()
+        self._progress = ProgressDispatcher(progress_callback, event_callback, progress_max_rate)
+        self._done = threading.Event()
+    
+    @property
+    def total(self) -> int:
+        return len(self.image_paths)
+    
+    @property
+    def has_pending(self) -> bool:
+        """Whether images are left to dispatch"""
+        return self.next_index < len(self.image_paths)
+    
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+    
+    def expected_cost(self) -> float:
+        """Expected seconds per image (measured mean, 1 s before the first one)"""
+        return self.busy_time / self.completed if self.completed else 1.0
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the job completes or is cancelled; True if it did"""
+        return self._done.wait(timeout)
+    
+    def get_results(self) -> List[DetectionResult]:
+        """Finished results in input order"""
+        return [r for r in self.results if r is not None]
+    
+    def get_statistics(self) -> ProcessingStats:
+        """Statistics of this job alone"""
+        return self._aggregator.snapshot()
+    
+    def progress(self) -> ProgressEvent:
+        """Current progress of the job"""
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        return ProgressEvent(
+            current=self.completed,
+            total=self.total,
+            status=self.state,
+            elapsed=elapsed,
+            throughput=self.eta_estimator.throughput(),
+            eta=self.eta_estimator.estimate(self.total - self.completed),
+            status_counts=dict(self.status_counts),
+            final=self.done
+        )
+    
+    def to_dict(self) -> Dict:
+        """Summary for status displays and the HTTP API"""
+        event = self.progress()
+        return {
+            'job_id': self.job_id,
+            'name': self.name,
+            'state': self.state,
+            'weight': self.weight,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.status_counts['failed'],
+            'skipped': self.status_counts['skipped'],
+            'elapsed': event.elapsed,
+            'throughput': event.throughput,
+            'eta_seconds': event.eta.seconds if event.eta else None
+        }
+
+
+class JobManager:
+    """
+    Runs several jobs on one warm BatchProcessor
+    
+    A fixed pool of worker threads pulls images one at a time. Each pick
+    goes to the runnable job with the smallest virtual time (start-time
+    fair queuing); serving an image advances that job's virtual time by
+    its cost divided by its weight. The cost is charged as the job's mean
+    seconds per image at dispatch and corrected to the measured time on
+    completion, so a job with weight 2 gets twice the detector time of a
+    job with weight 1 even if its images are slower. Jobs joining or
+    resuming start at the current virtual clock, so they cannot claim the
+    time they were absent. While the process tree is near the processor's
+    memory_limit_gb, dispatch waits until running images finish.
+    """
+    
+    def __init__(self, processor: BatchProcessor, max_workers: Optional[int] = None,
+                 progress_max_rate: Optional[float] = None):
+        """
+        Initialize manager and start its workers
+        
+        Args:
+            processor: Initialized BatchProcessor providing the warm detector
+            max_workers: Concurrent detections across all jobs (default: processor's)
+            progress_max_rate: Progress callback rate limit per job
+        """
+        self.logger = logging.getLogger(__name__)
+        self.processor = processor
+        self.max_workers = max(1, max_workers or processor.max_workers)
+        self.progress_max_rate = (progress_max_rate if progress_max_rate is not None
+                                  else processor.progress_max_rate)
+        
+        self.memory_governor = MemoryGovernor(processor.memory_limit_gb)
+        
+        self._jobs: Dict[str, Job] = {}
+        self._condition = threading.Condition()
+        self._virtual_clock = 0.0
+        self._shutdown = False
+        self._workers = [threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                         for i in range(self.max_workers)]
+        for worker in self._workers:
+            worker.start()
+    
+    def submit(self, image_paths: List[str], weight: float = 1.0, name: Optional[str] = None,
+               progress_callback: Optional[Callable] = None,
+               event_callback: Optional[Callable[[ProgressEvent], None]] = None) -> Job:
+        """
+        Add a job
+        
+        Args:
+            image_paths: Images of the job
+            weight: Share of detector time relative to other jobs
+            name: Display name
+            progress_callback: Optional callback(current, total, status, filename)
+            event_callback: Optional callback receiving ProgressEvent objects
+        
+        Returns:
+            The queued Job
+        """
+        job = Job(image_paths, weight, name, progress_callback, event_callback, self.progress_max_rate)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("JobManager has been shut down")
+            job.virtual_time = self._virtual_clock
+            self._jobs[job.job_id] = job
+            event = self._finish(job, JOB_COMPLETED) if not job.image_paths else None
+            self._condition.notify_all()
+        if event is not None:
+            job._progress.publish(event)
+        self.logger.info(f"Job {job.name} queued: {job.total} images, weight {job.weight:g}")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            return self._jobs.get(job_id)
+    
+    def jobs(self) -> List[Job]:
+        """All jobs in submission order"""
+        with self._condition:
+            return list(self._jobs.values())
+    
+    def remove(self, job_id: str) -> bool:
+        """Forget a finished job"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or not job.done:
+                return False
+            del self._jobs[job_id]
+            return True
+    
+    def pause(self, job_id: str) -> bool:
+        """Stop dispatching a job's images (running ones finish)"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return False
+            job.state = JOB_PAUSED
+            return True
+    
+    def resume(self, job_id: str) -> bool:
+        """Continue a paused job"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != JOB_PAUSED:
+                return False
+            job.state = JOB_RUNNING if job.started else JOB_QUEUED
+            job.virtual_time = max(job.virtual_time, self._virtual_clock)
+            self._condition.notify_all()
+            return True
+    
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job's remaining images and stop its running detections"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return False
+            job.state = JOB_CANCELLED
+            job.next_index = job.total
+            event = self._finish(job, JOB_CANCELLED) if not job.in_flight else None
+        job.cancel_token.cancel()
+        if event is not None:
+            job._progress.publish(event)
+        self.logger.info(f"Job {job.name} cancelled")
+        return True
+    
+    def shutdown(self, cancel_jobs: bool = True):
+        """
+        Stop the workers
+        
+        Args:
+            cancel_jobs: Cancel unfinished jobs first (otherwise wait for them)
+        """
+        if cancel_jobs:
+            for job in self.jobs():
+                self.cancel(job.job_id)
+        else:
+            for job in self.jobs():
+                job.wait()
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        if self.processor.quarantine is not None:
+            self.processor.quarantine.flush()
+    
+    def _next_item(self) -> Optional[tuple]:
+        """Block until an image can be dispatched; None on shutdown"""
+        with self._condition:
+            while not self._shutdown:
+                runnable = [job for job in self._jobs.values()
+                            if job.state in (JOB_QUEUED, JOB_RUNNING) and job.has_pending]
+                in_flight = sum(job.in_flight for job in self._jobs.values())
+                if runnable and self.memory_governor.should_pause(in_flight):
+                    # Woken by a finishing image, or samples memory again
+                    self._condition.wait(self.memory_governor.sample_interval)
+                    continue
+                if runnable:
+                    job = min(runnable, key=lambda j: j.virtual_time)
+                    self._virtual_clock = job.virtual_time
+                    if job.state == JOB_QUEUED:
+                        job.state = JOB_RUNNING
+                        job.started = time.time()
+                        job.eta_estimator.start()
+                    index = job.next_index
+                    job.next_index += 1
+                    job.in_flight += 1
+                    charge = job.expected_cost()
+                    job.virtual_time += charge / job.weight
+                    return job, index, charge
+                self._condition.wait()
+            return None
+    
+    def _worker(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            job, index, charge = item
+            path = job.image_paths[index]
+            start = time.monotonic()
+            try:
+                result = self.processor.detect_image(path, cancel_token=job.cancel_token)
+            except Exception as e:
+                self.logger.error(f"Job {job.name}: error processing {path}: {e}")
+                result = DetectionResult(path, [], self.processor.detector.mode, 0.0, False,
+                                         error_message=str(e))
+            elapsed = time.monotonic() - start
+            self._complete(job, index, result, elapsed, charge)
+    
+    def _complete(self, job: Job, index: int, result: DetectionResult, elapsed: float, charge: float):
+        """Record a finished image and settle its charge"""
+        kept = not (job.cancel_token.cancelled and not result.success)
+        if kept:
+            job._aggregator.record_result(result, elapsed, result.metadata.get('timings'))
+        
+        with self._condition:
+            job.in_flight -= 1
+            job.virtual_time += (elapsed - charge) / job.weight
+            if kept:
+                job.results[index] = result
+                job.completed += 1
+                job.busy_time += elapsed
+                stage = result.metadata.get('pipeline_stage', 'inference')
+                job.eta_estimator.record(stage)
+                if stage == 'skipped':
+                    job.status_counts['skipped'] += 1
+                elif result.success:
+                    job.status_counts['success'] += 1
+                else:
+                    job.status_counts['failed'] += 1
+            
+            event = None
+            if job.in_flight == 0 and not job.has_pending and not job.done:
+                event = self._finish(job, JOB_CANCELLED if job.state == JOB_CANCELLED else JOB_COMPLETED)
+            elif kept:
+                event = ProgressEvent(
+                    current=job.completed, total=job.total, status="処理中",
+                    filename=Path(result.image_path).name,
+                    elapsed=time.time() - job.started,
+                    throughput=job.eta_estimator.throughput(),
+                    eta=job.eta_estimator.estimate(job.total - job.completed),
+                    status_counts=dict(job.status_counts)
+                )
+            self._condition.notify_all()
+        
+        # Listeners run outside the lock so a slow callback never stalls dispatch
+        if event is not None:
+            job._progress.publish(event)
+    
+    def _finish(self, job: Job, state: str) -> ProgressEvent:
+        """
+        Mark a job finished (called with the lock held)
+        
+        Returns:
+            Final progress event, to be published once the lock is released
+        """
+        job.state = state
+        job.finished = time.time()
+        elapsed = job.finished - (job.started or job.finished)
+        job._aggregator.update(processing_time=elapsed, cancelled=state == JOB_CANCELLED)
+        job._done.set()
+        self.logger.info(f"Job {job.name} {state}: {job.completed}/{job.total} images")
+        return ProgressEvent(
+            current=job.completed, total=job.total,
+            status="キャンセル" if state == JOB_CANCELLED else "完了",
+            elapsed=elapsed,
+            throughput=job.eta_estimator.throughput(),
+            status_counts=dict(job.status_counts),
+            final=True
+        )
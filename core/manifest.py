@@ -0,0 +1,247 @@
+"""
+File Manifest for Wildlife Detector
+Remembers the last result of every image so re-runs only infer new or changed files
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .species_detector import DetectionResult
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT,
+    model_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    updated TEXT NOT NULL
+)
+"""
+
+
+class FileManifest:
+    """
+    SQLite manifest of the images below one input root
+    
+    Each row stores the path, size, mtime (and optionally a content hash) of
+    an image together with its last successful result and the model version
+    that produced it. An image is reused when its signature and the model
+    version still match; with hashing enabled, a file whose mtime changed
+    but whose contents did not (e.g. after a copy) is reused as well.
+    Content hashes are SHA-256 digests from utils.hashing, optionally taken
+    from a shared hash cache.
+    """
+    
+    def __init__(self, db_path: Union[str, Path], model_version: str, use_hash: bool = False,
+                 hash_cache: Optional[Union[str, Path]] = None, hash_workers: int = 4):
+        """
+        Initialize manifest
+        
+        Args:
+            db_path: SQLite database file
+            model_version: Fingerprint of the model and settings producing results
+            use_hash: Store and compare content hashes
+            hash_cache: Optional SQLite file remembering digests of unchanged files
+            hash_workers: Files hashed in parallel
+        """
+        self.db_path = Path(db_path)
+        self.model_version = model_version
+        self.use_hash = use_hash
+        self.hash_workers = hash_workers
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._hash_cache = None
+        if use_hash and hash_cache:
+            # Imported here: the utils package imports core.batch_processor
+            from utils.hashing import HashCache
+            self._hash_cache = HashCache(hash_cache)
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+    
+    @classmethod
+    def for_root(cls, cache_dir: Union[str, Path], root: Union[str, Path],
+                 model_version: str, use_hash: bool = False, hash_workers: int = 4) -> 'FileManifest':
+        """
+        Open the manifest of an input root (cache_dir/manifests/<name>-<id>.sqlite)
+        
+        Content hashes are cached in cache_dir/hashes.sqlite, shared with
+        duplicate detection.
+        
+        Args:
+            cache_dir: Application cache directory
+            root: Input folder the images belong to
+            model_version: Fingerprint of the model and settings producing results
+            use_hash: Store and compare content hashes
+            hash_workers: Files hashed in parallel
+        """
+        root = os.path.abspath(str(root))
+        root_id = hashlib.sha1(root.encode('utf-8')).hexdigest()[:12]
+        name = os.path.basename(root.rstrip(os.sep)) or 'root'
+        cache_dir = Path(cache_dir)
+        return cls(cache_dir / 'manifests' / f"{name}-{root_id}.sqlite", model_version, use_hash,
+                   cache_dir / 'hashes.sqlite', hash_workers)
+    
+    @staticmethod
+    def _key(image_path: Union[str, Path]) -> str:
+        return os.path.abspath(str(image_path))
+    
+    def _rows(self, keys: List[str]) -> Dict[str, Tuple]:
+        """Fetch (size, mtime_ns, hash, model_version) for many paths"""
+        rows = {}
+        with self._lock:
+            for i in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                for path, size, mtime_ns, file_hash, version in self._conn.execute(
+                        f"SELECT path, size, mtime_ns, hash, model_version FROM files "
+                        f"WHERE path IN ({placeholders})", chunk):
+                    rows[path] = (size, mtime_ns, file_hash, version)
+        return rows
+    
+    def _results(self, keys: List[str]) -> Dict[str, DetectionResult]:
+        """Load the stored results of many paths"""
+        results = {}
+        with self._lock:
+            for i in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                for path, data in self._conn.execute(
+                        f"SELECT path, result FROM files WHERE path IN ({placeholders})", chunk):
+                    results[path] = DetectionResult.from_dict(json.loads(data))
+        return results
+    
+    def partition(self, image_paths: Iterable[str]) -> Tuple[List[str], Dict[str, DetectionResult]]:
+        """
+        Split images into those needing inference and those with a valid result
+        
+        Args:
+            image_paths: Images of the run
+        
+        Returns:
+            (paths to process, {path: reused result}) with reused results
+            rebased onto the given path strings and marked metadata['reused']
+        """
+        image_paths = list(image_paths)
+        keys = [self._key(p) for p in image_paths]
+        rows = self._rows(keys)
+        
+        changed = []
+        unchanged: Dict[str, str] = {}
+        suspects = []
+        for path, key in zip(image_paths, keys):
+            row = rows.get(key)
+            if row is None or row[3] != self.model_version:
+                changed.append(path)
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                changed.append(path)
+                continue
+            size, mtime_ns, file_hash, _ = row
+            if st.st_size == size and st.st_mtime_ns == mtime_ns:
+                unchanged[path] = key
+            elif self.use_hash and file_hash and st.st_size == size:
+                suspects.append((path, key, file_hash, st.st_mtime_ns))
+            else:
+                changed.append(path)
+        
+        touched = []
+        digests = self._hashes([path for path, _, _, _ in suspects])
+        for path, key, file_hash, mtime_ns in suspects:
+            if digests.get(path) == file_hash:
+                # Same contents, new timestamp (copied or touched)
+                unchanged[path] = key
+                touched.append((mtime_ns, key))
+            else:
+                changed.append(path)
+        
+        if touched:
+            with self._lock:
+                self._conn.executemany("UPDATE files SET mtime_ns = ? WHERE path = ?", touched)
+                self._conn.commit()
+        
+        stored = self._results(list(unchanged.values()))
+        reused = {}
+        for path, key in unchanged.items():
+            result = stored.get(key)
+            if result is None:
+                changed.append(path)
+                continue
+            result.image_path = path
+            result.metadata['reused'] = True
+            reused[path] = result
+        
+        self.logger.info(f"Manifest: {len(reused)} unchanged, {len(changed)} new or changed")
+        return changed, reused
+    
+    def _hashes(self, paths: List[str]) -> Dict[str, str]:
+        """Content digests of many files (unreadable files are left out)"""
+        if not paths:
+            return {}
+        # Imported here: the utils package imports core.batch_processor
+        from utils.hashing import hash_files
+        return hash_files(paths, workers=self.hash_workers, cache=self._hash_cache)
+    
+    def record(self, results: Iterable[DetectionResult]) -> int:
+        """
+        Store successful results (failed, skipped and reused ones are ignored)
+        
+        Returns:
+            Number of stored results
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        results = [r for r in results
+                   if r.success and not r.metadata.get('reused')
+                   and r.metadata.get('pipeline_stage') != 'skipped']
+        digests = self._hashes([r.image_path for r in results]) if self.use_hash else {}
+        rows = []
+        for result in results:
+            metadata = result.metadata
+            try:
+                st = os.stat(result.image_path)
+            except OSError:
+                continue
+            file_hash = digests.get(result.image_path)
+            data = result.to_dict()
+            data['metadata'] = {k: v for k, v in metadata.items() if k != 'reused'}
+            rows.append((self._key(result.image_path), st.st_size, st.st_mtime_ns, file_hash,
+                         self.model_version, json.dumps(data, ensure_ascii=False, default=str), now))
+        
+        if rows:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files "
+                    "(path, size, mtime_ns, hash, model_version, result, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.commit()
+        return len(rows)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    
+    def close(self):
+        """Close the database and the hash cache"""
+        with self._lock:
+            self._conn.close()
+        if self._hash_cache is not None:
+            self._hash_cache.close()
+            self._hash_cache = None
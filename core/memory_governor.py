@@ -0,0 +1,141 @@
+"""
+Memory Governor for Wildlife Detector
+Keeps the batch processor (and its SpeciesNet children) under memory_limit_gb
+"""
+
+import logging
+import os
+import time
+import threading
+from typing import Callable, Optional
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; the governor is disabled without it
+    psutil = None
+
+
+def sample_process_tree_rss() -> int:
+    """
+    Sample the resident set size of this process and all of its children
+    
+    Returns:
+        RSS in bytes (0 if psutil is not available)
+    """
+    if psutil is None:
+        return 0
+    
+    try:
+        process = psutil.Process(os.getpid())
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                # Children come and go while we iterate
+                continue
+        return total
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0
+
+
+class MemoryGovernor:
+    """
+    Pauses new work when the process tree approaches the memory limit
+    
+    Throttling starts when RSS reaches high_water * limit and stops once it
+    has fallen back to low_water * limit, so the processor does not flap
+    around the threshold. At least one image is always allowed in flight so
+    a run can never deadlock on its own baseline usage.
+    """
+    
+    def __init__(self,
+                 limit_gb: float,
+                 high_water: float = 0.9,
+                 low_water: float = 0.75,
+                 sample_interval: float = 0.25,
+                 sampler: Optional[Callable[[], int]] = None):
+        """
+        Initialize memory governor
+        
+        Args:
+            limit_gb: Memory limit in GB (0 or None disables the governor)
+            high_water: Fraction of the limit at which submissions pause
+            low_water: Fraction of the limit at which submissions resume
+            sample_interval: Minimum seconds between RSS samples
+            sampler: Optional callable returning RSS in bytes (for testing)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.limit_bytes = int((limit_gb or 0) * 1024 ** 3)
+        self.high_water = high_water
+        self.low_water = low_water
+        self.sample_interval = sample_interval
+        self.sampler = sampler or sample_process_tree_rss
+        
+        self.enabled = self.limit_bytes > 0 and (sampler is not None or psutil is not None)
+        if self.limit_bytes > 0 and not self.enabled:
+            self.logger.warning("psutil not installed; memory_limit_gb will not be enforced")
+        
+        # State
+        self.throttled = False
+        self.throttle_events = 0
+        self.throttled_time = 0.0
+        self.peak_bytes = 0
+        self._last_usage = 0
+        self._last_sample = 0.0
+        self._throttle_start = 0.0
+        self._lock = threading.Lock()
+    
+    def current_usage(self) -> int:
+        """Get the most recent RSS sample in bytes, resampling if stale"""
+        now = time.monotonic()
+        if now - self._last_sample >= self.sample_interval:
+            self._last_usage = self.sampler()
+            self._last_sample = now
+            self.peak_bytes = max(self.peak_bytes, self._last_usage)
+        return self._last_usage
+    
+    def should_pause(self, in_flight: int) -> bool:
+        """
+        Decide whether new submissions should wait
+        
+        Args:
+            in_flight: Number of images currently being processed
+        
+        Returns:
+            True if no new image should be submitted right now
+        """
+        if not self.enabled:
+            return False
+        
+        with self._lock:
+            usage = self.current_usage()
+            
+            if not self.throttled and usage >= self.limit_bytes * self.high_water:
+                self.throttled = True
+                self.throttle_events += 1
+                self._throttle_start = time.monotonic()
+                self.logger.warning(
+                    f"Memory usage {usage / 1024 ** 2:.0f}MB near limit "
+                    f"{self.limit_bytes / 1024 ** 2:.0f}MB; pausing new submissions"
+                )
+            elif self.throttled and usage <= self.limit_bytes * self.low_water:
+                self.throttled = False
+                self.throttled_time += time.monotonic() - self._throttle_start
+                self.logger.info(
+                    f"Memory usage back to {usage / 1024 ** 2:.0f}MB; resuming submissions"
+                )
+            
+            return self.throttled and in_flight > 0
+    
+    def finish(self):
+        """Close an open throttling interval at the end of a run"""
+        with self._lock:
+            if self.throttled:
+                self.throttled_time += time.monotonic() - self._throttle_start
+                self._throttle_start = time.monotonic()
+    
+    @property
+    def peak_mb(self) -> float:
+        """Peak sampled RSS in MB"""
+        return self.peak_bytes / (1024 * 1024)
@@ -0,0 +1,226 @@
+"""
+I/O Prefetch Stage for Wildlife Detector
+Reads upcoming images into a bounded buffer pool while earlier ones are in inference
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+
+class BufferPool:
+    """
+    Bounded pool of reusable byte buffers
+    
+    At most max_bytes are handed out at once; a single buffer larger than the
+    whole budget is still allowed when nothing else is outstanding. Released
+    buffers are kept for reuse so steady-state prefetching does not allocate.
+    """
+    
+    def __init__(self, max_bytes: int):
+        """
+        Initialize buffer pool
+        
+        Args:
+            max_bytes: Maximum bytes outstanding at any time
+        """
+        self.max_bytes = max_bytes
+        self._in_use = 0
+        self._free: List[bytearray] = []
+        self._closed = False
+        self._cond = threading.Condition()
+    
+    def acquire(self, size: int) -> Optional[bytearray]:
+        """
+        Get a buffer of at least size bytes, blocking while the pool is full
+        
+        Returns:
+            Buffer, or None if the pool was closed while waiting
+        """
+        with self._cond:
+            while self._in_use and self._in_use + size > self.max_bytes and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            
+            self._in_use += size
+            for i, buf in enumerate(self._free):
+                if len(buf) >= size:
+                    return self._free.pop(i)
+            return bytearray(size)
+    
+    def release(self, buf: bytearray, size: int):
+        """Return a buffer obtained from acquire()"""
+        with self._cond:
+            self._in_use -= size
+            if sum(len(b) for b in self._free) + len(buf) <= self.max_bytes:
+                self._free.append(buf)
+            self._cond.notify_all()
+    
+    def close(self):
+        """Wake up and fail any pending acquire()"""
+        with self._cond:
+            self._closed = True
+            self._free.clear()
+            self._cond.notify_all()
+
+
+class PrefetchedImage:
+    """Image bytes held in a pooled buffer until release()"""
+    
+    def __init__(self, path: str, pool: BufferPool, buf: bytearray, size: int, reserved: int):
+        self.path = path
+        self.size = size
+        self.data = memoryview(buf)[:size]
+        self._pool = pool
+        self._buf = buf
+        self._reserved = reserved
+    
+    def release(self):
+        """Give the buffer back to the pool"""
+        if self._buf is not None:
+            self.data.release()
+            self._pool.release(self._buf, self._reserved)
+            self._buf = None
+
+
+class Lookahead:
+    """Iterator wrapper that can peek at upcoming items"""
+    
+    def __init__(self, iterable: Iterable[str]):
+        self._iterator: Iterator[str] = iter(iterable)
+        self._buffer: Deque[str] = deque()
+    
+    def peek(self, n: int) -> List[str]:
+        """Get up to n upcoming items without consuming them"""
+        while len(self._buffer) < n:
+            item = next(self._iterator, None)
+            if item is None:
+                break
+            self._buffer.append(item)
+        return list(self._buffer)[:n]
+    
+    def next(self) -> Optional[str]:
+        """Consume the next item (None when exhausted)"""
+        if self._buffer:
+            return self._buffer.popleft()
+        return next(self._iterator, None)
+
+
+class Prefetcher:
+    """
+    Reads image files ahead of inference on a small dedicated I/O pool
+    
+    Files are read with posix_fadvise read-ahead hints where available. For
+    subprocess backends, which open the file themselves, the read also leaves
+    the data in the page cache so the child does not hit the disk again.
+    """
+    
+    def __init__(self, depth: int = 8, workers: int = 2, max_buffer_mb: float = 256.0):
+        """
+        Initialize prefetcher
+        
+        Args:
+            depth: Maximum number of files read ahead
+            workers: Number of I/O threads
+            max_buffer_mb: Buffer pool budget in MB
+        """
+        self.logger = logging.getLogger(__name__)
+        self.depth = depth
+        self.pool = BufferPool(int(max_buffer_mb * 1024 * 1024))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                            thread_name_prefix="prefetch")
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+    
+    def schedule(self, paths: Iterable[str]):
+        """Start reading the given upcoming paths, up to depth outstanding"""
+        with self._lock:
+            for path in paths:
+                if len(self._pending) >= self.depth:
+                    break
+                if path not in self._pending:
+                    self._pending[path] = self._executor.submit(self._read, path)
+    
+    def take(self, path: str) -> Optional[PrefetchedImage]:
+        """
+        Get the bytes of a file, waiting for its read if still in progress
+        
+        Files that were never scheduled are read synchronously.
+        
+        Returns:
+            PrefetchedImage (caller must release()) or None if the read failed
+        """
+        with self._lock:
+            future = self._pending.pop(path, None)
+        
+        try:
+            if future is None:
+                return self._read(path)
+            return future.result()
+        except Exception as e:
+            # Let the detector report the error from its own read
+            self.logger.debug(f"Prefetch failed for {path}: {e}")
+            return None
+    
+    def discard(self, path: str):
+        """Drop a scheduled read whose image will not be processed"""
+        with self._lock:
+            future = self._pending.pop(path, None)
+        if future is not None and not future.cancel():
+            future.add_done_callback(self._release_future)
+    
+    @staticmethod
+    def _release_future(future: Future):
+        """Release the buffer of a finished read nobody will take"""
+        if future.exception() is None and future.result() is not None:
+            future.result().release()
+    
+    def _read(self, path: str) -> Optional[PrefetchedImage]:
+        """Read a whole file into a pooled buffer"""
+        with open(path, 'rb', buffering=0) as f:
+            fd = f.fileno()
+            size = os.fstat(fd).st_size
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            
+            buf = self.pool.acquire(size)
+            if buf is None:
+                return None
+            
+            view = memoryview(buf)
+            read = 0
+            try:
+                while read < size:
+                    n = f.readinto(view[read:size])
+                    if not n:
+                        break
+                    read += n
+            except Exception:
+                view.release()
+                self.pool.release(buf, size)
+                raise
+            view.release()
+        
+        # A file that shrank while reading exposes only what was read
+        return PrefetchedImage(path, self.pool, buf, read, size)
+    
+    def close(self):
+        """Stop prefetching and free all outstanding buffers"""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        
+        self.pool.close()
+        for future in pending:
+            future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for future in pending:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                image = future.result()
+                if image:
+                    image.release()
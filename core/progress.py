@@ -0,0 +1,130 @@
+"""
+Progress Dispatch for Wildlife Detector
+Rate-limited, coalesced progress events with throughput, ETA and status counts
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from .eta import ETA
+
+
+@dataclass
+class ProgressEvent:
+    """Snapshot of batch progress delivered to listeners"""
+    current: int
+    total: int
+    status: str
+    filename: str = ""
+    elapsed: float = 0.0
+    throughput: float = 0.0
+    eta: Optional[ETA] = None
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    final: bool = False
+    coalesced: int = 0
+    total_estimated: bool = False  # total still growing (streaming discovery)
+    
+    @property
+    def percentage(self) -> float:
+        """Completion in percent"""
+        return (self.current / self.total * 100) if self.total > 0 else 0.0
+
+
+class ProgressDispatcher:
+    """
+    Delivers progress events at no more than max_rate per second
+    
+    Events arriving faster are coalesced: only the newest is kept and
+    delivered once the interval has passed (on the next publish() or
+    poll()), carrying the number of updates it replaced. Final events are
+    always delivered immediately and supersede any pending one.
+    """
+    
+    def __init__(self,
+                 callback: Optional[Callable[[int, int, str, str], None]] = None,
+                 event_callback: Optional[Callable[[ProgressEvent], None]] = None,
+                 max_rate: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize dispatcher
+        
+        Args:
+            callback: Legacy callback(current, total, status, filename)
+            event_callback: Callback receiving ProgressEvent objects
+            max_rate: Maximum deliveries per second (0 disables limiting)
+            clock: Time source (for testing)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.callback = callback
+        self.event_callback = event_callback
+        self.min_interval = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        self.clock = clock
+        
+        self.delivered = 0
+        self.coalesced = 0
+        self._pending: Optional[ProgressEvent] = None
+        self._pending_count = 0
+        self._last_delivery: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def active(self) -> bool:
+        """Whether anyone is listening"""
+        return self.callback is not None or self.event_callback is not None
+    
+    def publish(self, event: ProgressEvent):
+        """Offer an event; it is delivered now or coalesced into a later one"""
+        if not self.active:
+            return
+        
+        with self._lock:
+            now = self.clock()
+            if not (event.final or self._due(now)):
+                self._pending = event
+                self._pending_count += 1
+                return
+            
+            # This event supersedes anything still pending
+            event.coalesced = self._pending_count
+            self.coalesced += self._pending_count
+            self._pending = None
+            self._pending_count = 0
+            self._last_delivery = now
+        
+        self._deliver(event)
+    
+    def poll(self):
+        """Deliver a coalesced event if its interval has passed"""
+        with self._lock:
+            if self._pending is None or not self._due(self.clock()):
+                return
+            event = self._take_pending()
+            self._last_delivery = self.clock()
+        self._deliver(event)
+    
+    def _due(self, now: float) -> bool:
+        return self._last_delivery is None or now - self._last_delivery >= self.min_interval
+    
+    def _take_pending(self) -> Optional[ProgressEvent]:
+        """Remove and return the pending event (caller holds the lock)"""
+        event = self._pending
+        if event is not None:
+            event.coalesced = self._pending_count - 1
+            self.coalesced += self._pending_count - 1
+        self._pending = None
+        self._pending_count = 0
+        return event
+    
+    def _deliver(self, event: ProgressEvent):
+        """Call the listeners, isolating the batch from their errors"""
+        self.delivered += 1
+        try:
+            if self.event_callback:
+                self.event_callback(event)
+            if self.callback:
+                self.callback(event.current, event.total, event.status, event.filename)
+        except Exception as e:
+            self.logger.warning(f"Progress callback failed: {e}")
@@ -0,0 +1,233 @@
+"""
+Retry Policy and Quarantine for Wildlife Detector
+Retries transient failures with backoff and remembers images that keep failing
+"""
+
+import json
+import logging
+import os
+import random
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+# Error types recorded in DetectionResult.error_type
+ERROR_TIMEOUT = 'timeout'
+ERROR_TRANSIENT = 'transient'
+ERROR_CORRUPT = 'corrupt'
+ERROR_NOT_FOUND = 'not_found'
+ERROR_TOO_LARGE = 'too_large'
+ERROR_CANCELLED = 'cancelled'
+ERROR_QUARANTINED = 'quarantined'
+ERROR_REJECTED = 'rejected'
+ERROR_UNKNOWN = 'unknown'
+
+# Errors worth another attempt, and errors that send an image to quarantine.
+# Transient errors are not quarantined: a broken SpeciesNet install or
+# environment fails every image that way, and must not poison the archive.
+RETRYABLE_ERRORS = (ERROR_TIMEOUT, ERROR_TRANSIENT)
+QUARANTINE_ERRORS = (ERROR_TIMEOUT, ERROR_CORRUPT)
+
+# Messages from PIL / SpeciesNet that point at a broken image file
+_CORRUPT_MARKERS = (
+    'cannot identify image file',
+    'image file is truncated',
+    'unidentifiedimageerror',
+    'decompressionbomb',
+    'broken data stream',
+    'not a jpeg file',
+)
+
+
+def classify_error(error: Union[BaseException, str]) -> str:
+    """
+    Classify an exception (or error message) into an error type
+    
+    Args:
+        error: Exception raised by a detection, or its message
+    
+    Returns:
+        One of the ERROR_* constants
+    """
+    message = str(error).lower()
+    if any(marker in message for marker in _CORRUPT_MARKERS):
+        return ERROR_CORRUPT
+    if isinstance(error, str):
+        if 'timed out' in message or 'timeout' in message:
+            return ERROR_TIMEOUT
+        return ERROR_UNKNOWN
+    
+    if isinstance(error, (subprocess.TimeoutExpired, TimeoutError)):
+        return ERROR_TIMEOUT
+    if isinstance(error, FileNotFoundError):
+        return ERROR_NOT_FOUND
+    if isinstance(error, (OSError, RuntimeError, MemoryError, json.JSONDecodeError)):
+        # Child crashes, I/O hiccups and half-written output files
+        return ERROR_TRANSIENT
+    if isinstance(error, (SyntaxError, ValueError)):
+        # PIL raises these for malformed image data
+        return ERROR_CORRUPT
+    return ERROR_UNKNOWN
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff policy for failed detections"""
+    max_retries: int = 2
+    timeout_retries: int = 1
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.1
+    
+    def should_retry(self, error_type: str, attempt: int) -> bool:
+        """
+        Decide whether a failed attempt should be retried
+        
+        Args:
+            error_type: Error type of the failed attempt
+            attempt: Number of the attempt that failed (1-based)
+        """
+        if error_type == ERROR_TIMEOUT:
+            return attempt <= self.timeout_retries
+        return error_type in RETRYABLE_ERRORS and attempt <= self.max_retries
+    
+    def delay(self, attempt: int) -> float:
+        """Backoff in seconds before the retry following a failed attempt"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class QuarantineStore:
+    """
+    Persistent list of images that repeatedly failed or timed out
+    
+    Entries remember the file size and modification time, so an image that
+    is replaced on disk leaves quarantine automatically. Changes are written
+    at most every save_interval seconds; call flush() at the end of a run.
+    """
+    
+    def __init__(self, path: Union[str, Path], save_interval: float = 5.0):
+        """
+        Initialize store
+        
+        Args:
+            path: JSON file used for persistence
+            save_interval: Minimum seconds between writes of the file
+        """
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+        self._dirty = False
+        self._last_save: Optional[float] = None
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load all stored entries"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable quarantine store {self.path}: {e}")
+            return {}
+    
+    def _save(self):
+        """Write all entries atomically (caller holds the lock)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Failed to save quarantine store: {e}")
+        self._dirty = False
+        self._last_save = time.monotonic()
+    
+    def _changed(self):
+        """Note a change and write it out unless the last write was recent (caller holds the lock)"""
+        self._dirty = True
+        if self._last_save is None or time.monotonic() - self._last_save >= self.save_interval:
+            self._save()
+    
+    def flush(self):
+        """Write pending changes"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+    
+    @staticmethod
+    def _key(image_path: Union[str, Path]) -> str:
+        return os.path.abspath(str(image_path))
+    
+    @staticmethod
+    def _signature(image_path: Union[str, Path]) -> Optional[List[int]]:
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+    
+    def is_quarantined(self, image_path: Union[str, Path]) -> bool:
+        """Check whether an image should be skipped"""
+        key = self._key(image_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry.get('signature') != self._signature(image_path):
+                # The file changed since it was quarantined: give it another chance
+                del self._entries[key]
+                self._changed()
+                return False
+            return True
+    
+    def get(self, image_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """Get the quarantine entry of an image, if any"""
+        with self._lock:
+            entry = self._entries.get(self._key(image_path))
+            return dict(entry) if entry else None
+    
+    def add(self, image_path: Union[str, Path], error_type: str, error_message: str, attempts: int):
+        """Quarantine an image"""
+        key = self._key(image_path)
+        with self._lock:
+            self._entries[key] = {
+                'error_type': error_type,
+                'error': error_message,
+                'attempts': attempts,
+                'signature': self._signature(image_path),
+                'quarantined': datetime.now().isoformat(timespec='seconds')
+            }
+            self._changed()
+        self.logger.warning(f"Quarantined {image_path} after {attempts} attempt(s): {error_type}")
+    
+    def remove(self, image_path: Union[str, Path]):
+        """Release a single image from quarantine"""
+        with self._lock:
+            if self._entries.pop(self._key(image_path), None) is not None:
+                self._changed()
+    
+    def clear(self) -> int:
+        """
+        Release all images from quarantine
+        
+        Returns:
+            Number of released images
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries = {}
+            self._save()
+        return count
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
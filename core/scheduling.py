@@ -0,0 +1,137 @@
+"""
+Scheduling Policies for Wildlife Detector
+Orders batch work by physical disk locality to reduce seeking
+"""
+
+import logging
+import os
+import struct
+from collections import defaultdict
+from itertools import zip_longest
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; inode order is used instead
+    fcntl = None
+
+# Available scheduling policies
+POLICY_PATH = 'path'
+POLICY_LOCALITY = 'locality'
+POLICIES = (POLICY_PATH, POLICY_LOCALITY)
+
+# Linux FIEMAP ioctl: _IOWR('f', 11, struct fiemap)
+FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP_HEADER = struct.Struct('=QQLLLL')
+_FIEMAP_EXTENT_SIZE = 56
+
+
+def physical_offset(path: Union[str, Path]) -> Optional[int]:
+    """
+    Get the on-disk byte offset of the first extent of a file
+    
+    Uses the FIEMAP ioctl, which most Linux filesystems (ext4, xfs, btrfs)
+    support without special privileges.
+    
+    Returns:
+        Physical offset in bytes, or None if it cannot be determined
+    """
+    if fcntl is None:
+        return None
+    
+    request = bytearray(_FIEMAP_HEADER.pack(0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0))
+    request += bytes(_FIEMAP_EXTENT_SIZE)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, request)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    
+    mapped_extents = _FIEMAP_HEADER.unpack_from(request)[3]
+    if not mapped_extents:
+        return None
+    # fiemap_extent starts with fe_logical, then fe_physical
+    return struct.unpack_from('=Q', request, _FIEMAP_HEADER.size + 8)[0]
+
+
+def locality_order(paths: List[Union[str, Path]], use_extents: bool = True) -> List[str]:
+    """
+    Order paths to follow their physical layout on disk
+    
+    Files are grouped per device. Within a device, each directory is kept
+    contiguous (so concurrent workers and the prefetch window stay in one
+    directory at a time) and directories and files are ordered by physical
+    offset, falling back to inode number where extents are not available.
+    Devices are then interleaved so separate disks are read in parallel,
+    each one sequentially.
+    
+    Args:
+        paths: Image paths to order
+        use_extents: Query physical offsets with FIEMAP (Linux only)
+    
+    Returns:
+        Reordered paths; files that cannot be stat'ed go last in input order
+    """
+    logger = logging.getLogger(__name__)
+    # device -> directory -> [(key, path)]
+    devices: Dict[int, Dict[str, List[Tuple[int, str]]]] = defaultdict(lambda: defaultdict(list))
+    offsets: Dict[str, Optional[int]] = {}
+    inodes: Dict[str, Tuple[int, int]] = {}
+    missing = []
+    
+    for path in map(str, paths):
+        try:
+            st = os.stat(path)
+        except OSError:
+            missing.append(path)
+            continue
+        inodes[path] = (st.st_dev, st.st_ino)
+        offsets[path] = physical_offset(path) if use_extents else None
+    
+    # Physical offsets and inode numbers are not comparable, so a device
+    # only uses offsets when every file on it has one
+    device_has_offsets: Dict[int, bool] = defaultdict(lambda: True)
+    for path, (dev, _) in inodes.items():
+        if offsets[path] is None:
+            device_has_offsets[dev] = False
+    
+    for path, (dev, ino) in inodes.items():
+        key = offsets[path] if device_has_offsets[dev] else ino
+        devices[dev][os.path.dirname(path)].append((key, path))
+    
+    lanes = []
+    for dev in sorted(devices):
+        directories = devices[dev]
+        for files in directories.values():
+            files.sort()
+        ordered_dirs = sorted(directories.values(), key=lambda files: files[0][0])
+        lanes.append([path for files in ordered_dirs for _, path in files])
+    
+    ordered = [path for group in zip_longest(*lanes) for path in group if path is not None]
+    if len(lanes) > 1:
+        logger.debug(f"Locality order: {len(ordered)} files across {len(lanes)} devices")
+    return ordered + missing
+
+
+def order_paths(paths: List[Union[str, Path]], policy: str = POLICY_PATH) -> List[str]:
+    """
+    Apply a scheduling policy to a list of image paths
+    
+    Args:
+        paths: Image paths
+        policy: 'path' keeps the given order, 'locality' uses locality_order()
+    
+    Returns:
+        Paths in processing order
+    """
+    if policy == POLICY_LOCALITY:
+        return locality_order(paths)
+    if policy != POLICY_PATH:
+        raise ValueError(f"Unknown scheduling policy: {policy} (expected one of {POLICIES})")
+    return [str(p) for p in paths]
@@ -3,13 +3,16 @@ Wildlife Species Detector Module
 Enhanced version with Japanese species mapping and improved result handling
 """
 
+import io
 import os
 import sys
 import json
+import signal
 import subprocess
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Union, Tuple, Any
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import logging
 import time
@@ -17,6 +20,10 @@ import time
 import numpy as np
 from PIL import Image
 
+from .retry import classify_error, ERROR_CANCELLED, ERROR_NOT_FOUND
+from .timing import StageTimer
+from .hedging import CancelToken
+
 
 class DetectionMode(Enum):
     """Detection mode enumeration"""
@@ -36,6 +43,18 @@ class DetectionResult:
     success: bool
     error_message: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
+    error_type: Optional[str] = None
+    # Unfiltered detections; `detections` holds those above the run's threshold
+    raw_detections: Optional[List[Dict[str, Any]]] = None
+    
+    def detections_above(self, threshold: float) -> List[Dict[str, Any]]:
+        """Get the detections at or above a confidence threshold (from the raw list if kept)"""
+        source = self.raw_detections if self.raw_detections is not None else self.detections
+        return [d for d in source if d.get('confidence', 0) >= threshold]
+    
+    def with_threshold(self, threshold: float) -> 'DetectionResult':
+        """Copy of this result re-filtered at another confidence threshold"""
+        return replace(self, detections=self.detections_above(threshold))
     
     def get_best_detection(self) -> Optional[Dict[str, Any]]:
         """Get detection with highest confidence"""
@@ -60,8 +79,25 @@ class DetectionResult:
             'processing_time': self.processing_time,
             'success': self.success,
             'error_message': self.error_message,
-            'metadata': self.metadata
+            'error_type': self.error_type,
+            'metadata': self.metadata,
+            'raw_detections': self.raw_detections
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DetectionResult':
+        """Rebuild a result from to_dict() output"""
+        return cls(
+            image_path=data['image_path'],
+            detections=list(data.get('detections') or []),
+            mode=DetectionMode(data['mode']),
+            processing_time=data.get('processing_time', 0.0),
+            success=data.get('success', False),
+            error_message=data.get('error_message'),
+            metadata=dict(data.get('metadata') or {}),
+            error_type=data.get('error_type'),
+            raw_detections=data.get('raw_detections')
+        )
 
 
 # NOTE: SpeciesNameMapper class has been deprecated in favor of English/scientific names
@@ -116,6 +152,11 @@ class SpeciesDetector:
         self.logger = logging.getLogger(__name__)
         # Note: SpeciesNameMapper is deprecated and no longer used
         
+        # Cancellation state shared by all worker threads
+        self._cancel_event = threading.Event()
+        self._active_processes = set()
+        self._process_lock = threading.Lock()
+        
         # Initialize based on mode
         self._initialize_detector()
         
@@ -161,63 +202,84 @@ class SpeciesDetector:
         """Initialize mock detector for testing"""
         self.logger.info("Mock detector initialized - for testing only")
         
-    def detect_single(self, image_path: Union[str, Path]) -> DetectionResult:
+    def detect_single(self, image_path: Union[str, Path],
+                      image_data: Optional[Union[bytes, memoryview]] = None,
+                      timeout: Optional[float] = None,
+                      cancel_token: Optional[CancelToken] = None) -> DetectionResult:
         """
         Detect wildlife in a single image
         
         Args:
             image_path: Path to the image file
+            image_data: Optional file contents already read by the prefetch
+                stage; used instead of reading the file again for metadata
+            timeout: Optional per-call timeout overriding the configured one
+            cancel_token: Optional token cancelling only this detection
             
         Returns:
             DetectionResult object
         """
         image_path = Path(image_path)
         start_time = time.time()
+        timer = StageTimer()
+        
+        if self._is_cancelled(cancel_token):
+            return self._cancelled_result(image_path)
         
-        if not image_path.exists():
+        with timer.stage('stat'):
+            missing = image_data is None and not image_path.exists()
+        if missing:
             return DetectionResult(
                 image_path=str(image_path),
                 detections=[],
                 mode=self.mode,
                 processing_time=0.0,
                 success=False,
-                error_message=f"Image file not found: {image_path}"
+                error_message=f"Image file not found: {image_path}",
+                error_type=ERROR_NOT_FOUND
             )
             
         # Get image metadata
-        try:
-            with Image.open(image_path) as img:
-                metadata = {
-                    'width': img.width,
-                    'height': img.height,
-                    'format': img.format,
-                    'mode': img.mode
-                }
-        except Exception as e:
-            metadata = {'error': str(e)}
+        with timer.stage('metadata'):
+            try:
+                source = io.BytesIO(image_data) if image_data is not None else image_path
+                with Image.open(source) as img:
+                    metadata = {
+                        'width': img.width,
+                        'height': img.height,
+                        'format': img.format,
+                        'mode': img.mode
+                    }
+            except Exception as e:
+                metadata = {'error': str(e)}
             
         # Route to appropriate detection method
-        if self.mode == DetectionMode.MOCK:
-            result = self._detect_mock(image_path)
-        elif self.mode == DetectionMode.SPECIESNET:
-            result = self._detect_speciesnet(image_path)
-        elif self.mode == DetectionMode.CAMERATRAPAI:
-            result = self._detect_cameratrapai(image_path)
-        elif self.mode == DetectionMode.MEGADETECTOR:
-            result = self._detect_megadetector(image_path)
+        if self.mode == DetectionMode.SPECIESNET:
+            # Splits its own time into spawn / inference / parse
+            result = self._detect_speciesnet(image_path, timeout=timeout, timer=timer,
+                                             cancel_token=cancel_token)
+        else:
+            with timer.stage('inference'):
+                if self.mode == DetectionMode.MOCK:
+                    result = self._detect_mock(image_path, cancel_token)
+                elif self.mode == DetectionMode.CAMERATRAPAI:
+                    result = self._detect_cameratrapai(image_path)
+                elif self.mode == DetectionMode.MEGADETECTOR:
+                    result = self._detect_megadetector(image_path)
             
         # Add metadata and update processing time
-        result.metadata = metadata
+        result.metadata = {**metadata, **result.metadata, 'timings': timer.timings}
         result.processing_time = time.time() - start_time
         
         return result
         
-    def _detect_mock(self, image_path: Path) -> DetectionResult:
+    def _detect_mock(self, image_path: Path, cancel_token: Optional[CancelToken] = None) -> DetectionResult:
         """Mock detection for testing"""
         import random
         
-        # Simulate processing time
-        time.sleep(0.1)
+        # Simulate processing time (interruptible by cancel())
+        if self.wait_cancellable(self.config.get('mock_delay', 0.1), cancel_token):
+            return self._cancelled_result(image_path)
         
         # Generate mock results with scientific names for research use
         mock_species = [
@@ -263,7 +325,9 @@ class SpeciesDetector:
             success=True
         )
         
-    def _detect_speciesnet(self, image_path: Path) -> DetectionResult:
+    def _detect_speciesnet(self, image_path: Path, timeout: Optional[float] = None,
+                           timer: Optional[StageTimer] = None,
+                           cancel_token: Optional[CancelToken] = None) -> DetectionResult:
         """Detect using SpeciesNet via subprocess"""
         import tempfile
         import uuid
@@ -327,14 +391,14 @@ class SpeciesDetector:
             
             self.logger.debug(f"Environment PATH (first 3): {filtered_path[:3]}")
                 
-            # Run command
-            result = subprocess.run(
+            # Run command (killable through cancel())
+            result = self._run_cancellable(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.config.get('timeout', 300),
+                timeout=timeout or self.config.get('timeout', 300),
                 env=env,
-                cwd=str(Path.cwd())  # Ensure we run in project directory
+                cwd=str(Path.cwd()),  # Ensure we run in project directory
+                timer=timer,
+                cancel_token=cancel_token
             )
             
             self.logger.debug(f"Command return code: {result.returncode}")
@@ -351,12 +415,15 @@ class SpeciesDetector:
                 raise RuntimeError(f"Output file not created: {output_file}")
                 
             # Parse results
+            parse_start = time.perf_counter()
             with open(output_file, 'r') as f:
                 speciesnet_results = json.load(f)
                 
             self.logger.debug(f"SpeciesNet raw results: {json.dumps(speciesnet_results, indent=2)}")
                 
             detections = self._parse_speciesnet_results(speciesnet_results, str(image_path))
+            if timer:
+                timer.add('parse', time.perf_counter() - parse_start)
             
             self.logger.debug(f"Parsed detections: {detections}")
             
@@ -369,6 +436,9 @@ class SpeciesDetector:
             )
             
         except Exception as e:
+            if self._is_cancelled(cancel_token):
+                self.logger.debug(f"SpeciesNet detection cancelled: {image_path}")
+                return self._cancelled_result(image_path)
             self.logger.error(f"SpeciesNet detection failed: {e}")
             self.logger.exception("Full traceback:")
             return DetectionResult(
@@ -377,13 +447,169 @@ class SpeciesDetector:
                 mode=self.mode,
                 processing_time=0.0,
                 success=False,
-                error_message=str(e)
+                error_message=str(e),
+                error_type=classify_error(e)
             )
         finally:
             # Clean up temp file
             if os.path.exists(output_file):
                 os.unlink(output_file)
                 
+    def _run_cancellable(self, cmd: List[str], timeout: float,
+                         env: Optional[Dict[str, str]] = None,
+                         cwd: Optional[str] = None,
+                         timer: Optional[StageTimer] = None,
+                         cancel_token: Optional[CancelToken] = None) -> subprocess.CompletedProcess:
+        """
+        Run a child process that cancel() can kill at any time
+        
+        The child is started in its own process group so that everything it
+        spawns (model loaders, worker pools) is killed together.
+        
+        Args:
+            cmd: Command line to execute
+            timeout: Timeout in seconds
+            env: Optional environment for the child
+            cwd: Optional working directory
+            timer: Optional StageTimer receiving 'spawn' and 'inference'
+                (the latter includes model loading in the child)
+            cancel_token: Optional token that kills only this child
+        
+        Returns:
+            CompletedProcess with captured stdout/stderr
+        """
+        if self._is_cancelled(cancel_token):
+            raise RuntimeError("Detection cancelled")
+        
+        popen_kwargs = {}
+        if os.name == 'nt':
+            popen_kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_kwargs['start_new_session'] = True
+        
+        spawn_start = time.perf_counter()
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env,
+            cwd=cwd,
+            **popen_kwargs
+        )
+        
+        with self._process_lock:
+            self._active_processes.add(proc)
+        
+        def kill_child():
+            self._kill_process_tree(proc)
+        
+        if cancel_token:
+            cancel_token.add_callback(kill_child)
+        inference_start = time.perf_counter()
+        if timer:
+            timer.add('spawn', inference_start - spawn_start)
+        
+        try:
+            # cancel() may have fired between the check above and registration
+            if self._cancel_event.is_set():
+                self._kill_process_tree(proc)
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill_process_tree(proc)
+            proc.communicate()
+            raise
+        finally:
+            with self._process_lock:
+                self._active_processes.discard(proc)
+            if cancel_token:
+                cancel_token.remove_callback(kill_child)
+            if timer:
+                timer.add('inference', time.perf_counter() - inference_start)
+        
+        if self._is_cancelled(cancel_token):
+            raise RuntimeError("Detection cancelled")
+        
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+    
+    def _kill_process_tree(self, proc: subprocess.Popen):
+        """Kill a child process together with its process group"""
+        if proc.poll() is not None:
+            return
+        try:
+            if os.name == 'nt':
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(proc.pid)],
+                               capture_output=True, timeout=5)
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, OSError, subprocess.SubprocessError):
+            # Fall back to the direct child only
+            try:
+                proc.kill()
+            except OSError:
+                pass
+    
+    def cancel(self):
+        """
+        Cancel all in-flight detections
+        
+        Running SpeciesNet children are killed immediately and any detection
+        started afterwards returns a cancelled result until reset_cancel().
+        """
+        self._cancel_event.set()
+        
+        with self._process_lock:
+            processes = list(self._active_processes)
+        
+        for proc in processes:
+            self._kill_process_tree(proc)
+        
+        if processes:
+            self.logger.info(f"Killed {len(processes)} running detection process(es)")
+    
+    def reset_cancel(self):
+        """Clear the cancelled state so the detector can be reused"""
+        self._cancel_event.clear()
+    
+    @property
+    def is_cancelled(self) -> bool:
+        """Whether cancel() has been requested"""
+        return self._cancel_event.is_set()
+    
+    def _is_cancelled(self, cancel_token: Optional[CancelToken] = None) -> bool:
+        """Whether everything, or the given attempt, was cancelled"""
+        return self._cancel_event.is_set() or (cancel_token is not None and cancel_token.cancelled)
+    
+    def wait_cancellable(self, seconds: float, cancel_token: Optional[CancelToken] = None) -> bool:
+        """
+        Sleep until the delay passes or the detection is cancelled
+        
+        Returns:
+            True if cancelled
+        """
+        if cancel_token is None:
+            return self._cancel_event.wait(seconds)
+        
+        deadline = time.monotonic() + seconds
+        while not self._is_cancelled(cancel_token):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            cancel_token.wait(min(remaining, 0.05))
+        return True
+    
+    def _cancelled_result(self, image_path: Path) -> DetectionResult:
+        """Build the result returned for a cancelled detection"""
+        return DetectionResult(
+            image_path=str(image_path),
+            detections=[],
+            mode=self.mode,
+            processing_time=0.0,
+            success=False,
+            error_message="Detection cancelled",
+            error_type=ERROR_CANCELLED
+        )
+    
     def _detect_cameratrapai(self, image_path: Path) -> DetectionResult:
         """Detect using Google's CameraTrapAI"""
         # Placeholder - use mock for now
@@ -0,0 +1,420 @@
+"""
+Processing Statistics for Wildlife Detector
+Mergeable statistics with per-worker shards and a bounded error log
+"""
+
+import copy
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, field, fields
+from typing import Deque, Dict, Any, Iterable, List, Optional
+
+# Errors kept per statistics object; older entries are counted, not stored
+MAX_ERRORS = 1000
+
+
+def _error_ring() -> Deque[Dict[str, str]]:
+    """Create the bounded error log"""
+    return deque(maxlen=MAX_ERRORS)
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory, log-bucketed latency histogram
+    
+    Buckets grow by 2**(1/4) (about 19% apart) from 1 ms to roughly two
+    hours, so percentiles are accurate to within one bucket while memory
+    stays constant regardless of how many images are recorded. Histograms
+    with the same layout merge by adding bucket counts.
+    """
+    
+    MIN_SECONDS = 0.001
+    GROWTH = 2 ** 0.25
+    NUM_BUCKETS = 92
+    
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def _bucket(self, seconds: float) -> int:
+        """Get the bucket index for a latency"""
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        index = int(math.log(seconds / self.MIN_SECONDS, self.GROWTH)) + 1
+        return min(index, self.NUM_BUCKETS - 1)
+    
+    def _upper_bound(self, index: int) -> float:
+        """Upper latency bound of a bucket"""
+        return self.MIN_SECONDS * self.GROWTH ** index
+    
+    def record(self, seconds: float):
+        """Record one latency in seconds"""
+        seconds = max(0.0, seconds)
+        self.counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+    
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Merge another histogram into this one"""
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+    
+    @property
+    def mean(self) -> float:
+        """Mean latency"""
+        return self.total / self.count if self.count else 0.0
+    
+    def percentile(self, p: float) -> float:
+        """
+        Estimate a percentile
+        
+        Args:
+            p: Percentile in the range 0-100
+        
+        Returns:
+            Latency in seconds (upper bound of the bucket, capped at max)
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self._upper_bound(i), self.max)
+        return self.max
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary with percentiles plus sparse buckets for merging later"""
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+            'total': self.total,
+            'buckets': {str(i): n for i, n in enumerate(self.counts) if n}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        """Rebuild a histogram from to_dict() output"""
+        hist = cls()
+        for i, n in data.get('buckets', {}).items():
+            hist.counts[int(i)] = n
+        hist.count = data.get('count', 0)
+        hist.total = data.get('total', 0.0)
+        hist.max = data.get('max', 0.0)
+        return hist
+
+
+@dataclass
+class ProcessingStats:
+    """Statistics for batch processing"""
+    total_images: int = 0
+    processed_images: int = 0
+    successful_detections: int = 0
+    failed_detections: int = 0
+    total_detections: int = 0
+    processing_time: float = 0.0
+    errors: Deque[Dict[str, str]] = field(default_factory=_error_ring)
+    errors_dropped: int = 0
+    species_counts: Dict[str, int] = field(default_factory=dict)
+    cancelled: bool = False
+    memory_throttle_events: int = 0
+    memory_throttled_time: float = 0.0
+    peak_memory_mb: float = 0.0
+    concurrency_level: int = 0
+    adaptive_concurrency: bool = False
+    retries: int = 0
+    quarantined_images: int = 0
+    skipped_images: int = 0
+    hedges_started: int = 0
+    hedges_won: int = 0
+    reused_results: int = 0
+    rejected_files: int = 0
+    rejection_reasons: Dict[str, int] = field(default_factory=dict)
+    duplicate_images: int = 0
+    duplicate_bytes: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    stage_latency: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    
+    # Merge rules for fields that are not simply added together
+    _MAX_FIELDS = ('processing_time', 'peak_memory_mb')
+    _ANY_FIELDS = ('cancelled', 'adaptive_concurrency')
+    
+    def __post_init__(self):
+        # Accept plain lists (older callers, from_dict) but keep the bound
+        if not isinstance(self.errors, deque) or self.errors.maxlen != MAX_ERRORS:
+            errors = list(self.errors)
+            self.errors_dropped += max(0, len(errors) - MAX_ERRORS)
+            self.errors = deque(errors, maxlen=MAX_ERRORS)
+        if isinstance(self.latency, dict):
+            self.latency = LatencyHistogram.from_dict(self.latency)
+        self.stage_latency = {
+            stage: LatencyHistogram.from_dict(hist) if isinstance(hist, dict) else hist
+            for stage, hist in self.stage_latency.items()
+        }
+    
+    @property
+    def inferred_images(self) -> int:
+        """Images that went through inference (not reused, shared from a duplicate or skipped)"""
+        return max(0, self.processed_images - self.reused_results - self.duplicate_images
+                   - self.skipped_images)
+    
+    @property
+    def average_time_per_image(self) -> float:
+        """Calculate average processing time per image"""
+        # Reused, duplicate and skipped results took no processing time
+        inferred = self.inferred_images
+        if inferred == 0:
+            return 0.0
+        return self.processing_time / inferred
+    
+    @property
+    def success_rate(self) -> float:
+        """Calculate success rate"""
+        if self.processed_images == 0:
+            return 0.0
+        return (self.successful_detections / self.processed_images) * 100
+    
+    def update_species_count(self, species_name: str):
+        """Update species count"""
+        if species_name:
+            self.species_counts[species_name] = self.species_counts.get(species_name, 0) + 1
+    
+    def add_error(self, image_path: str, error_message: str):
+        """Append to the error log, counting entries pushed out of the ring"""
+        if len(self.errors) == self.errors.maxlen:
+            self.errors_dropped += 1
+        self.errors.append({'image': image_path, 'error': error_message})
+    
+    def record_latency(self, seconds: float, stage: Optional[str] = None):
+        """Record a latency overall (stage=None) or for a pipeline stage"""
+        if stage is None:
+            self.latency.record(seconds)
+        else:
+            if stage not in self.stage_latency:
+                self.stage_latency[stage] = LatencyHistogram()
+            self.stage_latency[stage].record(seconds)
+    
+    def record_result(self, result: Any,
+                      latency: Optional[float] = None,
+                      stage_times: Optional[Dict[str, float]] = None):
+        """
+        Count a single DetectionResult
+        
+        Args:
+            result: DetectionResult to record
+            latency: Optional end-to-end latency of the image in seconds
+            stage_times: Optional per-stage latencies in seconds
+        """
+        self.processed_images += 1
+        if result.metadata.get('duplicate_of'):
+            # Shares the result of an identical file; its attempts are counted there
+            self.duplicate_images += 1
+        else:
+            self.retries += max(0, result.metadata.get('attempts', 1) - 1)
+            if result.metadata.get('quarantined'):
+                self.quarantined_images += 1
+            if result.metadata.get('pipeline_stage') == 'skipped':
+                self.skipped_images += 1
+        if result.metadata.get('reused'):
+            self.reused_results += 1
+        
+        if latency is not None:
+            self.record_latency(latency)
+        for stage, seconds in (stage_times or {}).items():
+            self.record_latency(seconds, stage)
+        
+        if result.success:
+            self.successful_detections += 1
+            self.total_detections += len(result.detections)
+            
+            # Update species counts
+            for detection in result.detections:
+                species_name = detection.get('common_name', '不明')
+                self.update_species_count(species_name)
+        else:
+            self.failed_detections += 1
+            if result.error_message:
+                self.add_error(result.image_path, result.error_message)
+    
+    def merge(self, other: 'ProcessingStats') -> 'ProcessingStats':
+        """
+        Merge another statistics object into this one
+        
+        Counters are added, wall-clock and peak values take the maximum and
+        flags are OR-ed, so shards from threads, processes or other machines
+        can all be combined the same way.
+        
+        Args:
+            other: Statistics to merge in
+        
+        Returns:
+            self
+        """
+        for f in fields(self):
+            name = f.name
+            if name in ('errors', 'errors_dropped', 'species_counts', 'rejection_reasons',
+                        'latency', 'stage_latency'):
+                continue
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if name in self._MAX_FIELDS:
+                setattr(self, name, max(mine, theirs))
+            elif name in self._ANY_FIELDS:
+                setattr(self, name, mine or theirs)
+            else:
+                setattr(self, name, mine + theirs)
+        
+        for species, count in other.species_counts.items():
+            self.species_counts[species] = self.species_counts.get(species, 0) + count
+        for reason, count in other.rejection_reasons.items():
+            self.rejection_reasons[reason] = self.rejection_reasons.get(reason, 0) + count
+        
+        self.latency.merge(other.latency)
+        for stage, hist in other.stage_latency.items():
+            if stage not in self.stage_latency:
+                self.stage_latency[stage] = LatencyHistogram()
+            self.stage_latency[stage].merge(hist)
+        
+        self.errors_dropped += other.errors_dropped
+        for error in other.errors:
+            if len(self.errors) == self.errors.maxlen:
+                self.errors_dropped += 1
+            self.errors.append(dict(error))
+        
+        return self
+    
+    @classmethod
+    def merged(cls, parts: Iterable['ProcessingStats']) -> 'ProcessingStats':
+        """Merge several statistics objects into a new one"""
+        result = cls()
+        for part in parts:
+            result.merge(part)
+        return result
+    
+    def copy(self) -> 'ProcessingStats':
+        """Deep copy, safe to hand to other threads"""
+        return copy.deepcopy(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'total_images': self.total_images,
+            'processed_images': self.processed_images,
+            'successful_detections': self.successful_detections,
+            'failed_detections': self.failed_detections,
+            'total_detections': self.total_detections,
+            'processing_time': self.processing_time,
+            'average_time_per_image': self.average_time_per_image,
+            'inferred_images': self.inferred_images,
+            'success_rate': self.success_rate,
+            'errors': list(self.errors),
+            'errors_dropped': self.errors_dropped,
+            'species_counts': self.species_counts,
+            'cancelled': self.cancelled,
+            'memory_throttle_events': self.memory_throttle_events,
+            'memory_throttled_time': self.memory_throttled_time,
+            'peak_memory_mb': self.peak_memory_mb,
+            'concurrency_level': self.concurrency_level,
+            'adaptive_concurrency': self.adaptive_concurrency,
+            'retries': self.retries,
+            'quarantined_images': self.quarantined_images,
+            'skipped_images': self.skipped_images,
+            'hedges_started': self.hedges_started,
+            'hedges_won': self.hedges_won,
+            'reused_results': self.reused_results,
+            'rejected_files': self.rejected_files,
+            'rejection_reasons': self.rejection_reasons,
+            'duplicate_images': self.duplicate_images,
+            'duplicate_bytes': self.duplicate_bytes,
+            'latency': self.latency.to_dict(),
+            'stage_latency': {stage: hist.to_dict() for stage, hist in self.stage_latency.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProcessingStats':
+        """Rebuild statistics from to_dict() output (e.g. a result shard on disk)"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class StatsAggregator:
+    """
+    Low-contention statistics for concurrent workers
+    
+    Each worker thread records into its own shard, so the hot path only
+    takes an uncontended per-shard lock. Readers get a merged snapshot that
+    is a private copy and never aliases live state.
+    """
+    
+    def __init__(self, total_images: int = 0):
+        """
+        Initialize aggregator
+        
+        Args:
+            total_images: Number of images in the run
+        """
+        self._base = ProcessingStats(total_images=total_images)
+        self._base_lock = threading.Lock()
+        self._shards: List[tuple] = []
+        self._registry_lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _shard(self) -> tuple:
+        """Get (lock, stats) for the calling thread, creating it on first use"""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = (threading.Lock(), ProcessingStats())
+            with self._registry_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+    
+    def record_result(self, result: Any,
+                      latency: Optional[float] = None,
+                      stage_times: Optional[Dict[str, float]] = None):
+        """Record a DetectionResult in the calling thread's shard"""
+        lock, stats = self._shard()
+        with lock:
+            stats.record_result(result, latency, stage_times)
+    
+    def update(self, **values):
+        """Set run-level fields (processing time, flags, counters)"""
+        with self._base_lock:
+            for name, value in values.items():
+                setattr(self._base, name, value)
+    
+    def add_shard(self, stats: ProcessingStats):
+        """Add externally produced statistics (another process or node)"""
+        with self._registry_lock:
+            self._shards.append((threading.Lock(), stats))
+    
+    def snapshot(self) -> ProcessingStats:
+        """
+        Get a consistent, merged copy of the statistics
+        
+        Returns:
+            New ProcessingStats owned by the caller
+        """
+        with self._base_lock:
+            result = self._base.copy()
+        
+        with self._registry_lock:
+            shards = list(self._shards)
+        
+        for lock, stats in shards:
+            with lock:
+                result.merge(stats)
+        
+        return result
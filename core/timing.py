@@ -0,0 +1,74 @@
+"""
+Stage Timing for Wildlife Detector
+Lightweight per-image stage timers and hooks for external metrics systems
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+# hook(image_path, timings) with timings in seconds per stage
+TimingHook = Callable[[str, Dict[str, float]], None]
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per named stage
+    
+    Cheap enough to be always on: one perf_counter() pair per stage.
+    Repeated stages (e.g. several attempts) are summed.
+    """
+    
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+    
+    def add(self, name: str, seconds: float):
+        """Add a measured duration to a stage"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+class TimingHooks:
+    """
+    Registry of callbacks that receive the stage timings of every image
+    
+    Hooks run on the worker thread that finished the image, so they should
+    be fast and thread-safe (e.g. push to a metrics client). Exceptions are
+    logged and never affect processing.
+    """
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._hooks: List[TimingHook] = []
+        self._lock = threading.Lock()
+    
+    def add(self, hook: TimingHook):
+        """Register a hook"""
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+    
+    def remove(self, hook: TimingHook):
+        """Unregister a hook"""
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+    
+    def emit(self, image_path: str, timings: Dict[str, float]):
+        """Call all hooks with the timings of one image"""
+        for hook in self._hooks:
+            try:
+                hook(image_path, dict(timings))
+            except Exception as e:
+                self.logger.warning(f"Timing hook {hook!r} failed: {e}")
+    
+    def __bool__(self) -> bool:
+        return bool(self._hooks)
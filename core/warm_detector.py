@@ -0,0 +1,84 @@
+"""
+Warm Detector Cache for Wildlife Detector
+Keeps one initialized detector per process and reuses it across runs
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .species_detector import SpeciesDetector, create_detector
+
+# Detector settings that require a new detector when they change
+DETECTOR_KEYS = ('country_code', 'timeout', 'batch_size', 'mock_delay', 'model_version')
+
+
+def detector_key(mode: Optional[str], detector_config: Dict[str, Any]) -> Tuple:
+    """Identify the detector a configuration asks for"""
+    return (mode,) + tuple(detector_config.get(name) for name in DETECTOR_KEYS)
+
+
+class DetectorCache:
+    """
+    Process-wide cache of one initialized detector
+    
+    Creating a detector probes the available backends and imports the
+    model packages, which takes seconds. The cache keeps the last detector
+    and hands it out again while the settings that shape it stay the same.
+    Callers asking while a warm-up is still loading wait for it instead of
+    loading a second copy.
+    """
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple] = None
+        self._detector: Optional[SpeciesDetector] = None
+        self.loads = 0
+        self.hits = 0
+    
+    def matches(self, mode: Optional[str], detector_config: Dict[str, Any]) -> bool:
+        """Whether get() would return the cached detector without loading"""
+        return self._detector is not None and self._key == detector_key(mode, detector_config)
+    
+    def get(self, mode: Optional[str], detector_config: Dict[str, Any]) -> SpeciesDetector:
+        """
+        Get a detector for the settings, creating it only if they changed
+        
+        Args:
+            mode: Detection mode (None selects the best available backend)
+            detector_config: Detector configuration
+        
+        Returns:
+            Initialized SpeciesDetector (shared; cancel state is reset)
+        """
+        key = detector_key(mode, detector_config)
+        with self._lock:
+            if self._detector is not None and self._key == key:
+                self.hits += 1
+                self._detector.reset_cancel()
+                return self._detector
+            
+            if self._detector is not None:
+                self.logger.info("Detector settings changed; reinitializing")
+            self._detector = None
+            self._key = None
+            detector = create_detector(mode=mode, config=dict(detector_config))
+            self._detector = detector
+            self._key = key
+            self.loads += 1
+            return detector
+    
+    def clear(self):
+        """Drop the cached detector"""
+        with self._lock:
+            self._detector = None
+            self._key = None
+
+
+_shared_cache = DetectorCache()
+
+
+def shared_detector_cache() -> DetectorCache:
+    """The detector cache shared by the whole process"""
+    return _shared_cache
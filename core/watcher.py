@@ -0,0 +1,506 @@
+"""
+Watch-Folder Ingestion for Wildlife Detector
+Detects newly synced images (inotify or polling), waits for them to settle,
+batches them and runs them through a warm BatchProcessor
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.discovery import normalize_extensions, walk_images
+
+from .stats import LatencyHistogram, ProcessingStats
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT_HEADER = struct.Struct('iIII')
+
+# (path, wall-clock time the change was observed)
+Arrival = Tuple[str, float]
+
+
+def is_image_file(path: str, extensions: Optional[Iterable[str]] = None) -> bool:
+    """Check the extension of a path (case-insensitive, hidden files excluded)"""
+    name = os.path.basename(path)
+    return not name.startswith('.') and name.lower().endswith(normalize_extensions(extensions))
+
+
+def scan_images(directory: str, recursive: bool = True,
+                extensions: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    List the image files currently in a directory tree
+    
+    Uses the discovery walker; files and directories whose names start with
+    a dot (sync tools' temporary and metadata files) are left out.
+    """
+    found = []
+    for entry in walk_images(directory, extensions, recursive):
+        relative = os.path.relpath(entry.path, directory)
+        if not any(part.startswith('.') for part in relative.split(os.sep)):
+            found.append(entry.path)
+    return found
+
+
+class PollingWatcher:
+    """
+    Portable watcher that rescans the tree every poll_interval seconds
+    
+    Files already present when the watcher starts are taken as the
+    baseline and not reported.
+    """
+    
+    backend = 'polling'
+    
+    def __init__(self, directory: str, recursive: bool = True,
+                 extensions: Optional[Iterable[str]] = None,
+                 poll_interval: float = 2.0):
+        self.directory = str(directory)
+        self.recursive = recursive
+        self.extensions = normalize_extensions(extensions)
+        self.poll_interval = poll_interval
+        self._known: Dict[str, Tuple[int, int]] = self._scan()
+        self._next_scan = time.monotonic() + poll_interval
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        signatures = {}
+        for path in scan_images(self.directory, self.recursive, self.extensions):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signatures[path] = (st.st_size, st.st_mtime_ns)
+        return signatures
+    
+    def poll(self, timeout: float) -> List[Arrival]:
+        """
+        Wait up to timeout seconds and return new or changed files
+        
+        Args:
+            timeout: Maximum time to block
+        
+        Returns:
+            List of (path, observed_at) tuples
+        """
+        wait = self._next_scan - time.monotonic()
+        if wait > 0:
+            if wait > timeout:
+                time.sleep(max(0.0, timeout))
+                return []
+            time.sleep(wait)
+        self._next_scan = time.monotonic() + self.poll_interval
+        
+        now = time.time()
+        current = self._scan()
+        changed = [(path, now) for path, sig in current.items() if self._known.get(path) != sig]
+        self._known = current
+        return changed
+    
+    def close(self):
+        """Release resources (nothing to do for polling)"""
+
+
+class InotifyWatcher:
+    """
+    Linux inotify watcher using ctypes (no third-party dependency)
+    
+    Reports a file when it is created, written or moved into the tree; the
+    caller still waits for it to settle, since sync tools may reopen files.
+    New subdirectories are watched as they appear.
+    """
+    
+    backend = 'inotify'
+    
+    def __init__(self, directory: str, recursive: bool = True,
+                 extensions: Optional[Iterable[str]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.directory = str(directory)
+        self.recursive = recursive
+        self.extensions = normalize_extensions(extensions)
+        
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+        
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._watches: Dict[int, str] = {}
+        try:
+            self._add_tree(self.directory)
+        except OSError:
+            self.close()
+            raise
+    
+    def _add_watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed for {directory}: {os.strerror(errno)}")
+        self._watches[wd] = directory
+    
+    def _add_tree(self, directory: str):
+        """Watch a directory (and, if recursive, its subdirectories)"""
+        self._add_watch(directory)
+        if not self.recursive:
+            return
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for d in dirs:
+                self._add_watch(os.path.join(root, d))
+    
+    def poll(self, timeout: float) -> List[Arrival]:
+        """
+        Wait up to timeout seconds and return files that were written
+        
+        Args:
+            timeout: Maximum time to block
+        
+        Returns:
+            List of (path, observed_at) tuples
+        """
+        if self._fd < 0:
+            return []
+        readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+        
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        now = time.time()
+        
+        arrivals = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: report everything and let the caller dedupe
+                self.logger.warning("inotify queue overflow, rescanning watch folder")
+                arrivals.extend((path, now) for path in
+                                scan_images(self.directory, self.recursive, self.extensions))
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            
+            parent = self._watches.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, name)
+            
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith('.'):
+                    # Files may land before the watch exists, so pick them up too
+                    try:
+                        self._add_tree(path)
+                    except OSError as e:
+                        self.logger.warning(f"Cannot watch {path}: {e}")
+                    arrivals.extend((p, now) for p in scan_images(path, True, self.extensions))
+                continue
+            if is_image_file(name, self.extensions):
+                arrivals.append((path, now))
+        return arrivals
+    
+    def close(self):
+        """Close the inotify descriptor"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(directory: str, recursive: bool = True,
+                   extensions: Optional[Iterable[str]] = None,
+                   use_inotify: bool = True,
+                   poll_interval: float = 2.0):
+    """
+    Create the best available watcher for a directory
+    
+    Args:
+        directory: Directory to watch
+        recursive: Also watch subdirectories
+        extensions: Image file extensions to report
+        use_inotify: Try inotify before falling back to polling
+        poll_interval: Rescan interval of the polling fallback
+    
+    Returns:
+        InotifyWatcher or PollingWatcher
+    """
+    if use_inotify:
+        try:
+            return InotifyWatcher(directory, recursive, extensions)
+        except (OSError, AttributeError) as e:
+            logging.getLogger(__name__).info(f"inotify unavailable ({e}), polling every {poll_interval}s")
+    return PollingWatcher(directory, recursive, extensions, poll_interval)
+
+
+@dataclass
+class _Candidate:
+    signature: Optional[Tuple[int, int]]
+    stable_since: float
+    observed_at: float
+
+
+class FileSettler:
+    """
+    Holds arrivals until they stop growing
+    
+    A file is ready once its size and mtime have not changed for
+    settle_seconds. Empty files are kept waiting.
+    """
+    
+    def __init__(self, settle_seconds: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+        self._candidates: Dict[str, _Candidate] = {}
+    
+    def add(self, path: str, observed_at: float):
+        """Register (or refresh) an arrival"""
+        candidate = self._candidates.get(path)
+        if candidate is None:
+            self._candidates[path] = _Candidate(None, self.clock(), observed_at)
+        else:
+            # Another write: the file-close time moves forward
+            candidate.observed_at = max(candidate.observed_at, observed_at)
+    
+    def ready(self) -> List[Arrival]:
+        """Remove and return the files that have settled"""
+        now = self.clock()
+        settled = []
+        for path, candidate in list(self._candidates.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Deleted or renamed away before it settled
+                del self._candidates[path]
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if signature != candidate.signature:
+                if candidate.signature is not None:
+                    candidate.observed_at = max(candidate.observed_at, time.time())
+                candidate.signature = signature
+                candidate.stable_since = now
+            elif st.st_size > 0 and now - candidate.stable_since >= self.settle_seconds:
+                del self._candidates[path]
+                settled.append((path, candidate.observed_at))
+        return settled
+    
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+
+class ArrivalBatcher:
+    """Groups settled files into batches by count or waiting time"""
+    
+    def __init__(self, max_files: int = 32, max_wait: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_files = max(1, max_files)
+        self.max_wait = max_wait
+        self.clock = clock
+        self._pending: List[Arrival] = []
+        self._oldest: Optional[float] = None
+    
+    def add(self, arrivals: Iterable[Arrival]):
+        """Queue settled files"""
+        for arrival in arrivals:
+            if self._oldest is None:
+                self._oldest = self.clock()
+            self._pending.append(arrival)
+    
+    def due(self) -> bool:
+        """Whether a batch should be flushed now"""
+        if not self._pending:
+            return False
+        return len(self._pending) >= self.max_files or self.clock() - self._oldest >= self.max_wait
+    
+    def take(self, force: bool = False) -> List[Arrival]:
+        """Remove and return the next batch (up to max_files) if due or forced"""
+        if not self._pending or not (force or self.due()):
+            return []
+        batch, self._pending = self._pending[:self.max_files], self._pending[self.max_files:]
+        self._oldest = self.clock() if self._pending else None
+        return batch
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class WatchFolderService:
+    """
+    Continuously ingests images that appear in a watch folder
+    
+    The BatchProcessor (and its detector) is initialized once and kept
+    warm across batches. Each batch is appended to the exporter's rolling
+    export, and the latency from file close to result is recorded.
+    """
+    
+    def __init__(self,
+                 processor,
+                 directory: str,
+                 exporter=None,
+                 settle_seconds: float = 2.0,
+                 batch_max_files: int = 32,
+                 batch_max_wait: float = 10.0,
+                 poll_interval: float = 2.0,
+                 recursive: bool = True,
+                 use_inotify: bool = True,
+                 process_existing: bool = False,
+                 on_batch: Optional[Callable[[List, ProcessingStats], None]] = None,
+                 remember_files: int = 100_000):
+        """
+        Initialize service
+        
+        Args:
+            processor: Initialized BatchProcessor
+            directory: Folder to watch
+            exporter: Optional CSVExporter receiving append_results() calls
+            settle_seconds: Time a file must stay unchanged before processing
+            batch_max_files: Flush a batch once this many files are waiting
+            batch_max_wait: Flush a batch once the oldest file waited this long
+            poll_interval: Rescan interval when inotify is unavailable
+            recursive: Watch subdirectories
+            use_inotify: Prefer inotify over polling
+            process_existing: Also process images already in the folder
+            on_batch: Optional callback(results, batch_stats) after each batch
+            remember_files: Processed files remembered to skip unchanged
+                re-reports (least recently processed are forgotten first)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.processor = processor
+        self.directory = str(directory)
+        self.exporter = exporter
+        self.recursive = recursive
+        self.process_existing = process_existing
+        self.on_batch = on_batch
+        self.remember_files = max(1, remember_files)
+        
+        self.watcher = create_watcher(self.directory, recursive, use_inotify=use_inotify,
+                                      poll_interval=poll_interval)
+        self.settler = FileSettler(settle_seconds)
+        self.batcher = ArrivalBatcher(batch_max_files, batch_max_wait)
+        
+        self.stats = ProcessingStats()
+        self.ingest_latency = LatencyHistogram()
+        self.batches = 0
+        self._processed: 'OrderedDict[str, Tuple[int, int]]' = OrderedDict()
+        self._stop = threading.Event()
+    
+    @property
+    def backend(self) -> str:
+        """Name of the watcher backend in use"""
+        return self.watcher.backend
+    
+    def stop(self):
+        """Ask run() to return after the current step"""
+        self._stop.set()
+    
+    def run(self, max_batches: Optional[int] = None):
+        """
+        Watch and process until stop() is called
+        
+        Args:
+            max_batches: Return after this many batches (for tests)
+        """
+        self.logger.info(f"Watching {self.directory} ({self.backend})")
+        if self.process_existing:
+            now = time.time()
+            for path in scan_images(self.directory, self.recursive):
+                self.settler.add(path, now)
+        
+        try:
+            while not self._stop.is_set():
+                self.step()
+                if max_batches is not None and self.batches >= max_batches:
+                    break
+        except KeyboardInterrupt:
+            # Stop the detections of the batch in flight as well
+            self.processor.cancel_processing()
+            raise
+        finally:
+            # Settled files left waiting are not processed on the way out
+            # (Ctrl+C must not start more inference); they stay on disk
+            if len(self.batcher):
+                self.logger.warning(f"Stopped with {len(self.batcher)} settled file(s) not processed")
+            self.watcher.close()
+    
+    def step(self, timeout: float = 0.5):
+        """Collect arrivals for up to timeout seconds and process a due batch"""
+        for path, observed_at in self.watcher.poll(timeout):
+            self.settler.add(path, observed_at)
+        self.batcher.add(a for a in self.settler.ready() if self._is_new(a[0]))
+        batch = self.batcher.take()
+        if batch:
+            self._process(batch)
+    
+    def _is_new(self, path: str) -> bool:
+        """Skip files already processed with the same contents"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return self._processed.get(path) != (st.st_size, st.st_mtime_ns)
+    
+    def _process(self, batch: List[Arrival]):
+        """Run one batch through the warm processor and export it"""
+        if not batch:
+            return
+        closed_at = dict(batch)
+        results = self.processor.process_batch(list(closed_at))
+        batch_stats = self.processor.get_statistics()
+        
+        if self.exporter is not None and results:
+            try:
+                self.exporter.append_results(results)
+            except OSError as e:
+                self.logger.error(f"Failed to append watch results: {e}")
+        
+        done = time.time()
+        for result in results:
+            path = result.image_path
+            try:
+                st = os.stat(path)
+                self._processed[path] = (st.st_size, st.st_mtime_ns)
+                self._processed.move_to_end(path)
+            except OSError:
+                pass
+            if path in closed_at:
+                latency = done - closed_at[path]
+                self.ingest_latency.record(latency)
+                batch_stats.record_latency(latency, 'ingest')
+        
+        while len(self._processed) > self.remember_files:
+            self._processed.popitem(last=False)
+        
+        processing_time = self.stats.processing_time + batch_stats.processing_time
+        self.stats.merge(batch_stats)
+        self.stats.processing_time = processing_time
+        self.batches += 1
+        
+        self.logger.info(f"Watch batch {self.batches}: {len(results)} image(s), "
+                         f"ingest p50 {self.ingest_latency.percentile(50):.2f}s")
+        if self.on_batch:
+            self.on_batch(results, batch_stats)
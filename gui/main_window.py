@@ -17,7 +17,7 @@ from PySide6.QtWidgets import (
     QFileDialog, QMessageBox, QTableWidget, QTableWidgetItem,
     QSpinBox, QDoubleSpinBox, QCheckBox, QComboBox, QGroupBox,
     QSplitter, QFrame, QScrollArea, QApplication, QStatusBar,
-    QMenuBar, QToolBar
+    QMenuBar, QToolBar, QSlider, QInputDialog
 )
 from PySide6.QtCore import Qt, QThread, QTimer, Signal, QSize
 from PySide6.QtGui import QFont, QIcon, QPixmap, QPalette, QColor, QAction
@@ -25,15 +25,50 @@ from PySide6.QtGui import QFont, QIcon, QPixmap, QPalette, QColor, QAction
 from core.config import ConfigManager, AppConfig
 from core.species_detector import SpeciesDetector, DetectionResult
 from core.batch_processor import BatchProcessor, ProcessingStats
+from core.progress import ProgressEvent
+from core.detection_table import DetectionTable
+from core.warm_detector import shared_detector_cache
 from utils.csv_exporter import CSVExporter
 from utils.file_manager import FileManager
+from utils.file_transfer import MODE_LABELS, ORGANIZE_MODES
 
 logger = logging.getLogger(__name__)
 
+# 振り分け方法の選択肢
+ORGANIZE_MODE_CHOICES = {
+    'move': "移動（元の場所からなくなります）",
+    'copy': "コピー（同じ容量をもう一度使います）",
+    'hardlink': "ハードリンク（容量を使いません・同じドライブのみ）",
+    'reflink': "リフリンク（対応ファイルシステムで容量を共有）",
+    'symlink': "シンボリックリンク（元ファイルへの参照）",
+}
+
+
+class DetectorWarmupThread(QThread):
+    """検出器の事前初期化スレッド（起動時・設定変更時）"""
+    
+    warmed_up = Signal(str)  # detection mode
+    warmup_failed = Signal(str)
+    
+    def __init__(self, config: AppConfig):
+        super().__init__()
+        self.config = config
+    
+    def run(self):
+        """共有キャッシュに検出器を読み込む"""
+        try:
+            mode, detector_config = BatchProcessor.detector_settings(self.config.processor_config())
+            detector = shared_detector_cache().get(mode, detector_config)
+            self.warmed_up.emit(detector.mode.value)
+        except Exception as e:
+            logger.error(f"検出器の事前初期化エラー: {str(e)}")
+            self.warmup_failed.emit(str(e))
+
+
 class ProcessingThread(QThread):
     """バッチ処理用スレッド"""
     
-    progress_updated = Signal(int, int, str, str)  # current, total, status, filename
+    progress_event = Signal(object)  # ProgressEvent (rate limited)
     processing_completed = Signal(list, object)  # results, stats
     processing_error = Signal(str)
     
@@ -47,35 +82,27 @@ class ProcessingThread(QThread):
     def run(self):
         """処理実行"""
         try:
-            # Convert AppConfig to dict for BatchProcessor
-            config_dict = {
-                'max_workers': self.config.max_workers,
-                'batch_size': self.config.batch_size,
-                'use_gpu': self.config.use_gpu,
-                'confidence_threshold': self.config.confidence_threshold,
-                'country_code': self.config.country_code,
-                'timeout': self.config.timeout,
-                'max_image_size_mb': self.config.max_image_size_mb
-            }
-            
-            self.processor = BatchProcessor(config_dict)
+            self.processor = BatchProcessor(self.config.processor_config())
             
             # 初期化進捗コールバック
             def init_progress_callback(message):
                 if not self.is_cancelled:
-                    self.progress_updated.emit(0, len(self.image_files), message, "")
+                    self.progress_event.emit(ProgressEvent(0, len(self.image_files), message))
             
             if not self.processor.initialize(init_progress_callback):
                 self.processing_error.emit("バッチ処理器の初期化に失敗しました")
                 return
             
-            # 進捗コールバック設定
-            def progress_callback(current, total, status, filename):
+            # 進捗イベント（BatchProcessor側で間引き済み）
+            def event_callback(event):
                 if not self.is_cancelled:
-                    self.progress_updated.emit(current, total, status, filename)
+                    self.progress_event.emit(event)
             
-            # バッチ処理実行
-            results = self.processor.process_batch(self.image_files, progress_callback)
+            # バッチ処理実行（差分処理では新規・変更ファイルのみ推論）
+            if self.config.incremental:
+                results = self.processor.process_incremental(self.image_files, event_callback=event_callback)
+            else:
+                results = self.processor.process_batch(self.image_files, event_callback=event_callback)
             stats = self.processor.get_statistics()
             
             if not self.is_cancelled:
@@ -109,12 +136,18 @@ class MainWindow(QMainWindow):
         self.image_files = []
         self.results = []
         self.stats = None
+        self.detection_table = None
+        self._table_source = None
         self.processing_thread = None
+        self.warmup_thread = None
         
         # UI初期化
         self.init_ui()
         self.apply_config()
         
+        # 検出器をバックグラウンドで事前に読み込み、実行ごとに再利用
+        self.warm_up_detector()
+        
         logger.info("MainWindow初期化完了")
     
     def init_ui(self):
@@ -345,6 +378,25 @@ class MainWindow(QMainWindow):
         self.gpu_checkbox.setChecked(self.config.use_gpu)
         detection_layout.addWidget(self.gpu_checkbox, 3, 0, 1, 2)
         
+        self.adaptive_workers_checkbox = QCheckBox("ワーカー数を自動調整")
+        self.adaptive_workers_checkbox.setToolTip("処理速度を計測しながらワーカー数を自動で調整し、最適値を次回に引き継ぎます")
+        self.adaptive_workers_checkbox.setChecked(self.config.adaptive_workers)
+        self.adaptive_workers_checkbox.toggled.connect(
+            lambda checked: self.workers_spinbox.setEnabled(not checked)
+        )
+        self.workers_spinbox.setEnabled(not self.config.adaptive_workers)
+        detection_layout.addWidget(self.adaptive_workers_checkbox, 4, 0, 1, 2)
+        
+        self.incremental_checkbox = QCheckBox("差分処理（新規・変更された画像のみ）")
+        self.incremental_checkbox.setToolTip("前回の結果を記録し、変更のない画像は再推論せずに結果を再利用します")
+        self.incremental_checkbox.setChecked(self.config.incremental)
+        detection_layout.addWidget(self.incremental_checkbox, 5, 0, 1, 2)
+        
+        self.dedup_checkbox = QCheckBox("重複画像をまとめて処理")
+        self.dedup_checkbox.setToolTip("内容が完全に同じ画像は1回だけ推論し、結果を他のコピーにも適用します")
+        self.dedup_checkbox.setChecked(self.config.dedup_images)
+        detection_layout.addWidget(self.dedup_checkbox, 6, 0, 1, 2)
+        
         layout.addWidget(detection_group)
         
         # 画像ファイル一覧
@@ -379,6 +431,10 @@ class MainWindow(QMainWindow):
         self.current_file_label.setStyleSheet("color: #666; font-size: 12px;")
         progress_layout.addWidget(self.current_file_label)
         
+        self.eta_label = QLabel("残り時間: -")
+        self.eta_label.setStyleSheet("color: #666; font-size: 12px;")
+        progress_layout.addWidget(self.eta_label)
+        
         layout.addWidget(progress_group)
         
         # 処理ログ
@@ -401,7 +457,8 @@ class MainWindow(QMainWindow):
             ("処理済み画像", "processed"),
             ("検出成功", "success"),
             ("検出失敗", "failed"),
-            ("平均処理時間", "avg_time")
+            ("平均処理時間", "avg_time"),
+            ("処理速度", "throughput")
         ]
         
         for i, (name, key) in enumerate(stats_items):
@@ -431,7 +488,11 @@ class MainWindow(QMainWindow):
             ("検出成功数", "successful_detections"),
             ("総検出数", "total_detections"),
             ("処理時間", "processing_time"),
-            ("平均処理時間", "average_time_per_image")
+            ("平均処理時間", "average_time_per_image"),
+            ("レイテンシ p50", "latency_p50"),
+            ("レイテンシ p90", "latency_p90"),
+            ("レイテンシ p99", "latency_p99"),
+            ("最大レイテンシ", "latency_max")
         ]
         
         for i, (name, key) in enumerate(summary_items):
@@ -466,6 +527,19 @@ class MainWindow(QMainWindow):
         
         results_layout.addLayout(results_btn_layout)
         
+        # 表示しきい値（再推論せずに保存済みの全検出から再計算）
+        threshold_layout = QHBoxLayout()
+        threshold_layout.addWidget(QLabel("表示しきい値:"))
+        self.threshold_slider = QSlider(Qt.Horizontal)
+        self.threshold_slider.setRange(0, 100)
+        self.threshold_slider.setValue(int(round(self.config.confidence_threshold * 100)))
+        self.threshold_slider.setToolTip("信頼度しきい値を変更すると、結果・CSV出力・振り分けに即座に反映されます")
+        self.threshold_slider.valueChanged.connect(self.on_threshold_changed)
+        threshold_layout.addWidget(self.threshold_slider)
+        self.threshold_value_label = QLabel(f"{self.threshold_slider.value() / 100:.2f}")
+        threshold_layout.addWidget(self.threshold_value_label)
+        results_layout.addLayout(threshold_layout)
+        
         # 結果テーブル
         self.results_table = QTableWidget()
         self.results_table.setColumnCount(6)
@@ -603,14 +677,10 @@ class MainWindow(QMainWindow):
         folder = QFileDialog.getExistingDirectory(self, "画像フォルダを選択")
         
         if folder:
-            # フォルダ内の画像ファイルを検索
-            folder_path = Path(folder)
-            supported_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'}
-            
-            found_files = []
-            for file_path in folder_path.rglob('*'):
-                if file_path.suffix.lower() in supported_exts:
-                    found_files.append(str(file_path))
+            # フォルダ内の画像ファイルを検索（os.scandirによる一括走査）
+            found_files = [str(p) for p in FileManager().get_image_files(
+                folder, workers=self.config.discovery_workers,
+                sniff_unknown=self.config.sniff_unknown_extensions)]
             
             if found_files:
                 self.image_files.extend(found_files)
@@ -685,6 +755,7 @@ class MainWindow(QMainWindow):
         
         # ログクリア
         self.log_text.clear()
+        self.eta_label.setText("残り時間: -")
         self.add_log("検出処理を開始します...")
         
         # 処理開始時刻を記録
@@ -692,13 +763,39 @@ class MainWindow(QMainWindow):
         
         # 処理スレッド開始
         self.processing_thread = ProcessingThread(self.image_files, self.config)
-        self.processing_thread.progress_updated.connect(self.update_progress)
+        self.processing_thread.progress_event.connect(self.update_progress_event)
         self.processing_thread.processing_completed.connect(self.processing_completed)
         self.processing_thread.processing_error.connect(self.processing_error)
         self.processing_thread.start()
         
         logger.info("バッチ処理開始")
     
+    def warm_up_detector(self):
+        """検出器の事前初期化（設定が変わっていなければ何もしない）"""
+        if not self.config.warm_detector:
+            return
+        if self.warmup_thread and self.warmup_thread.isRunning():
+            return
+        mode, detector_config = BatchProcessor.detector_settings(self.config.processor_config())
+        if shared_detector_cache().matches(mode, detector_config):
+            return
+        
+        self.status_bar.showMessage("検出器を準備しています...")
+        self.warmup_thread = DetectorWarmupThread(self.config)
+        self.warmup_thread.warmed_up.connect(self.detector_warmed_up)
+        self.warmup_thread.warmup_failed.connect(self.detector_warmup_failed)
+        self.warmup_thread.start()
+    
+    def detector_warmed_up(self, mode: str):
+        """検出器の準備完了"""
+        self.status_bar.showMessage(f"準備完了（検出器: {mode}）")
+        self.add_log(f"検出器を事前に初期化しました ({mode})")
+    
+    def detector_warmup_failed(self, error_message: str):
+        """検出器の事前初期化失敗（処理開始時に再試行）"""
+        self.status_bar.showMessage("準備完了")
+        self.add_log(f"検出器の事前初期化に失敗しました: {error_message}")
+    
     def stop_processing(self):
         """処理停止"""
         if self.processing_thread and self.processing_thread.isRunning():
@@ -724,6 +821,9 @@ class MainWindow(QMainWindow):
         self.config.batch_size = self.batch_size_spinbox.value()
         self.config.max_workers = self.workers_spinbox.value()
         self.config.use_gpu = self.gpu_checkbox.isChecked()
+        self.config.adaptive_workers = self.adaptive_workers_checkbox.isChecked()
+        self.config.incremental = self.incremental_checkbox.isChecked()
+        self.config.dedup_images = self.dedup_checkbox.isChecked()
         self.config.default_output_directory = self.output_path_edit.text()
     
     def update_progress(self, current: int, total: int, status: str, filename: str):
@@ -745,6 +845,21 @@ class MainWindow(QMainWindow):
             avg_time = elapsed_time / current if current > 0 else 0
             self.stats_labels["avg_time"].setText(f"{avg_time:.2f}秒")
     
+    def update_progress_event(self, event: ProgressEvent):
+        """進捗イベント反映"""
+        self.update_progress(event.current, event.total, event.status, event.filename)
+        
+        counts = event.status_counts
+        self.stats_labels["success"].setText(str(counts.get('success', 0)))
+        self.stats_labels["failed"].setText(str(counts.get('failed', 0) + counts.get('skipped', 0)))
+        self.stats_labels["throughput"].setText(f"{event.throughput:.1f}枚/秒")
+        if event.eta is not None:
+            self.update_eta(event.eta.format())
+    
+    def update_eta(self, eta_text: str):
+        """残り時間更新"""
+        self.eta_label.setText(f"残り時間: {eta_text}")
+    
     def processing_completed(self, results: List[DetectionResult], stats: ProcessingStats):
         """処理完了"""
         self.results = results
@@ -770,6 +885,27 @@ class MainWindow(QMainWindow):
         
         QMessageBox.information(self, "処理完了", message)
         
+        if stats_dict['adaptive_concurrency']:
+            self.add_log(f"自動調整されたワーカー数: {stats_dict['concurrency_level']}")
+        if stats_dict['memory_throttle_events']:
+            self.add_log(f"メモリ制限により {stats_dict['memory_throttle_events']} 回一時停止しました "
+                         f"(合計 {stats_dict['memory_throttled_time']:.1f}秒, "
+                         f"ピーク {stats_dict['peak_memory_mb']:.0f}MB)")
+        if stats_dict['quarantined_images'] or stats_dict['skipped_images']:
+            self.add_log(f"再試行: {stats_dict['retries']} 回, 隔離: {stats_dict['quarantined_images']} 枚, "
+                         f"隔離済みのためスキップ: {stats_dict['skipped_images']} 枚")
+        if stats_dict['hedges_started']:
+            self.add_log(f"遅延画像の再実行: {stats_dict['hedges_started']} 件 "
+                         f"(再実行側が先に完了: {stats_dict['hedges_won']} 件)")
+        if stats_dict['reused_results']:
+            self.add_log(f"差分処理: 変更のない {stats_dict['reused_results']} 枚は前回の結果を再利用しました")
+        if stats_dict['rejected_files']:
+            reasons = ", ".join(f"{reason}: {count}" for reason, count
+                                in sorted(stats_dict['rejection_reasons'].items()))
+            self.add_log(f"破損・空・サムネイル等のため処理前に除外: {stats_dict['rejected_files']} 件 ({reasons})")
+        if stats_dict['duplicate_images']:
+            self.add_log(f"重複画像: {stats_dict['duplicate_images']} 枚に結果を共有しました "
+                         f"(推論を省略した容量 {stats_dict['duplicate_bytes'] / (1024 * 1024):.1f}MB)")
         self.add_log("処理が完了しました")
         logger.info("バッチ処理完了")
     
@@ -790,16 +926,31 @@ class MainWindow(QMainWindow):
         if not self.results or not self.stats:
             return
         
+        # しきい値の適用はDetectionTableでベクトル化（結果セットごとに一度だけ構築）
+        if self.detection_table is None or self._table_source is not self.results:
+            self.detection_table = DetectionTable(self.results)
+            self._table_source = self.results
+        table = self.detection_table
+        threshold = self.display_threshold
+        counts = table.counts(threshold)
+        best = table.best(threshold)
+        
         # サマリー更新
         stats_dict = self.stats.to_dict()
         self.summary_labels["total_images"].setText(str(stats_dict['total_images']))
         self.summary_labels["processed_images"].setText(str(stats_dict['processed_images']))
         self.summary_labels["successful_detections"].setText(str(stats_dict['successful_detections']))
-        self.summary_labels["total_detections"].setText(str(stats_dict['total_detections']))
+        self.summary_labels["total_detections"].setText(str(table.total_detections(threshold)))
         self.summary_labels["processing_time"].setText(f"{stats_dict['processing_time']:.2f}秒")
         self.summary_labels["average_time_per_image"].setText(f"{stats_dict['average_time_per_image']:.3f}秒")
         
+        latency = stats_dict['latency']
+        for key in ('p50', 'p90', 'p99', 'max'):
+            text = f"{latency[key]:.2f}秒" if latency['count'] else "-"
+            self.summary_labels[f"latency_{key}"].setText(text)
+        
         # 結果テーブル更新
+        self.results_table.setUpdatesEnabled(False)
         self.results_table.setRowCount(len(self.results))
         for i, result in enumerate(self.results):
             path = Path(result.image_path)
@@ -808,15 +959,15 @@ class MainWindow(QMainWindow):
             self.results_table.setItem(i, 0, QTableWidgetItem(path.name))
             
             # 検出数
-            detection_count = len(result.detections)
+            detection_count = int(counts[i])
             self.results_table.setItem(i, 1, QTableWidgetItem(str(detection_count)))
             
             # 種名（最も信頼度の高いもの）
-            if result.detections:
-                best = result.get_best_detection()
-                species_name = best['common_name'] if best else "不明"
-                confidence = best['confidence'] if best else 0.0
-                category = best['category'] if best else "不明"
+            best_detection = table.best_detection(i, threshold, best)
+            if best_detection:
+                species_name = best_detection.get('common_name', "不明")
+                confidence = best_detection.get('confidence', 0.0)
+                category = best_detection.get('category', "不明")
             else:
                 species_name = "検出なし"
                 confidence = 0.0
@@ -826,9 +977,11 @@ class MainWindow(QMainWindow):
             self.results_table.setItem(i, 3, QTableWidgetItem(f"{confidence:.3f}"))
             self.results_table.setItem(i, 4, QTableWidgetItem(category))
             self.results_table.setItem(i, 5, QTableWidgetItem(f"{result.processing_time:.2f}秒"))
+        self.results_table.setUpdatesEnabled(True)
         
         # 種別統計テーブル更新
-        species_counts = stats_dict.get('species_counts', {})
+        species_counts = table.species_counts(threshold)
+        mean_confidence = table.species_mean_confidence(threshold)
         self.species_table.setRowCount(len(species_counts))
         
         for i, (species, count) in enumerate(sorted(species_counts.items(), 
@@ -837,16 +990,19 @@ class MainWindow(QMainWindow):
             self.species_table.setItem(i, 0, QTableWidgetItem(species))
             self.species_table.setItem(i, 1, QTableWidgetItem(str(count)))
             
-            # 平均信頼度計算（簡易版）
-            confidences = []
-            for result in self.results:
-                for detection in result.detections:
-                    if detection['common_name'] == species:
-                        confidences.append(detection['confidence'])
-            
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            avg_confidence = mean_confidence.get(species, 0.0)
             self.species_table.setItem(i, 2, QTableWidgetItem(f"{avg_confidence:.3f}"))
     
+    @property
+    def display_threshold(self) -> float:
+        """結果表示・出力・振り分けに使う信頼度しきい値"""
+        return self.threshold_slider.value() / 100
+    
+    def on_threshold_changed(self, value: int):
+        """しきい値スライダー変更（再推論なしで即時反映）"""
+        self.threshold_value_label.setText(f"{value / 100:.2f}")
+        self.update_results_display()
+    
     def export_csv(self):
         """CSV出力"""
         if not self.results:
@@ -857,7 +1013,8 @@ class MainWindow(QMainWindow):
             output_dir = self.output_path_edit.text() or str(Path.home() / "WildlifeDetector")
             exporter = CSVExporter(output_dir)
             
-            output_files = exporter.export_all(self.results, self.stats)
+            output_files = exporter.export_all(self.results, self.stats,
+                                               confidence_threshold=self.display_threshold)
             
             message = "CSV出力が完了しました！\n\n"
             for file_type, file_path in output_files.items():
@@ -881,16 +1038,21 @@ class MainWindow(QMainWindow):
             output_dir = self.output_path_edit.text() or str(Path.home() / "WildlifeDetector")
             file_manager = FileManager(output_dir)
             
-            # 確認ダイアログ
-            reply = QMessageBox.question(
-                self, 
+            # 振り分け方法の選択（リンク系は非対応の場合コピーに切り替わります）
+            choices = [ORGANIZE_MODE_CHOICES[mode] for mode in ORGANIZE_MODES]
+            current = self.config.organize_mode if self.config.organize_mode in ORGANIZE_MODES else 'move'
+            choice, accepted = QInputDialog.getItem(
+                self,
                 "ファイル振り分け確認",
-                "画像ファイルを種別フォルダに振り分けますか？\n\n"
-                "※ファイルは移動されます（元の場所からなくなります）",
-                QMessageBox.Yes | QMessageBox.No
+                "画像ファイルを種別フォルダに振り分けますか？\n\n振り分け方法:",
+                choices,
+                ORGANIZE_MODES.index(current),
+                False
             )
             
-            if reply == QMessageBox.Yes:
+            if accepted:
+                mode = ORGANIZE_MODES[choices.index(choice)]
+                self.config.organize_mode = mode
                 # 出力ディレクトリを指定
                 output_dir = QFileDialog.getExistingDirectory(
                     self, 
@@ -901,22 +1063,27 @@ class MainWindow(QMainWindow):
                 if not output_dir:
                     return
                 
-                confidence_threshold = self.confidence_spinbox.value()
+                confidence_threshold = self.display_threshold
                 result = file_manager.organize_images_by_species(
                     self.results,
                     output_base=output_dir,
-                    copy_files=False,  # 移動モードに変更
-                    confidence_threshold=confidence_threshold
+                    confidence_threshold=confidence_threshold,
+                    mode=mode
                 )
                 
                 if result['success']:
                     message = (f"ファイル振り分けが完了しました！\n\n"
                               f"処理済み: {result['processed_images']}/{result['total_images']}\n"
                               f"種別フォルダ数: {len(result['species_folders'])}\n"
+                              f"方法: {MODE_LABELS[mode]}\n"
                               f"出力ディレクトリ: {Path(result['output_directory']).name}")
                     
                     QMessageBox.information(self, "振り分け完了", message)
                     self.add_log("ファイル振り分けが完了しました")
+                    fallbacks = {m: c for m, c in result['methods'].items() if m not in (mode, 'rename')}
+                    if fallbacks:
+                        used = ", ".join(f"{m}: {c}" for m, c in sorted(fallbacks.items()))
+                        self.add_log(f"{MODE_LABELS[mode]}に非対応のため別の方法で配置: {used}")
                 else:
                     QMessageBox.critical(self, "振り分けエラー", f"振り分け中にエラーが発生しました:\n\n{result.get('error', '不明なエラー')}")
         
@@ -951,6 +1118,7 @@ class MainWindow(QMainWindow):
             if self.config_manager.save_config():
                 QMessageBox.information(self, "設定保存", "設定が保存されました。")
                 self.add_log("設定が保存されました")
+                self.warm_up_detector()
             else:
                 QMessageBox.warning(self, "設定保存エラー", "設定の保存に失敗しました。")
         
@@ -973,6 +1141,7 @@ class MainWindow(QMainWindow):
                 self.apply_config()
                 QMessageBox.information(self, "設定リセット", "設定がデフォルトにリセットされました。")
                 self.add_log("設定がリセットされました")
+                self.warm_up_detector()
     
     def import_csv_results(self):
         """CSVファイルから検出結果を読み込み"""
@@ -1126,6 +1295,10 @@ class MainWindow(QMainWindow):
             # 処理停止
             self.stop_processing()
         
+        # 事前初期化中なら完了を待つ
+        if self.warmup_thread and self.warmup_thread.isRunning():
+            self.warmup_thread.wait(5000)
+        
         # 設定保存
         self.config.window_width = self.width()
         self.config.window_height = self.height()
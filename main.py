@@ -21,16 +21,34 @@ if sys.version_info < (3, 12):
     sys.exit(1)
 
 
+def build_processor_config(app_config, confidence, adaptive_workers=False):
+    """Build the BatchProcessor configuration used by the CLI modes"""
+    processor_config = app_config.processor_config()
+    processor_config['confidence_threshold'] = confidence
+    processor_config['adaptive_workers'] = adaptive_workers or app_config.adaptive_workers
+    return processor_config
+
+
 @click.command()
 @click.option('--gui/--no-gui', default=True, help='Launch GUI mode (default) or CLI mode')
 @click.option('--image', type=click.Path(exists=True), help='Process a single image (CLI mode)')
 @click.option('--batch', type=click.Path(exists=True), help='Process a folder of images (CLI mode)')
+@click.option('--watch', type=click.Path(exists=True, file_okay=False),
+              help='Watch a folder and process new images as they arrive (CLI mode)')
+@click.option('--queue', type=click.Path(file_okay=False),
+              help='Shared work-queue directory for multi-node runs (with --batch: create the job)')
+@click.option('--serve', is_flag=True, help='Run the local detection HTTP service (CLI mode)')
+@click.option('--port', type=int, help='Port for --serve (default: service_port in the config)')
 @click.option('--output', type=click.Path(), help='Output directory for results')
 @click.option('--config', type=click.Path(exists=True), help='Configuration file path')
 @click.option('--confidence', type=float, default=0.5, help='Confidence threshold (0.0-1.0)')
+@click.option('--adaptive-workers', is_flag=True, help='Tune the worker count automatically (batch mode)')
+@click.option('--incremental', is_flag=True, help='Only process new or changed images, reusing earlier results (batch mode)')
+@click.option('--dedup', is_flag=True, help='Infer byte-identical images once and share the result (batch mode)')
+@click.option('--retry-quarantined', is_flag=True, help='Release quarantined images and process them again')
 @click.option('--debug', is_flag=True, help='Enable debug mode')
 @click.version_option(version='2.0.0')
-def main(gui, image, batch, output, config, confidence, debug):
+def main(gui, image, batch, watch, queue, serve, port, output, config, confidence, adaptive_workers, incremental, dedup, retry_quarantined, debug):
     """Wildlife Detector AI - AI-powered wildlife species detection"""
     
     # Setup logging
@@ -44,7 +62,7 @@ def main(gui, image, batch, output, config, confidence, debug):
     if debug:
         logger.debug("Debug mode enabled")
     
-    if gui and not (image or batch):
+    if gui and not (image or batch or watch or queue or serve):
         # GUI mode
         try:
             from PySide6.QtWidgets import QApplication
@@ -128,11 +146,116 @@ def main(gui, image, batch, output, config, confidence, debug):
             print(f"❌ Error: {e}")
             sys.exit(1)
         
+    elif serve:
+        # Local detection service (CLI mode): warm detector behind an HTTP API
+        processor = None
+        try:
+            from core.batch_processor import BatchProcessor
+            from core.config import ConfigManager
+            from service.server import serve as run_service
+            
+            # Load configuration
+            config_manager = ConfigManager(config)
+            app_config = config_manager.get_config()
+            app_config.confidence_threshold = confidence
+            
+            processor = BatchProcessor(build_processor_config(app_config, confidence, adaptive_workers))
+            if not processor.initialize():
+                print("❌ Failed to initialize processor")
+                sys.exit(1)
+            
+            host = app_config.service_host
+            port = port or app_config.service_port
+            print(f"🌐 Detection service on http://{host}:{port} "
+                  f"(micro-batches of up to {app_config.service_max_batch_size}, "
+                  f"{app_config.service_max_delay * 1000:.0f}ms; Ctrl+C to stop)")
+            try:
+                run_service(processor, host, port,
+                            max_batch_size=app_config.service_max_batch_size,
+                            max_delay=app_config.service_max_delay)
+            except KeyboardInterrupt:
+                print("\n⏹ Stopping detection service...")
+            
+        except Exception as e:
+            logger.error(f"Detection service error: {e}")
+            print(f"\n❌ Error: {e}")
+            sys.exit(1)
+        
+        finally:
+            if processor is not None:
+                processor.cleanup()
+        
+    elif queue:
+        # Multi-node processing through a shared work-queue directory (CLI mode)
+        processor = None
+        try:
+            import time
+            from core.batch_processor import BatchProcessor
+            from core.config import ConfigManager
+            from core.distributed import WorkQueue
+            from utils.file_manager import FileManager
+            from utils.csv_exporter import CSVExporter
+            
+            # Load configuration
+            config_manager = ConfigManager(config)
+            app_config = config_manager.get_config()
+            app_config.confidence_threshold = confidence
+            
+            work_queue = WorkQueue(queue, lease_timeout=app_config.lease_timeout)
+            if batch and not work_queue.exists:
+                # Coordinator: paths must be valid on every node (same NAS mount)
+                image_files = [os.path.abspath(str(f)) for f in FileManager().get_image_files(
+                    batch, workers=app_config.discovery_workers,
+                    sniff_unknown=app_config.sniff_unknown_extensions)]
+                if not image_files:
+                    print(f"❌ No image files found in: {batch}")
+                    sys.exit(1)
+                leases = work_queue.create(image_files, app_config.lease_size)
+                print(f"📁 Queued {len(image_files)} images as {leases} lease(s) in {queue}")
+            elif not work_queue.exists:
+                print(f"⏳ Waiting for a job in {queue}...")
+                while not work_queue.exists:
+                    time.sleep(2.0)
+            
+            processor = BatchProcessor(build_processor_config(app_config, confidence, adaptive_workers))
+            if not processor.initialize():
+                print("❌ Failed to initialize processor")
+                sys.exit(1)
+            
+            print(f"🔄 Node {work_queue.node_id} working on {queue}...")
+            node_results = processor.process_distributed(queue, work_queue.node_id)
+            node_stats = processor.get_statistics()
+            print(f"\n✅ Node finished: {len(node_results)} images processed here "
+                  f"({node_stats.processing_time:.2f}s)")
+            
+            # Merge all result shards once every lease is done
+            if output:
+                if not work_queue.finished:
+                    print("⚠️ Other nodes still hold leases; merge skipped")
+                else:
+                    results, stats = work_queue.merge()
+                    output_path = Path(output)
+                    output_path.mkdir(parents=True, exist_ok=True)
+                    files = CSVExporter(str(output_path)).export_all(results, stats)
+                    print(f"\n📄 Merged {len(results)} results saved to: {output}")
+                    for file_type, file_path in files.items():
+                        print(f"   - {Path(file_path).name}")
+            
+        except Exception as e:
+            logger.error(f"Distributed processing error: {e}")
+            print(f"\n❌ Error: {e}")
+            sys.exit(1)
+        
+        finally:
+            if processor is not None:
+                processor.cleanup()
+        
     elif batch:
         # Batch processing (CLI mode)
         try:
             from core.batch_processor import BatchProcessor
             from core.config import ConfigManager
+            from utils.discovery import DiscoveryFeed
             from utils.file_manager import FileManager
             from utils.csv_exporter import CSVExporter
             
@@ -143,41 +266,62 @@ def main(gui, image, batch, output, config, confidence, debug):
             app_config = config_manager.get_config()
             app_config.confidence_threshold = confidence
             
-            # Get image files
-            file_manager = FileManager()
-            image_files = file_manager.get_image_files(batch)
-            
-            if not image_files:
-                print(f"❌ No image files found in: {batch}")
-                sys.exit(1)
-                
-            print(f"📁 Found {len(image_files)} image files")
+            # Incremental runs, deduplication and non-path scheduling need the
+            # whole list up front; otherwise discovery streams into the
+            # pipeline and runs while the detector initializes
+            use_incremental = incremental or app_config.incremental
+            app_config.dedup_images = dedup or app_config.dedup_images
+            streaming = (not use_incremental and not app_config.dedup_images
+                         and app_config.scheduling_policy == 'path')
+            feed = None
+            if streaming:
+                feed = DiscoveryFeed(batch, workers=app_config.discovery_workers,
+                                     sniff_unknown=app_config.sniff_unknown_extensions)
+                print(f"📁 Discovering images in {batch}...")
+            else:
+                image_files = FileManager().get_image_files(
+                    batch, workers=app_config.discovery_workers,
+                    sniff_unknown=app_config.sniff_unknown_extensions)
+                if not image_files:
+                    print(f"❌ No image files found in: {batch}")
+                    sys.exit(1)
+                print(f"📁 Found {len(image_files)} image files")
             
             # Create batch processor
-            processor_config = {
-                'max_workers': app_config.max_workers,
-                'batch_size': app_config.batch_size,
-                'use_gpu': app_config.use_gpu,
-                'confidence_threshold': confidence,
-                'country_code': app_config.country_code,
-                'timeout': app_config.timeout,
-                'max_image_size_mb': app_config.max_image_size_mb
-            }
+            processor_config = build_processor_config(app_config, confidence, adaptive_workers)
             
             processor = BatchProcessor(processor_config)
+            if retry_quarantined and processor.quarantine is not None:
+                released = processor.quarantine.clear()
+                print(f"🔓 Released {released} quarantined image(s)")
             
             # Initialize processor
             if not processor.initialize():
                 print("❌ Failed to initialize processor")
                 sys.exit(1)
                 
-            # Process batch with progress callback
-            def progress_callback(current, total, status, filename):
-                percentage = (current / total * 100) if total > 0 else 0
-                print(f"\r⏳ {status}: {current}/{total} ({percentage:.1f}%) - {filename}", end='', flush=True)
+            # Process batch with rate-limited progress events
+            def show_progress(event):
+                eta = event.eta.format() if event.eta else "-"
+                total = f"~{event.total}" if event.total_estimated else f"{event.total}"
+                print(f"\r⏳ {event.status}: {event.current}/{total} ({event.percentage:.1f}%) "
+                      f"{event.throughput:.1f} img/s ETA {eta} - {event.filename}",
+                      end='', flush=True)
             
             print("\n🔄 Processing images...")
-            results = processor.process_batch([str(f) for f in image_files], progress_callback)
+            if streaming:
+                try:
+                    results = processor.process_stream(feed, feed.estimate_total, event_callback=show_progress)
+                finally:
+                    feed.stop()
+                if not feed.found:
+                    print(f"\n❌ No image files found in: {batch}")
+                    sys.exit(1)
+            elif use_incremental:
+                results = processor.process_incremental([str(f) for f in image_files], root=batch,
+                                                        event_callback=show_progress)
+            else:
+                results = processor.process_batch([str(f) for f in image_files], event_callback=show_progress)
             stats = processor.get_statistics()
             
             # Display results
@@ -189,6 +333,40 @@ def main(gui, image, batch, output, config, confidence, debug):
             print(f"   Total detections: {stats_dict['total_detections']}")
             print(f"   Processing time: {stats_dict['processing_time']:.2f}s")
             print(f"   Average time/image: {stats_dict['average_time_per_image']:.3f}s")
+            latency = stats_dict['latency']
+            if latency['count']:
+                print(f"   Latency p50/p90/p99/max: {latency['p50']:.2f}s / {latency['p90']:.2f}s / "
+                      f"{latency['p99']:.2f}s / {latency['max']:.2f}s")
+                for stage, stage_stats in sorted(stats_dict['stage_latency'].items()):
+                    print(f"     - {stage}: p50 {stage_stats['p50']:.2f}s, p99 {stage_stats['p99']:.2f}s, "
+                          f"max {stage_stats['max']:.2f}s")
+            io_wait = stats_dict['stage_latency'].get('io_wait')
+            if io_wait:
+                compute = stats_dict['stage_latency'].get('detect', {}).get('total', 0.0)
+                print(f"   I/O wait vs compute: {io_wait['total']:.2f}s / {compute:.2f}s")
+            if stats_dict['adaptive_concurrency']:
+                print(f"   Workers (adaptive): {stats_dict['concurrency_level']}")
+            if stats_dict['memory_throttle_events']:
+                print(f"   Memory throttling: {stats_dict['memory_throttle_events']} time(s), "
+                      f"{stats_dict['memory_throttled_time']:.1f}s paused "
+                      f"(peak {stats_dict['peak_memory_mb']:.0f}MB)")
+            if stats_dict['retries'] or stats_dict['quarantined_images'] or stats_dict['skipped_images']:
+                print(f"   Retries: {stats_dict['retries']}, newly quarantined: "
+                      f"{stats_dict['quarantined_images']}, skipped (quarantined): "
+                      f"{stats_dict['skipped_images']}")
+            if stats_dict['hedges_started']:
+                print(f"   Hedged stragglers: {stats_dict['hedges_started']} "
+                      f"(duplicate won {stats_dict['hedges_won']})")
+            if stats_dict['reused_results']:
+                print(f"   Reused (unchanged): {stats_dict['reused_results']}, "
+                      f"inferred: {stats_dict['inferred_images']}")
+            if stats_dict['rejected_files']:
+                reasons = ', '.join(f"{reason} {count}" for reason, count
+                                    in sorted(stats_dict['rejection_reasons'].items()))
+                print(f"   Rejected before processing: {stats_dict['rejected_files']} ({reasons})")
+            if stats_dict['duplicate_images']:
+                print(f"   Duplicates (result shared): {stats_dict['duplicate_images']}, "
+                      f"{stats_dict['duplicate_bytes'] / (1024 * 1024):.1f}MB not processed")
             
             # Species summary
             if stats_dict['species_counts']:
@@ -216,6 +394,75 @@ def main(gui, image, batch, output, config, confidence, debug):
             print(f"\n❌ Error: {e}")
             sys.exit(1)
         
+    elif watch:
+        # Watch-folder mode (CLI): ingest new images until interrupted
+        processor = None
+        try:
+            from core.batch_processor import BatchProcessor
+            from core.config import ConfigManager
+            from core.watcher import WatchFolderService
+            from utils.csv_exporter import CSVExporter
+            
+            # Load configuration
+            config_manager = ConfigManager(config)
+            app_config = config_manager.get_config()
+            app_config.confidence_threshold = confidence
+            
+            processor = BatchProcessor(build_processor_config(app_config, confidence, adaptive_workers))
+            if retry_quarantined and processor.quarantine is not None:
+                released = processor.quarantine.clear()
+                print(f"🔓 Released {released} quarantined image(s)")
+            
+            # The detector stays initialized (warm) for the whole session
+            if not processor.initialize():
+                print("❌ Failed to initialize processor")
+                sys.exit(1)
+            
+            output_dir = output or app_config.default_output_directory
+            exporter = CSVExporter(output_dir)
+            
+            def show_batch(results, batch_stats):
+                ok = sum(1 for r in results if r.success)
+                ingest = batch_stats.stage_latency.get('ingest')
+                latency = f", close→result p50 {ingest.percentile(50):.2f}s" if ingest else ""
+                print(f"📥 {len(results)} new image(s): {ok} successful{latency}")
+            
+            service = WatchFolderService(
+                processor, watch, exporter,
+                settle_seconds=app_config.watch_settle_seconds,
+                batch_max_files=app_config.watch_batch_size,
+                batch_max_wait=app_config.watch_batch_wait,
+                poll_interval=app_config.watch_poll_interval,
+                on_batch=show_batch
+            )
+            print(f"👀 Watching {watch} ({service.backend}), results → {output_dir} (Ctrl+C to stop)")
+            
+            try:
+                service.run()
+            except KeyboardInterrupt:
+                print("\n⏹ Stopping watch mode...")
+            
+            # Session summary
+            stats_dict = service.stats.to_dict()
+            print("\n✅ Watch session finished")
+            print(f"   Batches: {service.batches}")
+            print(f"   Processed: {stats_dict['processed_images']}")
+            print(f"   Successful: {stats_dict['successful_detections']}")
+            print(f"   Total detections: {stats_dict['total_detections']}")
+            ingest = service.ingest_latency
+            if ingest.count:
+                print(f"   Close→result latency p50/p90/p99/max: {ingest.percentile(50):.2f}s / "
+                      f"{ingest.percentile(90):.2f}s / {ingest.percentile(99):.2f}s / {ingest.max:.2f}s")
+            
+        except Exception as e:
+            logger.error(f"Watch mode error: {e}")
+            print(f"\n❌ Error: {e}")
+            sys.exit(1)
+        
+        finally:
+            if processor is not None:
+                processor.cleanup()
+        
     else:
         # Show help if no valid options
         ctx = click.get_current_context()
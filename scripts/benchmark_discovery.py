@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Wildlife Detector AI - Image Discovery Benchmark
+Compares the old rglob-per-extension listing with the os.scandir walker on a synthetic tree
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.discovery import walk_images
+
+EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
+
+
+def legacy_get_image_files(directory: Path, recursive: bool = True):
+    """Previous FileManager.get_image_files: two rglob walks per extension"""
+    image_files = []
+    glob_func = directory.rglob if recursive else directory.glob
+    for ext in EXTENSIONS:
+        image_files.extend(glob_func(f'*{ext}'))
+        image_files.extend(glob_func(f'*{ext.upper()}'))
+    return sorted(set(image_files))
+
+
+def create_tree(root: Path, cameras: int, days: int, files_per_day: int, seed: int) -> int:
+    """Create empty files laid out like camera/day folders, with some non-image clutter"""
+    rng = random.Random(seed)
+    images = 0
+    for camera in range(cameras):
+        for day in range(days):
+            folder = root / f"camera_{camera:03d}" / f"2024-{day // 28 + 1:02d}-{day % 28 + 1:02d}"
+            folder.mkdir(parents=True)
+            for index in range(files_per_day):
+                roll = rng.random()
+                if roll < 0.85:
+                    name = f"IMG_{index:05d}.JPG"
+                    images += 1
+                elif roll < 0.9:
+                    name = f"IMG_{index:05d}.jpg"
+                    images += 1
+                elif roll < 0.95:
+                    name = f"VID_{index:05d}.MP4"
+                else:
+                    name = f"IMG_{index:05d}.THM"
+                (folder / name).touch()
+    return images
+
+
+def best_time(function, repeat: int):
+    """Run a function repeat times; return (best seconds, last result)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--root', help='Directory to create the tree in (e.g. on the NAS to test)')
+    parser.add_argument('--cameras', type=int, default=20)
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--files', type=int, default=50, help='Files per day folder')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help='Keep the synthetic tree')
+    args = parser.parse_args()
+    
+    root = Path(tempfile.mkdtemp(prefix='discovery_bench_', dir=args.root))
+    try:
+        total = args.cameras * args.days * args.files
+        print(f"📁 Creating {total} files in {args.cameras * args.days} folders under {root} ...")
+        images = create_tree(root, args.cameras, args.days, args.files, args.seed)
+        
+        legacy_time, legacy = best_time(lambda: legacy_get_image_files(root), args.repeat)
+        print(f"   rglob x12          {legacy_time:7.3f}s  ({len(legacy)} images)")
+        
+        runs = [('scandir', 1, False), (f'scandir x{args.workers}', args.workers, False),
+                (f'scandir x{args.workers} +stat', args.workers, True)]
+        for label, workers, with_stat in runs:
+            elapsed, entries = best_time(
+                lambda: walk_images(root, workers=workers, with_stat=with_stat), args.repeat)
+            same = [Path(e.path) for e in entries] == legacy
+            print(f"   {label:<18} {elapsed:7.3f}s  ({len(entries)} images, "
+                  f"{legacy_time / elapsed:5.1f}x, same list: {'yes' if same else 'NO'})")
+        
+        if len(legacy) != images:
+            print(f"\n⚠️ Expected {images} images")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Wildlife Detector AI - Content Hashing Benchmark
+Compares the old 4 KB SHA-256 loop with bulk hashing (parallel, fast hash, warm cache)
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.file_manager import FileManager
+from utils.hashing import ALGORITHM_FAST, ALGORITHM_SHA256, algorithm_name
+
+
+def legacy_get_file_hash(file_path) -> str:
+    """Previous FileManager.get_file_hash: SHA-256 over 4 KB reads"""
+    hash_sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+def create_files(root: Path, count: int, size_mb: float) -> list:
+    """Create files of random contents, like camera JPEGs"""
+    size = int(size_mb * 1024 * 1024)
+    paths = []
+    for index in range(count):
+        path = root / f"IMG_{index:05d}.JPG"
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--root', help='Directory to create the files in (e.g. on the NAS to test)')
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--size-mb', type=float, default=4.0)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--keep', action='store_true', help='Keep the generated files')
+    args = parser.parse_args()
+    
+    root = Path(tempfile.mkdtemp(prefix='hashing_bench_', dir=args.root))
+    try:
+        print(f"📁 Creating {args.files} files of {args.size_mb:.1f}MB under {root} ...")
+        paths = create_files(root, args.files, args.size_mb)
+        total_mb = args.files * args.size_mb
+        
+        legacy_time, legacy = timed(lambda: [legacy_get_file_hash(p) for p in paths])
+        print(f"   sha256 4KB loop         {legacy_time:7.3f}s  ({total_mb / legacy_time:7.0f} MB/s)")
+        
+        manager = FileManager(hash_cache=root / 'hashes.sqlite')
+        runs = [('sha256 x1', ALGORITHM_SHA256, 1),
+                (f'sha256 x{args.workers}', ALGORITHM_SHA256, args.workers),
+                (f'fast ({algorithm_name(ALGORITHM_FAST)}) x{args.workers}', ALGORITHM_FAST, args.workers)]
+        for label, algorithm, workers in runs:
+            manager.hash_cache.close()
+            os.remove(root / 'hashes.sqlite')
+            manager = FileManager(hash_cache=root / 'hashes.sqlite')
+            elapsed, digests = timed(lambda: manager.hash_files(paths, algorithm, workers))
+            same = algorithm != ALGORITHM_SHA256 or [digests[p] for p in paths] == legacy
+            print(f"   {label:<23} {elapsed:7.3f}s  ({total_mb / elapsed:7.0f} MB/s, "
+                  f"{legacy_time / elapsed:5.1f}x, same digests: {'yes' if same else 'NO'})")
+        
+        elapsed, _ = timed(lambda: manager.hash_files(paths, ALGORITHM_FAST, args.workers))
+        print(f"   cached (unchanged)      {elapsed:7.3f}s  ({legacy_time / elapsed:5.0f}x)")
+        manager.close()
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Wildlife Detector AI v2.0
+Service package for the local detection HTTP API
+"""
+
+from .server import DetectionService, MicroBatcher, serve
+from .client import DetectionClient, ServiceError
+
+__all__ = [
+    "DetectionService",
+    "MicroBatcher",
+    "serve",
+    "DetectionClient",
+    "ServiceError",
+]
@@ -0,0 +1,218 @@
+"""
+Detection Service Client for Wildlife Detector
+Python client for the local detection HTTP API with connection pooling
+"""
+
+import http.client
+import json
+import logging
+import queue
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import urlencode, urlparse
+
+from core.species_detector import DetectionResult
+
+# Requests that may be sent again when the connection drops before the reply
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+
+class ServiceError(Exception):
+    """Error response from the detection service"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class DetectionClient:
+    """
+    Client for DetectionService
+    
+    Keeps a pool of keep-alive connections so many threads can share one
+    client without paying a TCP handshake per request. Connections are
+    reused most-recently-returned first; a connection the server has
+    closed is reopened once transparently when the request could not be
+    sent or is idempotent. Other requests (e.g. POST /v1/batch) are not
+    repeated, since the server may already have acted on them.
+    """
+    
+    def __init__(self, base_url: str = 'http://127.0.0.1:8765',
+                 pool_size: int = 4,
+                 timeout: float = 120.0):
+        """
+        Initialize client
+        
+        Args:
+            base_url: Service address
+            pool_size: Maximum number of idle connections kept open
+            timeout: Socket timeout per request (seconds)
+        """
+        url = urlparse(base_url)
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self.connections_opened = 0
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=max(1, pool_size))
+    
+    def _connect(self) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+    
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+    
+    def _release(self, connection: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+    
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Send a request on a pooled connection and decode the JSON reply"""
+        headers = headers or {}
+        connection = self._acquire()
+        for attempt in range(2):
+            sent = False
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                sent = True
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+                # Idle connection closed by the server: retry once on a fresh
+                # one unless the server may have received a non-idempotent request
+                connection.close()
+                if attempt or (sent and method not in IDEMPOTENT_METHODS):
+                    raise
+                connection = self._connect()
+            except Exception:
+                connection.close()
+                raise
+        
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        
+        payload = json.loads(data) if data else {}
+        if response.status >= 400:
+            raise ServiceError(response.status, payload.get('error', response.reason))
+        return payload
+    
+    def _json(self, method: str, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request(method, path, json.dumps(data).encode('utf-8'),
+                             {'Content-Type': 'application/json'})
+    
+    def health(self) -> Dict[str, Any]:
+        """Service status and batching statistics"""
+        return self._request('GET', '/v1/health')
+    
+    def detect(self, image_path: Union[str, Path],
+               confidence_threshold: Optional[float] = None) -> DetectionResult:
+        """
+        Detect an image the server can read by path
+        
+        Args:
+            image_path: Image path (as seen by the server)
+            confidence_threshold: Optional threshold overriding the server's
+        
+        Returns:
+            DetectionResult
+        """
+        data = {'image': str(image_path)}
+        if confidence_threshold is not None:
+            data['confidence_threshold'] = confidence_threshold
+        return DetectionResult.from_dict(self._json('POST', '/v1/detect', data))
+    
+    def detect_bytes(self, image: bytes, filename: str = 'upload.jpg',
+                     confidence_threshold: Optional[float] = None) -> DetectionResult:
+        """Upload image bytes for detection"""
+        path = '/v1/detect'
+        if confidence_threshold is not None:
+            path += '?' + urlencode({'confidence_threshold': confidence_threshold})
+        return DetectionResult.from_dict(self._request('POST', path, image, {
+            'Content-Type': 'application/octet-stream',
+            'X-Filename': Path(filename).name
+        }))
+    
+    def submit_batch(self, image_paths: List[Union[str, Path]], weight: float = 1.0,
+                     name: Optional[str] = None) -> str:
+        """
+        Queue a batch job
+        
+        Args:
+            image_paths: Images (as seen by the server)
+            weight: Share of detector time relative to other jobs
+            name: Display name
+        
+        Returns:
+            Job id
+        """
+        data = {'images': [str(p) for p in image_paths], 'weight': weight}
+        if name:
+            data['name'] = name
+        return self._json('POST', '/v1/batch', data)['job_id']
+    
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Status of all jobs"""
+        return self._request('GET', '/v1/jobs')['jobs']
+    
+    def pause_job(self, job_id: str) -> Dict[str, Any]:
+        """Pause a job (running images finish)"""
+        return self._request('POST', f"/v1/jobs/{job_id}/pause")
+    
+    def resume_job(self, job_id: str) -> Dict[str, Any]:
+        """Resume a paused job"""
+        return self._request('POST', f"/v1/jobs/{job_id}/resume")
+    
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a job"""
+        return self._request('POST', f"/v1/jobs/{job_id}/cancel")
+    
+    def job_status(self, job_id: str, include_results: bool = False) -> Dict[str, Any]:
+        """Get job progress (and results)"""
+        path = f"/v1/jobs/{job_id}"
+        if include_results:
+            path += '?results=1'
+        return self._request('GET', path)
+    
+    def wait_for_job(self, job_id: str, poll_interval: float = 0.5,
+                     timeout: Optional[float] = None) -> List[Optional[DetectionResult]]:
+        """
+        Wait until a job has completed or was cancelled
+        
+        Returns:
+            Results in submission order (None for images not processed)
+        
+        Raises:
+            TimeoutError: If the job is still running after timeout seconds
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.job_status(job_id)['state'] not in ('completed', 'cancelled'):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+            time.sleep(poll_interval)
+        results = self.job_status(job_id, include_results=True)['results']
+        return [DetectionResult.from_dict(r) if r is not None else None for r in results]
+    
+    def close(self):
+        """Close pooled connections"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
+    def __enter__(self) -> 'DetectionClient':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,369 @@
+"""
+Local Detection Service for Wildlife Detector
+HTTP API around a warm BatchProcessor with dynamic micro-batching
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from core.batch_processor import BatchProcessor
+from core.job_manager import Job, JobManager
+from core.species_detector import DetectionResult
+
+# Queue priorities: the stop sentinel overtakes waiting requests
+PRIORITY_STOP = -1
+PRIORITY_SINGLE = 0
+
+# Micro-batches run as jobs of this weight, ahead of batch jobs (weight ~1)
+DETECT_WEIGHT = 100.0
+
+API_PREFIX = '/v1'
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into micro-batches
+    
+    A batch is dispatched as soon as max_batch_size images are waiting, or
+    max_delay seconds after its first image arrived, whichever comes first.
+    All batches run one after another on a single dispatcher thread, so
+    the backend sees one batch at a time, sized to keep its workers busy.
+    """
+    
+    def __init__(self,
+                 process: Callable[[List[str]], List[DetectionResult]],
+                 max_batch_size: int = 16,
+                 max_delay: float = 0.02):
+        """
+        Initialize batcher
+        
+        Args:
+            process: Function processing a list of image paths
+            max_batch_size: Dispatch once this many images are waiting
+            max_delay: Longest time the first image of a batch waits (seconds)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.process = process
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+        
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, image_path: str, priority: int = PRIORITY_SINGLE) -> Future:
+        """Queue an image; the future resolves to its DetectionResult"""
+        future: Future = Future()
+        self._queue.put((priority, next(self._sequence), image_path, future))
+        return future
+    
+    @property
+    def pending(self) -> int:
+        """Images waiting for a batch"""
+        return self._queue.qsize()
+    
+    @property
+    def mean_batch_size(self) -> float:
+        """Average images per dispatched batch"""
+        return self.items / self.batches if self.batches else 0.0
+    
+    def close(self):
+        """Stop the dispatcher; waiting requests are cancelled"""
+        self._queue.put((PRIORITY_STOP, next(self._sequence), None, None))
+        self._thread.join()
+        while True:
+            try:
+                _, _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future is not None:
+                future.cancel()
+    
+    def _run(self):
+        while True:
+            priority, _, image_path, future = self._queue.get()
+            if priority == PRIORITY_STOP:
+                return
+            batch = [(image_path, future)]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    priority, _, image_path, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if priority == PRIORITY_STOP:
+                    stop = True
+                    break
+                batch.append((image_path, future))
+            self._dispatch(batch)
+            if stop:
+                return
+    
+    def _dispatch(self, batch: List[Tuple[str, Future]]):
+        """Run one batch and resolve its futures"""
+        batch = [(path, future) for path, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        
+        try:
+            results = self.process([path for path, _ in batch])
+        except Exception as e:
+            self.logger.error(f"Micro-batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        
+        # Results arrive in completion order; duplicates are matched in turn
+        by_path: Dict[str, List[DetectionResult]] = {}
+        for result in results:
+            by_path.setdefault(result.image_path, []).append(result)
+        for path, future in batch:
+            matches = by_path.get(path)
+            if matches:
+                future.set_result(matches.pop(0))
+            else:
+                future.set_exception(RuntimeError(f"No result for {path} (cancelled?)"))
+
+
+def job_status(job: Job, confidence_threshold: Optional[float] = None,
+               include_results: bool = False) -> Dict[str, Any]:
+    """Job progress as JSON (and its results when requested)"""
+    status = job.to_dict()
+    if include_results:
+        status['results'] = [_result_dict(r, confidence_threshold) if r is not None else None
+                             for r in job.results]
+    return status
+
+
+def _result_dict(result: DetectionResult, confidence_threshold: Optional[float]) -> Dict[str, Any]:
+    """Serialize a result, re-filtered at a per-request threshold if given"""
+    if confidence_threshold is not None:
+        result = result.with_threshold(confidence_threshold)
+    return result.to_dict()
+
+
+class DetectionService:
+    """
+    Warm detector behind an HTTP API
+    
+    Endpoints (JSON):
+        GET  /v1/health          service and batching statistics
+        POST /v1/detect          {"image": path} or raw image bytes
+        POST /v1/batch           {"images": [paths], "weight"?, "name"?} -> job
+        GET  /v1/jobs            all jobs
+        GET  /v1/jobs/<id>       job status (?results=1 for results)
+        POST /v1/jobs/<id>/pause|resume|cancel
+    
+    Single images are micro-batched and each micro-batch runs as a
+    high-weight job on the same JobManager as batch jobs, so both share
+    one worker pool and one concurrency limit on the warm detector.
+    """
+    
+    def __init__(self, processor: BatchProcessor,
+                 max_batch_size: int = 16,
+                 max_delay: float = 0.02,
+                 max_upload_mb: float = 50.0):
+        """
+        Initialize service
+        
+        Args:
+            processor: Initialized BatchProcessor (kept warm)
+            max_batch_size: Micro-batch size limit
+            max_delay: Micro-batch deadline in seconds
+            max_upload_mb: Largest accepted image upload
+        """
+        self.logger = logging.getLogger(__name__)
+        self.processor = processor
+        self.max_upload_bytes = int(max_upload_mb * 1024 * 1024)
+        self.job_manager = JobManager(processor)
+        self.batcher = MicroBatcher(self._process_micro_batch, max_batch_size, max_delay)
+        self.started = time.time()
+    
+    def _process_micro_batch(self, image_paths: List[str]) -> List[DetectionResult]:
+        """Run a micro-batch as a high-weight job on the shared workers"""
+        job = self.job_manager.submit(image_paths, weight=DETECT_WEIGHT, name='detect')
+        job.wait()
+        self.job_manager.remove(job.job_id)
+        return job.get_results()
+    
+    def detect(self, image_path: str) -> DetectionResult:
+        """Detect a single image through the micro-batcher"""
+        return self.batcher.submit(image_path, PRIORITY_SINGLE).result()
+    
+    def submit_job(self, image_paths: List[str], weight: float = 1.0,
+                   name: Optional[str] = None) -> Job:
+        """Queue a batch job on the job manager"""
+        return self.job_manager.submit(image_paths, weight=weight, name=name)
+    
+    def health(self) -> Dict[str, Any]:
+        """Service status"""
+        detector = self.processor.detector
+        return {
+            'status': 'ok',
+            'mode': detector.mode.value if detector else None,
+            'uptime': time.time() - self.started,
+            'pending': self.batcher.pending,
+            'batches': self.batcher.batches,
+            'images': self.batcher.items,
+            'mean_batch_size': self.batcher.mean_batch_size,
+            'largest_batch': self.batcher.largest_batch,
+            'jobs': len(self.job_manager.jobs())
+        }
+    
+    def make_server(self, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+        """Create the HTTP server (port 0 picks a free port)"""
+        class Handler(_RequestHandler):
+            service = self
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+    
+    def close(self):
+        """Stop batching and jobs (the processor is left to the caller)"""
+        self.batcher.close()
+        self.job_manager.shutdown()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to a DetectionService"""
+    
+    protocol_version = 'HTTP/1.1'  # keep-alive for pooled clients
+    service: DetectionService = None
+    
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug("%s - %s", self.address_string(), format % args)
+    
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length', 0))
+        if length > self.service.max_upload_bytes:
+            raise ValueError(f"Request body too large: {length} bytes")
+        return self.rfile.read(length) if length else b''
+    
+    def _threshold(self, query: Dict[str, List[str]], payload: Dict[str, Any]) -> Optional[float]:
+        value = payload.get('confidence_threshold', query.get('confidence_threshold', [None])[0])
+        return float(value) if value is not None else None
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == f"{API_PREFIX}/health":
+            self._send_json(200, self.service.health())
+        elif url.path == f"{API_PREFIX}/jobs":
+            self._send_json(200, {'jobs': [job.to_dict() for job in self.service.job_manager.jobs()]})
+        elif url.path.startswith(f"{API_PREFIX}/jobs/"):
+            job = self.service.job_manager.get(url.path.rsplit('/', 1)[-1])
+            if job is None:
+                self._send_json(404, {'error': 'job not found'})
+                return
+            include = query.get('results', ['0'])[0] in ('1', 'true')
+            self._send_json(200, job_status(job, self._threshold(query, {}), include))
+        else:
+            self._send_json(404, {'error': f"unknown endpoint {url.path}"})
+    
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            body = self._read_body()
+            if url.path == f"{API_PREFIX}/detect":
+                self._handle_detect(body, query)
+            elif url.path == f"{API_PREFIX}/batch":
+                payload = json.loads(body or b'{}')
+                images = payload.get('images')
+                if not isinstance(images, list) or not images:
+                    self._send_json(400, {'error': "'images' must be a non-empty list"})
+                    return
+                job = self.service.submit_job([str(p) for p in images],
+                                              weight=float(payload.get('weight', 1.0)),
+                                              name=payload.get('name'))
+                self._send_json(202, job.to_dict())
+            elif url.path.startswith(f"{API_PREFIX}/jobs/"):
+                self._handle_job_action(url.path)
+            else:
+                self._send_json(404, {'error': f"unknown endpoint {url.path}"})
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Request failed: {e}")
+            self._send_json(500, {'error': str(e)})
+    
+    def _handle_job_action(self, path: str):
+        """Pause, resume or cancel a job"""
+        job_id, _, action = path[len(f"{API_PREFIX}/jobs/"):].partition('/')
+        manager = self.service.job_manager
+        actions = {'pause': manager.pause, 'resume': manager.resume, 'cancel': manager.cancel}
+        job = manager.get(job_id)
+        if job is None or action not in actions:
+            self._send_json(404, {'error': f"unknown job or action: {path}"})
+            return
+        if not actions[action](job_id):
+            self._send_json(409, {'error': f"cannot {action} a job that is {job.state}"})
+            return
+        self._send_json(200, job.to_dict())
+    
+    def _handle_detect(self, body: bytes, query: Dict[str, List[str]]):
+        """Detect an image given by path (JSON) or uploaded as raw bytes"""
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('application/json'):
+            payload = json.loads(body or b'{}')
+            if 'image' not in payload:
+                raise KeyError("'image' is required")
+            result = self.service.detect(str(payload['image']))
+            self._send_json(200, _result_dict(result, self._threshold(query, payload)))
+            return
+        
+        # Uploaded image: the detector works on files, so spool it to disk
+        filename = os.path.basename(self.headers.get('X-Filename', 'upload.jpg'))
+        suffix = os.path.splitext(filename)[1] or '.jpg'
+        fd, tmp_path = tempfile.mkstemp(prefix='upload_', suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            result = self.service.detect(tmp_path)
+            result.image_path = filename
+            self._send_json(200, _result_dict(result, self._threshold(query, {})))
+        finally:
+            os.unlink(tmp_path)
+
+
+def serve(processor: BatchProcessor, host: str = '127.0.0.1', port: int = 8765,
+          max_batch_size: int = 16, max_delay: float = 0.02):
+    """Run the service until interrupted"""
+    service = DetectionService(processor, max_batch_size, max_delay)
+    server = service.make_server(host, port)
+    logging.getLogger(__name__).info(f"Detection service listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,47 @@
+"""
+Shared fixtures for the Wildlife Detector AI tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.batch_processor import BatchProcessor
+
+TEST_IMAGES = sorted(str(p) for p in (project_root / "tests" / "test_data" / "images").glob("*.JPG"))
+
+
+@pytest.fixture
+def sample_images() -> list:
+    """Paths of the bundled camera-trap test images, sorted"""
+    return list(TEST_IMAGES)
+
+
+@pytest.fixture
+def mock_config(tmp_path):
+    """Build MOCK processor configs whose caches live under tmp_path"""
+    def make(**overrides) -> dict:
+        config = {
+            'detection_mode': 'mock',
+            'mock_delay': 0.01,
+            'max_workers': 2,
+            'confidence_threshold': 0.0,
+            'cache_directory': str(tmp_path / "cache"),
+        }
+        config.update(overrides)
+        return config
+    return make
+
+
+@pytest.fixture
+def make_processor(mock_config):
+    """Create initialized MOCK batch processors"""
+    def make(**overrides) -> BatchProcessor:
+        processor = BatchProcessor(mock_config(**overrides))
+        assert processor.initialize()
+        return processor
+    return make
@@ -0,0 +1,431 @@
+"""
+Tests for the batch processing engine (MOCK backend)
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.species_detector import SpeciesDetector, DetectionMode
+
+
+def test_process_batch_mock(sample_images, make_processor):
+    """All images are processed and counted"""
+    processor = make_processor()
+    images = sample_images * 3
+    
+    results = processor.process_batch(images)
+    stats = processor.get_statistics()
+    
+    assert len(results) == len(images)
+    assert stats.processed_images == len(images)
+    assert stats.successful_detections == len(images)
+    assert not stats.cancelled
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_cancel_returns_within_bound(workers, sample_images, make_processor):
+    """Cancelling long-running detections returns partial results in under 1 s"""
+    processor = make_processor(mock_delay=30.0, max_workers=workers)
+    images = sample_images * 10
+    outcome = {}
+    
+    def run():
+        outcome['results'] = processor.process_batch(images)
+    
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.3)
+    
+    cancel_time = time.time()
+    processor.cancel_processing()
+    thread.join(timeout=5)
+    latency = time.time() - cancel_time
+    
+    assert not thread.is_alive()
+    assert latency < 1.0
+    assert outcome['results'] == []
+    assert processor.get_statistics().cancelled
+
+
+def test_results_drained_after_cancel_are_counted(sample_images, make_processor):
+    """Detections finishing during the cancel drain appear in the final status counts"""
+    from core.species_detector import DetectionResult
+    
+    processor = make_processor(max_workers=2)
+    started = threading.Semaphore(0)
+    
+    def uninterruptible(path, **kwargs):
+        started.release()
+        time.sleep(0.3)
+        return DetectionResult(path, [], DetectionMode.MOCK, 0.3, True)
+    
+    processor.detector.detect_single = uninterruptible
+    events = []
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.setdefault(
+        'results', processor.process_batch(sample_images * 4, event_callback=events.append)))
+    thread.start()
+    assert started.acquire(timeout=5) and started.acquire(timeout=5)
+    processor.cancel_processing()
+    thread.join(timeout=5)
+    
+    final = events[-1]
+    assert final.final and final.status == "キャンセル"
+    assert len(outcome['results']) == 2
+    assert final.current == final.status_counts['success'] == 2
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="uses a POSIX sleep child")
+def test_cancel_kills_child_process():
+    """cancel() kills a running child process instead of waiting for its timeout"""
+    detector = SpeciesDetector(mode=DetectionMode.MOCK)
+    cmd = [sys.executable, '-c', 'import time; time.sleep(30)']
+    timer = threading.Timer(0.3, detector.cancel)
+    timer.start()
+    
+    start = time.time()
+    with pytest.raises(RuntimeError, match="cancelled"):
+        detector._run_cancellable(cmd, timeout=60)
+    
+    assert time.time() - start < 2.0
+    assert not detector._active_processes
+
+
+def test_memory_governor_hysteresis():
+    """Submissions pause at the high-water mark and resume at the low-water mark"""
+    from core.memory_governor import MemoryGovernor
+    
+    usage = {'bytes': 0}
+    governor = MemoryGovernor(1.0, sample_interval=0.0, sampler=lambda: usage['bytes'])
+    gb = 1024 ** 3
+    
+    assert not governor.should_pause(2)
+    
+    usage['bytes'] = int(0.95 * gb)
+    assert governor.should_pause(2)
+    assert not governor.should_pause(0)  # never starve the pipeline
+    
+    usage['bytes'] = int(0.8 * gb)
+    assert governor.should_pause(2)  # still above low water
+    
+    usage['bytes'] = int(0.5 * gb)
+    assert not governor.should_pause(2)
+    assert governor.throttle_events == 1
+    assert governor.peak_mb == pytest.approx(0.95 * 1024)
+
+
+def test_memory_throttling_reported_in_stats(monkeypatch, sample_images, make_processor):
+    """A run over the memory limit is throttled and the events are reported"""
+    import core.memory_governor as memory_governor
+    
+    monkeypatch.setattr(memory_governor, 'sample_process_tree_rss', lambda: 2 * 1024 ** 3)
+    processor = make_processor(memory_limit_gb=1.0)
+    images = sample_images * 2
+    
+    results = processor.process_batch(images)
+    stats = processor.get_statistics().to_dict()
+    
+    assert len(results) == len(images)
+    assert stats['memory_throttle_events'] == 1
+    assert stats['peak_memory_mb'] == pytest.approx(2048)
+
+
+def test_adaptive_controller_climbs_and_settles():
+    """The controller adds workers while throughput improves and settles on the best level"""
+    from core.concurrency import AdaptiveConcurrencyController
+    
+    controller = AdaptiveConcurrencyController(max_limit=8, initial=1)
+    # Throughput scales up to 3 workers, then flattens out
+    for _ in range(6):
+        controller._evaluate({1: 1.0, 2: 1.9, 3: 2.7}.get(controller.limit, 2.75))
+    
+    assert controller.best_limit == 3
+    assert controller.limit == 3
+    assert controller.settled
+    
+    # A sharp drop at the settled level triggers a multiplicative back-off
+    controller._evaluate(1.0)
+    assert controller.limit == 1
+
+
+def test_adaptive_run_persists_best_level(tmp_path, sample_images, make_processor):
+    """An adaptive run reports its level and stores it for the next run"""
+    from core.concurrency import ConcurrencyStore
+    
+    processor = make_processor(adaptive_workers=True, adaptive_window_seconds=0.0,
+                               cache_directory=str(tmp_path))
+    processor.process_batch(sample_images * 4)
+    stats = processor.get_statistics()
+    
+    assert stats.adaptive_concurrency
+    assert stats.concurrency_level >= 1
+    store = ConcurrencyStore(str(tmp_path / 'concurrency.json'))
+    assert store.get_best('mock') == stats.concurrency_level
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_prefetch_reports_io_wait(workers, sample_images, make_processor):
+    """Prefetched runs give the same results and report I/O wait separately"""
+    processor = make_processor(max_workers=workers, prefetch_depth=4, prefetch_workers=2)
+    images = sample_images * 2
+    
+    results = processor.process_batch(images)
+    stats = processor.get_statistics()
+    
+    assert len(results) == len(images)
+    assert all(r.success for r in results)
+    assert all('width' in r.metadata for r in results)
+    assert stats.stage_latency['io_wait'].count == len(images)
+    assert stats.stage_latency['detect'].count == len(images)
+    assert processor.prefetcher is None
+
+
+def test_buffer_pool_is_bounded():
+    """Acquire blocks while the pool budget is in use"""
+    from core.prefetch import BufferPool
+    
+    pool = BufferPool(max_bytes=100)
+    first = pool.acquire(80)
+    acquired = threading.Event()
+    
+    def take_second():
+        pool.release(pool.acquire(50), 50)
+        acquired.set()
+    
+    thread = threading.Thread(target=take_second)
+    thread.start()
+    assert not acquired.wait(0.1)
+    
+    pool.release(first, 80)
+    assert acquired.wait(1.0)
+    thread.join()
+    
+    # Released buffers are reused
+    assert pool.acquire(60) is first
+
+
+def _failed_result(path, error_type, message="boom"):
+    from core.species_detector import DetectionResult
+    return DetectionResult(image_path=str(path), detections=[], mode=DetectionMode.MOCK,
+                           processing_time=0.0, success=False,
+                           error_message=message, error_type=error_type)
+
+
+def test_transient_failure_is_retried(tmp_path, sample_images, make_processor):
+    """A transient failure succeeds on retry and the retry is counted"""
+    processor = make_processor(max_workers=1, retry_base_delay=0.01, cache_directory=str(tmp_path))
+    detect = processor.detector.detect_single
+    calls = []
+    
+    def flaky(path, timeout=None, **kwargs):
+        calls.append(timeout)
+        if len(calls) == 1:
+            return _failed_result(path, 'transient')
+        return detect(path, timeout=timeout, **kwargs)
+    
+    processor.detector.detect_single = flaky
+    results = processor.process_batch(sample_images[:1])
+    stats = processor.get_statistics()
+    
+    assert results[0].success
+    assert results[0].metadata['attempts'] == 2
+    assert stats.retries == 1
+    assert stats.quarantined_images == 0
+
+
+def test_timeout_retries_fast_then_quarantines(tmp_path, sample_images, make_processor):
+    """A timeout gets one short-timeout retry, then the image is skipped on later runs"""
+    processor = make_processor(max_workers=1, retry_base_delay=0.01, quarantine_timeout=5,
+                               cache_directory=str(tmp_path))
+    timeouts = []
+    
+    def hang(path, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        return _failed_result(path, 'timeout', "timed out")
+    
+    processor.detector.detect_single = hang
+    processor.process_batch(sample_images[:1])
+    
+    assert timeouts == [None, 5]
+    assert processor.get_statistics().quarantined_images == 1
+    
+    # A new processor reads the quarantine and skips the image without detecting
+    processor = make_processor(max_workers=1, cache_directory=str(tmp_path))
+    processor.detector.detect_single = hang
+    results = processor.process_batch(sample_images[:2])
+    stats = processor.get_statistics()
+    
+    # Only the second image was attempted (full timeout, then the short one)
+    assert timeouts[2:] == [None, 30]
+    assert stats.skipped_images == 1
+    assert results[0].error_type == 'quarantined'
+    
+    processor.quarantine.clear()
+    assert not processor.quarantine.is_quarantined(sample_images[0])
+
+
+def test_persistent_transient_failure_is_not_quarantined(sample_images, make_processor):
+    """Failures of a broken environment are retried but never quarantined"""
+    processor = make_processor(max_workers=1, retry_base_delay=0.01)
+    
+    def broken(path, timeout=None, **kwargs):
+        return _failed_result(path, 'transient', "SpeciesNet exited with status 1")
+    
+    processor.detector.detect_single = broken
+    results = processor.process_batch(sample_images[:2])
+    
+    assert [r.metadata['attempts'] for r in results] == [3, 3]
+    assert processor.get_statistics().quarantined_images == 0
+    assert len(processor.quarantine) == 0
+
+
+def test_quarantine_store_batches_writes(tmp_path, sample_images):
+    """Entries added in quick succession are written once, on flush"""
+    import json
+    from core.retry import QuarantineStore
+    
+    path = tmp_path / "quarantine.json"
+    store = QuarantineStore(path)
+    for image in sample_images:
+        store.add(image, 'corrupt', "broken data stream", 1)
+    assert len(json.loads(path.read_text(encoding='utf-8'))) == 1
+    
+    store.flush()
+    assert len(json.loads(path.read_text(encoding='utf-8'))) == len(sample_images)
+    assert all(QuarantineStore(path).is_quarantined(image) for image in sample_images)
+
+
+def test_classify_error():
+    """Exceptions map to error types that drive the retry policy"""
+    import subprocess
+    from core.retry import classify_error, RetryPolicy
+    
+    assert classify_error(subprocess.TimeoutExpired('speciesnet', 300)) == 'timeout'
+    assert classify_error(FileNotFoundError('x')) == 'not_found'
+    assert classify_error(RuntimeError("SpeciesNet failed: cannot identify image file")) == 'corrupt'
+    assert classify_error(RuntimeError("SpeciesNet failed: CUDA out of memory")) == 'transient'
+    
+    policy = RetryPolicy(max_retries=2, jitter=0.0)
+    assert policy.should_retry('transient', 2) and not policy.should_retry('transient', 3)
+    assert not policy.should_retry('corrupt', 1)
+    assert policy.delay(3) == 2.0
+
+
+def test_stage_timings_recorded_and_forwarded(sample_images, make_processor):
+    """Per-stage timings land in the result, the statistics and timing hooks"""
+    processor = make_processor(max_workers=2)
+    received = []
+    processor.add_timing_hook(lambda path, timings: received.append((path, timings)))
+    
+    results = processor.process_batch(sample_images)
+    stats = processor.get_statistics()
+    
+    for result in results:
+        timings = result.metadata['timings']
+        assert {'queue', 'stat', 'metadata', 'inference', 'detect'} <= set(timings)
+        assert timings['inference'] <= timings['detect']
+    assert sorted(path for path, _ in received) == sorted(sample_images)
+    assert stats.stage_latency['inference'].count == len(sample_images)
+
+
+def test_subprocess_spawn_and_inference_timed():
+    """Child processes report spawn and inference time separately"""
+    from core.timing import StageTimer
+    
+    detector = SpeciesDetector(mode=DetectionMode.MOCK)
+    timer = StageTimer()
+    detector._run_cancellable([sys.executable, '-c', 'import time; time.sleep(0.2)'],
+                              timeout=10, timer=timer)
+    
+    assert timer.timings['spawn'] > 0
+    assert timer.timings['inference'] >= 0.2
+
+
+def test_hedging_rescues_straggler(sample_images, make_processor):
+    """A straggler is duplicated once the queue drains and the duplicate wins"""
+    processor = make_processor(max_workers=4, hedging=True, hedge_multiplier=3.0,
+                               hedge_min_samples=8, hedge_min_latency=0.05)
+    detect = processor.detector.detect_single
+    slow_path = sample_images[0]
+    first_call = threading.Event()
+    
+    def straggle(path, cancel_token=None, **kwargs):
+        if path == slow_path and not first_call.is_set():
+            first_call.set()
+            # Hung until the losing attempt is cancelled
+            assert cancel_token.wait(10.0)
+            return processor.detector._cancelled_result(Path(path))
+        return detect(path, cancel_token=cancel_token, **kwargs)
+    
+    processor.detector.detect_single = straggle
+    images = [slow_path] + sample_images[1:] * 4
+    
+    start = time.monotonic()
+    results = processor.process_batch(images)
+    elapsed = time.monotonic() - start
+    stats = processor.get_statistics()
+    
+    assert elapsed < 5.0
+    assert len(results) == len(images)
+    assert all(r.success for r in results)
+    assert stats.processed_images == len(images)
+    assert stats.hedges_started == 1
+    assert stats.hedges_won == 1
+
+
+def test_failed_original_yields_to_running_hedge(sample_images, make_processor):
+    """An original that fails while its hedge still runs does not cancel the hedge"""
+    processor = make_processor(max_workers=4, hedging=True, hedge_multiplier=3.0,
+                               hedge_min_samples=8, hedge_min_latency=0.05, retry_base_delay=0.01)
+    detect = processor.detector.detect_single
+    slow_path = sample_images[0]
+    original_tokens = []
+    hedge_started = threading.Event()
+    
+    def fail_then_hedge(path, cancel_token=None, **kwargs):
+        if path == slow_path and not original_tokens:
+            original_tokens.append(cancel_token)
+        if path == slow_path and cancel_token is original_tokens[0]:
+            # The original times out (and again on retry) once the hedge runs
+            assert hedge_started.wait(10.0)
+            return _failed_result(path, 'timeout', "timed out")
+        if path == slow_path:
+            hedge_started.set()
+            time.sleep(0.3)
+        return detect(path, cancel_token=cancel_token, **kwargs)
+    
+    processor.detector.detect_single = fail_then_hedge
+    images = [slow_path] + sample_images[1:] * 4
+    results = processor.process_batch(images)
+    stats = processor.get_statistics()
+    
+    assert all(r.success for r in results)
+    assert stats.processed_images == len(images)
+    assert stats.failed_detections == 0
+    assert stats.hedges_won == 1
+    assert not processor.quarantine.is_quarantined(slow_path)
+
+
+def test_cancel_token_kills_only_its_child():
+    """Cancelling an attempt's token kills its child without cancelling the detector"""
+    from core.hedging import CancelToken
+    
+    detector = SpeciesDetector(mode=DetectionMode.MOCK)
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        detector._run_cancellable([sys.executable, '-c', 'import time; time.sleep(30)'],
+                                  timeout=60, cancel_token=token)
+    
+    assert time.monotonic() - start < 5.0
+    assert not detector.is_cancelled
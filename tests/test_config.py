@@ -0,0 +1,39 @@
+"""
+Tests for loading config.yaml into AppConfig
+"""
+import sys
+from pathlib import Path
+
+import yaml
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.config import AppConfig, ConfigManager
+
+
+def test_yaml_sections_reach_app_config(tmp_path):
+    """Keys under their config.yaml section set the matching fields"""
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump({
+        'app': {'name': 'Trailcam'},
+        'processing': {'max_workers': 7, 'adaptive_workers': True, 'lease_size': 25},
+        'logging': {'level': 'DEBUG'},
+        'cache': {'enable': False},
+        'unknown': {'setting': 1},
+    }), encoding='utf-8')
+    
+    config = ConfigManager(str(path)).get_config()
+    assert config.app_name == 'Trailcam'
+    assert config.max_workers == 7 and config.adaptive_workers and config.lease_size == 25
+    assert config.log_level == 'DEBUG' and config.enable_cache is False
+    assert config.chunk_size == AppConfig.chunk_size
+    
+    # What to_dict writes is read back unchanged
+    assert AppConfig.from_dict(config.to_dict()) == config
+    
+    # The CLI and GUI build their processors from the same settings
+    processor_config = config.processor_config()
+    assert processor_config['max_workers'] == 7 and processor_config['adaptive_workers']
+    assert processor_config['reuse_detector'] is config.warm_detector
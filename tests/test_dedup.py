@@ -0,0 +1,88 @@
+"""
+Tests for exact-duplicate detection and result fan-out
+"""
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.csv_exporter import CSVExporter
+from utils.dedup import find_duplicates
+from utils.file_manager import FileManager
+
+
+def make_archive(root: Path, images: list) -> dict:
+    """Two dumps of one card, a partial third dump, a hard link and near-duplicates"""
+    paths = {}
+    for dump in ("dump1", "dump2", "dump3"):
+        (root / dump).mkdir(parents=True)
+    for dump in ("dump1", "dump2"):
+        for image in images:
+            paths[f"{dump}/{Path(image).name}"] = shutil.copy(image, root / dump)
+    paths["dump3/crow.JPG"] = shutil.copy(images[0], root / "dump3" / "crow.JPG")
+    # Same size and prefix as the duck, different last byte
+    data = bytearray(Path(images[1]).read_bytes())
+    data[-1] ^= 0xFF
+    (root / "dump3" / "duck_edited.JPG").write_bytes(bytes(data))
+    paths["dump3/duck_edited.JPG"] = str(root / "dump3" / "duck_edited.JPG")
+    os.link(paths["dump1/test_heron.JPG"], root / "dump3" / "heron_link.JPG")
+    paths["dump3/heron_link.JPG"] = str(root / "dump3" / "heron_link.JPG")
+    return {name: str(path) for name, path in paths.items()}
+
+
+def test_find_duplicates_groups_identical_files(tmp_path, sample_images):
+    """Size, prefix and full hash separate copies from near-duplicates"""
+    archive = make_archive(tmp_path / "archive", sample_images)
+    paths = list(archive.values())
+    manager = FileManager(hash_cache=tmp_path / "hashes.sqlite")
+    report = find_duplicates(paths, manager, workers=2)
+    
+    groups = {Path(g.primary).name: [str(Path(p).relative_to(tmp_path / "archive")) for p in g.paths]
+              for g in report.groups}
+    assert groups["test_crow.JPG"] == ["dump1/test_crow.JPG", "dump2/test_crow.JPG", "dump3/crow.JPG"]
+    assert groups["test_heron.JPG"] == ["dump1/test_heron.JPG", "dump2/test_heron.JPG",
+                                        "dump3/heron_link.JPG"]
+    assert len(report.groups) == 4
+    assert archive["dump3/duck_edited.JPG"] in report.unique_paths
+    assert report.unique_paths == [p for p in paths if "dump1" in p or "edited" in p]
+    assert report.duplicate_files == 6
+    assert report.duplicate_bytes == sum(os.path.getsize(p) for p in sample_images) + \
+        os.path.getsize(sample_images[0]) + os.path.getsize(sample_images[2])
+    
+    # A second search (digests from the hash cache) finds the same groups
+    again = find_duplicates(paths, manager)
+    assert again.partial_hashed == report.partial_hashed
+    assert [g.paths for g in again.groups] == [g.paths for g in report.groups]
+    manager.close()
+
+
+def test_duplicates_inferred_once_and_fanned_out(tmp_path, sample_images, make_processor):
+    """Every path gets a result, but only distinct contents reach the detector"""
+    archive = make_archive(tmp_path / "archive", sample_images)
+    processor = make_processor(dedup_images=True)
+    detected = []
+    detect = processor.detector.detect_single
+    processor.detector.detect_single = lambda path, *a, **k: detected.append(str(path)) or detect(path, *a, **k)
+    
+    results = processor.process_batch(list(archive.values()))
+    assert sorted(r.image_path for r in results) == sorted(archive.values())
+    assert len(detected) == len(sample_images) + 1
+    by_path = {r.image_path: r for r in results}
+    copy = by_path[archive["dump2/test_duck.JPG"]]
+    assert copy.metadata['duplicate_of'] == archive["dump1/test_duck.JPG"]
+    assert copy.detections == by_path[archive["dump1/test_duck.JPG"]].detections
+    
+    stats = processor.get_statistics()
+    assert stats.total_images == stats.processed_images == len(archive)
+    assert stats.duplicate_images == 6
+    assert stats.duplicate_bytes > 3 * 1024 * 1024
+    assert stats.average_time_per_image > 0
+    
+    files = CSVExporter(str(tmp_path / "out")).export_all(results, stats)
+    lines = Path(files['duplicates']).read_text(encoding='utf-8-sig').splitlines()
+    assert len(lines) == 1 + 6
+    assert "Duplicate Bytes Saved (MB)" in Path(files['summary']).read_text(encoding='utf-8-sig')
@@ -0,0 +1,76 @@
+"""
+Tests for lazy re-thresholding of stored detections
+"""
+import random
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.detection_table import DetectionTable
+from core.species_detector import DetectionResult, DetectionMode
+from utils.csv_exporter import CSVExporter
+
+SPECIES = ["Sika Deer", "Wild Boar", "Raccoon Dog", "Japanese Macaque"]
+
+
+def make_results(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        raw = [{'common_name': rng.choice(SPECIES), 'confidence': round(rng.random(), 3),
+                'category': 'animal'} for _ in range(rng.randint(0, 3))]
+        results.append(DetectionResult(f"img_{i:05d}.jpg", [d for d in raw if d['confidence'] >= 0.5],
+                                       DetectionMode.MOCK, 0.1, True, raw_detections=raw))
+    results.append(DetectionResult("broken.jpg", [], DetectionMode.MOCK, 0.0, False, "corrupt"))
+    return results
+
+
+def test_vectorized_threshold_matches_per_result_filtering():
+    """Counts, best detections and species counts agree with a plain Python filter"""
+    results = make_results(500)
+    table = DetectionTable(results)
+    
+    for threshold in (0.0, 0.3, 0.5, 0.9, 1.0):
+        expected = [r.detections_above(threshold) if r.success else [] for r in results]
+        
+        assert table.counts(threshold).tolist() == [len(d) for d in expected]
+        best = table.best(threshold)
+        for i, detections in enumerate(expected):
+            found = table.best_detection(i, threshold, best)
+            if detections:
+                assert found['confidence'] == max(d['confidence'] for d in detections)
+            else:
+                assert found is None
+        
+        species = {}
+        for detections in expected:
+            for d in detections:
+                species[d['common_name']] = species.get(d['common_name'], 0) + 1
+        assert table.species_counts(threshold) == species
+
+
+def test_apply_lowers_threshold_below_processing_threshold():
+    """Detections dropped at processing time come back when the threshold is lowered"""
+    results = make_results(50)
+    applied = DetectionTable(results).apply(0.2)
+    
+    assert [len(r.detections) for r in applied] == [len(r.detections_above(0.2)) for r in results]
+    assert sum(len(r.detections) for r in applied) > sum(len(r.detections) for r in results)
+    # Originals are untouched and raw detections are kept
+    assert all(r.detections == [d for d in r.raw_detections if d['confidence'] >= 0.5]
+               for r in results if r.success)
+    assert applied[0].raw_detections is results[0].raw_detections
+
+
+def test_export_uses_requested_threshold(tmp_path):
+    """CSV export re-filters at the given threshold"""
+    results = make_results(20)
+    files = CSVExporter(str(tmp_path)).export_all(results, confidence_threshold=0.0)
+    
+    with open(files['detailed_results'], encoding='utf-8-sig') as f:
+        rows = f.read().splitlines()[1:]
+    expected = sum(max(1, len(r.raw_detections or [])) for r in results)
+    assert len(rows) == expected
@@ -0,0 +1,102 @@
+"""
+Tests for single-pass image discovery
+"""
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import utils.discovery as discovery
+from utils.discovery import DiscoveryFeed, walk_images
+from utils.file_manager import FileManager
+
+
+def make_tree(root: Path) -> list:
+    """Nested tree with mixed-case extensions and non-image files"""
+    images = []
+    for folder in ("a", "a/b", "a-b", "c/d/e"):
+        (root / folder).mkdir(parents=True, exist_ok=True)
+        for name in ("IMG_0001.JPG", "img_0002.jpeg", "Img_0003.Png"):
+            path = root / folder / name
+            path.write_bytes(b"x" * len(name))
+            images.append(path)
+        (root / folder / "clip.MP4").write_bytes(b"")
+        (root / folder / "notes.txt").write_bytes(b"")
+    (root / "top.TIF").write_bytes(b"tif")
+    images.append(root / "top.TIF")
+    return sorted(images)
+
+
+def test_walk_finds_each_image_once_in_path_order(tmp_path):
+    """Extensions match in any case and the order equals sorted Paths"""
+    images = make_tree(tmp_path)
+    
+    assert FileManager().get_image_files(tmp_path) == images
+    assert FileManager().get_image_files(tmp_path, workers=4) == images
+    assert FileManager().get_image_files(tmp_path, recursive=False) == [tmp_path / "top.TIF"]
+    assert [e.path for e in walk_images(tmp_path, extensions=['png'])] == \
+        [str(p) for p in images if p.suffix.lower() == '.png']
+
+
+def test_entries_carry_stat_data(tmp_path):
+    """with_stat fills size, mtime, inode and device from the walk"""
+    images = make_tree(tmp_path)
+    entries = FileManager().get_image_entries(tmp_path, workers=2)
+    
+    assert [e.path for e in entries] == [str(p) for p in images]
+    for entry in entries:
+        st = os.stat(entry.path)
+        assert (entry.size, entry.mtime_ns, entry.inode, entry.device) == \
+            (st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    """A link back up the tree does not loop"""
+    images = make_tree(tmp_path)
+    os.symlink(tmp_path / "a", tmp_path / "c" / "loop")
+    assert FileManager().get_image_files(tmp_path) == images
+
+
+def test_feed_streams_into_the_pipeline(tmp_path, monkeypatch, sample_images, make_processor):
+    """Inference starts before discovery ends and the live total converges"""
+    for day in range(5):
+        folder = tmp_path / "camera" / f"day{day}"
+        folder.mkdir(parents=True)
+        for image in sample_images:
+            shutil.copy(image, folder)
+    expected = sorted(str(p) for p in (tmp_path / "camera").rglob("*.JPG"))
+    
+    processor = make_processor()
+    
+    # Listing day1 waits until the first image of day0 is in inference
+    started = threading.Event()
+    detect_single = processor.detector.detect_single
+    scan_directory = discovery._scan_directory
+    
+    def detect(image_path, **kwargs):
+        started.set()
+        return detect_single(image_path, **kwargs)
+    
+    def gated_scan(directory, *args):
+        if directory.endswith("day1") and not started.wait(timeout=10):
+            raise TimeoutError("inference did not start during discovery")
+        return scan_directory(directory, *args)
+    
+    monkeypatch.setattr(processor.detector, 'detect_single', detect)
+    monkeypatch.setattr(discovery, '_scan_directory', gated_scan)
+    
+    events = []
+    feed = DiscoveryFeed(tmp_path / "camera")
+    results = processor.process_stream(feed, feed.estimate_total, event_callback=events.append)
+    
+    assert feed.error is None
+    assert sorted(r.image_path for r in results) == expected
+    assert processor.get_statistics().total_images == len(expected)
+    assert feed.estimate_total() == feed.found == len(expected)
+    assert events[-1].final and not events[-1].total_estimated
+    assert events[-1].total == len(expected)
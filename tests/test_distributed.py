@@ -0,0 +1,149 @@
+"""
+Tests for the shared-directory work queue (several local processes)
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.batch_processor import BatchProcessor
+from core.distributed import WorkQueue, CLAIMED_DIR, DONE_DIR, PENDING_DIR
+from utils.csv_exporter import CSVExporter
+
+
+def run_worker(queue_dir: str, node_id: str, cache_dir: str):
+    """Worker process: MOCK processor draining the queue"""
+    processor = BatchProcessor({
+        'detection_mode': 'mock',
+        'mock_delay': 0.01,
+        'max_workers': 2,
+        'confidence_threshold': 0.0,
+        'cache_directory': cache_dir,
+        'lease_timeout': 5.0,
+        'heartbeat_interval': 0.2,
+    })
+    assert processor.initialize()
+    processor.process_distributed(queue_dir, node_id, poll_interval=0.1)
+
+
+def test_processes_share_a_queue(tmp_path, sample_images):
+    """Three processes drain the queue and the merge has every image exactly once"""
+    images = sample_images * 6
+    queue_dir = tmp_path / "queue"
+    assert WorkQueue(queue_dir, "coordinator").create(images, lease_size=3) == 8
+    
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=run_worker,
+                               args=(str(queue_dir), f"node{i}", str(tmp_path / f"cache{i}")))
+               for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+    
+    work_queue = WorkQueue(queue_dir)
+    assert work_queue.finished
+    assert work_queue.status()[DONE_DIR] == 8
+    
+    results, stats = work_queue.merge()
+    assert [r.image_path for r in results] == images
+    assert stats.total_images == len(images)
+    assert stats.processed_images == len(images)
+    
+    files = CSVExporter(str(tmp_path / "out")).export_all(results, stats)
+    assert Path(files['summary']).exists()
+
+
+def test_expired_lease_is_reclaimed(tmp_path, sample_images, make_processor):
+    """A lease held by a node that stopped heartbeating is processed by another node"""
+    queue_dir = tmp_path / "queue"
+    WorkQueue(queue_dir, "coordinator").create(sample_images, lease_size=2)
+    
+    dead = WorkQueue(queue_dir, "dead-node")
+    lease = dead.claim()
+    assert lease is not None
+    past = time.time() - 3600
+    os.utime(lease.path, (past, past))
+    
+    processor = make_processor(lease_timeout=60.0)
+    node_results = processor.process_distributed(str(queue_dir), "survivor", poll_interval=0.1)
+    
+    assert len(node_results) == len(sample_images)
+    assert processor.get_statistics().processed_images == len(sample_images)
+    results, _ = WorkQueue(queue_dir).merge()
+    assert sorted(r.image_path for r in results) == sorted(sample_images)
+    
+    # The dead node finds out it lost the lease
+    assert not dead.renew(lease)
+    assert not os.listdir(queue_dir / CLAIMED_DIR)
+
+
+def test_node_statistics_cover_each_lease_once(tmp_path, sample_images, make_processor):
+    """A node's totals after several leases count every image once"""
+    images = sample_images[:3] * 2
+    queue_dir = tmp_path / "queue"
+    assert WorkQueue(queue_dir, "coordinator").create(images, lease_size=2) == 3
+    
+    processor = make_processor()
+    node_results = processor.process_distributed(str(queue_dir), "solo", poll_interval=0.1)
+    stats = processor.get_statistics()
+    
+    assert len(node_results) == len(images)
+    assert stats.total_images == stats.processed_images == len(images)
+    assert stats.successful_detections == len(images)
+
+
+def test_cancel_between_claim_and_batch_stops_the_node(tmp_path, sample_images, make_processor,
+                                                       monkeypatch):
+    """A cancel that lands right after a claim releases the lease and claims no more"""
+    queue_dir = tmp_path / "queue"
+    WorkQueue(queue_dir, "coordinator").create(sample_images, lease_size=1)
+    processor = make_processor()
+    claim = WorkQueue.claim
+    
+    def claim_then_cancel(self):
+        lease = claim(self)
+        processor.cancel_processing()
+        return lease
+    
+    monkeypatch.setattr(WorkQueue, 'claim', claim_then_cancel)
+    assert processor.process_distributed(str(queue_dir), "node", poll_interval=0.1) == []
+    
+    status = WorkQueue(queue_dir).status()
+    assert status[PENDING_DIR] == len(sample_images)
+    assert status[CLAIMED_DIR] == status[DONE_DIR] == 0
+    assert processor.get_statistics().cancelled
+
+
+def test_each_lease_is_claimed_once(tmp_path):
+    """Concurrent claims never hand out the same lease twice"""
+    queue_dir = tmp_path / "queue"
+    WorkQueue(queue_dir, "coordinator").create([f"img{i}.jpg" for i in range(200)], lease_size=1)
+    
+    claimed = []
+    lock = threading.Lock()
+    
+    def claim_all(node_id):
+        work_queue = WorkQueue(queue_dir, node_id)
+        while True:
+            lease = work_queue.claim()
+            if lease is None:
+                return
+            with lock:
+                claimed.append(lease.name)
+    
+    threads = [threading.Thread(target=claim_all, args=(f"node{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
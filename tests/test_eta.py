@@ -0,0 +1,54 @@
+"""
+Tests for the online ETA engine
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.eta import ETAEstimator, format_duration
+
+
+def test_steady_rate_estimate():
+    """A steady completion rate gives a tight estimate"""
+    estimator = ETAEstimator(warmup=2)
+    estimator.start(now=0.0)
+    for i in range(1, 41):
+        estimator.record('inference', now=i * 0.5)
+    
+    eta = estimator.estimate(10)
+    assert eta.seconds == pytest.approx(5.0)
+    assert eta.low == pytest.approx(5.0)
+    assert eta.high == pytest.approx(5.0)
+    assert estimator.throughput() == pytest.approx(2.0)
+
+
+def test_cached_items_are_costed_separately():
+    """Fast (cached) items do not drag the inference estimate down"""
+    estimator = ETAEstimator(warmup=0)
+    estimator.start(now=0.0)
+    now = 0.0
+    for i in range(50):
+        now += 0.01 if i % 2 else 1.0 + (0.2 if i % 4 == 0 else -0.2)
+        estimator.record('cached' if i % 2 else 'inference', now=now)
+    
+    eta = estimator.estimate(100, remaining_by_stage={'inference': 10, 'cached': 90})
+    assert 9.0 < eta.seconds < 12.0
+    assert eta.low < eta.seconds < eta.high
+
+
+def test_fallback_before_measurements():
+    """Without measurements the prior is divided by the concurrency level"""
+    eta = ETAEstimator().estimate(8, fallback_per_item=2.0, concurrency=4)
+    assert eta.samples == 0
+    assert eta.seconds == pytest.approx(4.0)
+
+
+def test_format_duration():
+    """Durations are rendered as M:SS or H:MM:SS"""
+    assert format_duration(59.6) == "1:00"
+    assert format_duration(3725) == "1:02:05"
@@ -0,0 +1,107 @@
+"""
+Tests for magic-byte sniffing of image files before they are queued
+"""
+import io
+import shutil
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.stats import ProcessingStats
+from utils.discovery import walk_images
+from utils.file_sniffer import (FileSniffer, sniff_file, KIND_JPEG, KIND_PNG, REJECT_EMPTY,
+                                REJECT_NOT_IMAGE, REJECT_THUMBNAIL, REJECT_TRUNCATED)
+
+
+def image_bytes(size, fmt):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (90, 120, 60)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def make_bad_files(root: Path, camera_image: str) -> dict:
+    """One file per rejection reason, keyed by the expected reason"""
+    camera = Path(camera_image).read_bytes()
+    png = image_bytes((640, 480), 'PNG')
+    files = {
+        REJECT_EMPTY: (root / "empty.JPG", b""),
+        REJECT_NOT_IMAGE: (root / "notes.jpg", b"not a picture"),
+        REJECT_TRUNCATED: (root / "half.JPG", camera[:len(camera) // 2]),
+        REJECT_THUMBNAIL: (root / "thumb.JPG", image_bytes((160, 120), 'JPEG')),
+        'truncated_png': (root / "cut.png", png[:-20]),
+    }
+    for path, data in files.values():
+        path.write_bytes(data)
+    return {reason: str(path) for reason, (path, _) in files.items()}
+
+
+def test_sniff_file_checks_structure(tmp_path, sample_images):
+    """Camera JPEGs (with their text trailer) pass; broken files get a reason"""
+    for path in sample_images:
+        result = sniff_file(path, min_dimension=200)
+        assert result.ok and result.kind == KIND_JPEG
+        assert (result.width, result.height) == (2592, 1944)
+    
+    png = tmp_path / "ok.png"
+    png.write_bytes(image_bytes((640, 480), 'PNG'))
+    assert sniff_file(str(png), 200).kind == KIND_PNG
+    
+    bad = make_bad_files(tmp_path, sample_images[0])
+    assert sniff_file(bad['truncated_png']).reason == REJECT_TRUNCATED
+    for reason in (REJECT_EMPTY, REJECT_NOT_IMAGE, REJECT_TRUNCATED, REJECT_THUMBNAIL):
+        assert sniff_file(bad[reason], min_dimension=200).reason == reason
+    # Without a minimum size the thumbnail is a valid image
+    assert sniff_file(bad[REJECT_THUMBNAIL]).ok
+
+
+def test_sniffer_filters_in_order_and_pipeline_records_reasons(tmp_path, sample_images, make_processor):
+    """Rejected files never reach the detector but get a skipped result and a reason"""
+    bad = make_bad_files(tmp_path, sample_images[0])
+    paths = [sample_images[0], *bad.values(), *sample_images[1:]]
+    
+    sniffer = FileSniffer(workers=3, min_dimension=200)
+    assert sniffer.check(iter(paths)) == sample_images
+    assert sniffer.reasons == {REJECT_EMPTY: 1, REJECT_NOT_IMAGE: 1, REJECT_TRUNCATED: 2,
+                               REJECT_THUMBNAIL: 1}
+    
+    processor = make_processor(sniff_files=True, sniff_min_dimension=200)
+    detected = []
+    detect = processor.detector.detect_single
+    processor.detector.detect_single = lambda path, *a, **k: detected.append(str(path)) or detect(path, *a, **k)
+    results = processor.process_batch(paths)
+    assert sorted(detected) == sample_images
+    assert sorted(r.image_path for r in results) == sorted(paths)
+    rejected = {r.image_path: r for r in results if r.error_type == 'rejected'}
+    assert rejected[bad[REJECT_THUMBNAIL]].metadata['rejected'] == REJECT_THUMBNAIL
+    assert not any(r.success for r in rejected.values())
+    stats = processor.get_statistics()
+    assert stats.total_images == stats.processed_images == len(paths)
+    assert stats.skipped_images == stats.rejected_files == 5
+    assert stats.rejection_reasons[REJECT_TRUNCATED] == 2
+    
+    streamed = processor.process_stream(iter(paths))
+    assert sorted(r.image_path for r in streamed) == sorted(paths)
+    assert processor.get_statistics().total_images == len(paths)
+    assert processor.get_statistics().rejected_files == 5
+    
+    merged = ProcessingStats.merged([stats, processor.get_statistics()])
+    assert merged.rejected_files == 10 and merged.rejection_reasons[REJECT_EMPTY] == 2
+
+
+def test_discovery_picks_up_images_with_odd_extensions(tmp_path, sample_images):
+    """With sniff_unknown, magic bytes decide for files with unknown extensions"""
+    shutil.copy(sample_images[0], tmp_path / "IMG_0001.JPG")
+    shutil.copy(sample_images[1], tmp_path / "IMG_0002")
+    shutil.copy(sample_images[2], tmp_path / "IMG_0003.jpe")
+    shutil.copy(sample_images[3], tmp_path / "IMG_0004.MP4")  # Known non-image extension: not opened
+    (tmp_path / "README").write_bytes(b"card dump")
+    
+    names = [Path(e.path).name for e in walk_images(tmp_path)]
+    assert names == ["IMG_0001.JPG"]
+    names = [Path(e.path).name for e in walk_images(tmp_path, sniff_unknown=True, workers=2)]
+    assert names == ["IMG_0001.JPG", "IMG_0002", "IMG_0003.jpe"]
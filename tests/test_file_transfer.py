@@ -0,0 +1,106 @@
+"""
+Tests for organize modes: copy, move, hard links, reflinks and symlinks
+"""
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.species_detector import DetectionMode, DetectionResult
+from utils import file_transfer
+from utils.file_manager import FileManager
+from utils.file_transfer import transfer_file
+
+
+def make_source(tmp_path: Path, image: str) -> Path:
+    src = tmp_path / "card" / "IMG_0001.JPG"
+    src.parent.mkdir(exist_ok=True)
+    shutil.copy(image, src)
+    return src
+
+
+def test_transfer_modes_and_fallbacks(monkeypatch, tmp_path, sample_images):
+    """Each mode places the data; refused links fall back down the chain"""
+    src = make_source(tmp_path, sample_images[0])
+    data = src.read_bytes()
+    out = tmp_path / "out"
+    out.mkdir()
+    
+    assert transfer_file(src, out / "hard.JPG", 'hardlink') == 'hardlink'
+    assert os.stat(out / "hard.JPG").st_ino == os.stat(src).st_ino
+    assert transfer_file(src, out / "sym.JPG", 'symlink') == 'symlink'
+    assert os.path.islink(out / "sym.JPG") and (out / "sym.JPG").read_bytes() == data
+    assert transfer_file(src, out / "ref.JPG", 'reflink') in ('reflink', 'copy_file_range', 'copy')
+    assert (out / "ref.JPG").read_bytes() == data
+    assert os.stat(out / "ref.JPG").st_mtime_ns == os.stat(src).st_mtime_ns
+    with pytest.raises(FileExistsError):
+        transfer_file(src, out / "ref.JPG", 'copy')
+    
+    # Cross-device hard link: reflink or copy instead; with nothing supported: plain copy
+    def refuse(*args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(os, 'link', refuse)
+    assert transfer_file(src, out / "fallback.JPG", 'hardlink') in ('reflink', 'copy_file_range', 'copy')
+    assert (out / "fallback.JPG").read_bytes() == data
+    monkeypatch.setattr(os, 'symlink', refuse)
+    monkeypatch.setattr(file_transfer, '_reflink', refuse)
+    assert transfer_file(src, out / "copied.JPG", 'symlink') == 'copy'
+    assert not os.path.islink(out / "copied.JPG") and (out / "copied.JPG").read_bytes() == data
+    monkeypatch.undo()
+    
+    # A copy_file_range that stops early is not a success: the file is copied instead
+    def no_clone(*args):
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+    if sys.platform == 'linux':
+        import fcntl
+        monkeypatch.setattr(fcntl, 'ioctl', no_clone)
+        monkeypatch.setattr(os, 'copy_file_range', lambda *args: 0)
+        assert transfer_file(src, out / "short.JPG", 'reflink') == 'copy'
+        assert (out / "short.JPG").read_bytes() == data
+        monkeypatch.undo()
+    
+    # Moves within one filesystem are a rename
+    assert transfer_file(src, out / "moved.JPG", 'move') == 'rename'
+    assert not src.exists() and (out / "moved.JPG").read_bytes() == data
+
+
+def test_organize_with_link_mode(tmp_path, sample_images):
+    """Hard-link organizing leaves the originals in place and keeps names unique"""
+    sources = []
+    for folder in ("dump1", "dump2"):
+        (tmp_path / folder).mkdir()
+        sources.append(Path(shutil.copy(sample_images[0], tmp_path / folder / "IMG_0001.JPG")))
+    crow = [{'common_name': 'Crow', 'confidence': 0.9}]
+    results = [DetectionResult(str(p), crow, DetectionMode.MOCK, 0.1, True) for p in sources]
+    results.append(DetectionResult(str(sources[0]), [], DetectionMode.MOCK, 0.1, True))
+    
+    info = FileManager().organize_images_by_species(results, str(tmp_path / "organized"),
+                                                    mode='hardlink')
+    assert info['success'] and info['operation'] == 'hardlink'
+    assert info['methods'] == {'hardlink': 3}
+    names = sorted(p.name for p in (tmp_path / "organized" / "Crow").iterdir())
+    assert names == ["IMG_0001.JPG", "IMG_0001_1.JPG"]
+    assert (tmp_path / "organized" / "no_detection" / "IMG_0001.JPG").exists()
+    assert all(p.exists() and os.stat(p).st_nlink == 3 - i for i, p in enumerate(sources))
+    assert "ハードリンク" in (tmp_path / "organized" / "organization_summary.txt").read_text(encoding='utf-8')
+    
+    with pytest.raises(ValueError):
+        FileManager().organize_images_by_species(results, str(tmp_path / "x"), mode='teleport')
+
+
+def test_move_summary_treats_rename_as_move(tmp_path, sample_images):
+    """Same-filesystem moves report rename but the summary shows no fallback"""
+    src = make_source(tmp_path, sample_images[0])
+    results = [DetectionResult(str(src), [], DetectionMode.MOCK, 0.1, True)]
+    
+    info = FileManager().organize_images_by_species(results, str(tmp_path / "organized"), mode='move')
+    assert info['methods'] == {'rename': 1}
+    summary = (tmp_path / "organized" / "organization_summary.txt").read_text(encoding='utf-8')
+    assert "移動" in summary and "実際の方法" not in summary
@@ -0,0 +1,75 @@
+"""
+Tests for bulk content hashing and the stat-keyed hash cache
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils import hashing
+from utils.file_manager import FileManager
+from utils.hashing import ALGORITHM_FAST, ALGORITHM_SHA256, hash_file
+
+
+def sha256_of(path, limit=None) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(limit) if limit else f.read()).hexdigest()
+
+
+def test_hash_file_matches_hashlib(monkeypatch, tmp_path, sample_images):
+    """Buffered and mmap reads give the same digests, whole files and prefixes"""
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert hash_file(empty) == hashlib.sha256(b"").hexdigest()
+    
+    for threshold in (hashing.MMAP_THRESHOLD, 1024):
+        monkeypatch.setattr(hashing, 'MMAP_THRESHOLD', threshold)
+        for path in sample_images[:2]:
+            assert hash_file(path) == sha256_of(path)
+            assert hash_file(path, limit=64 * 1024) == sha256_of(path, 64 * 1024)
+            assert hash_file(path, ALGORITHM_FAST) == hash_file(path, ALGORITHM_FAST)
+    assert hash_file(sample_images[0], ALGORITHM_FAST) != hash_file(sample_images[1], ALGORITHM_FAST)
+
+
+def test_hash_cache_skips_unchanged_files(monkeypatch, tmp_path, sample_images):
+    """Cached digests survive a new FileManager; changed files are read again"""
+    copies = []
+    for path in sample_images:
+        copy = tmp_path / Path(path).name
+        copy.write_bytes(Path(path).read_bytes())
+        copies.append(str(copy))
+    cache_path = tmp_path / "cache" / "hashes.sqlite"
+    
+    reads = []
+    real_hash_file = hashing.hash_file
+    monkeypatch.setattr(hashing, 'hash_file',
+                        lambda path, *args: reads.append(path) or real_hash_file(path, *args))
+    
+    manager = FileManager(hash_cache=cache_path)
+    first = manager.hash_files(copies + [copies[0], str(tmp_path / "missing.JPG")], workers=3)
+    assert first == {p: sha256_of(p) for p in copies}
+    assert len(reads) == len(copies)  # Repeated path read once, missing file left out
+    manager.close()
+    
+    reads.clear()
+    manager = FileManager(hash_cache=cache_path)
+    assert manager.hash_files(copies) == first
+    assert reads == []
+    assert manager.get_file_hash(copies[1]) == first[copies[1]]
+    assert reads == []
+    
+    # Rewriting a file changes its mtime and size: only that file is read again
+    Path(copies[2]).write_bytes(b"edited")
+    again = manager.hash_files(copies)
+    assert reads == [copies[2]]
+    assert again[copies[2]] == hashlib.sha256(b"edited").hexdigest()
+    
+    # Algorithms and prefix lengths are cached separately
+    fast = manager.hash_files(copies, ALGORITHM_FAST, limit=4096)
+    assert len(reads) == 1 + len(copies)
+    assert fast != again and len(manager.hash_cache) == 2 * len(copies)
+    assert manager.hash_files(copies, ALGORITHM_SHA256) == again
+    manager.close()
@@ -0,0 +1,98 @@
+"""
+Tests for the multi-job scheduler sharing one warm detector
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.job_manager import JobManager, JOB_CANCELLED, JOB_COMPLETED, JOB_PAUSED
+
+
+def test_weighted_fair_sharing(sample_images, make_processor):
+    """A job with weight 3 gets about three times the detector time of a weight-1 job"""
+    manager = JobManager(make_processor(), max_workers=1)
+    heavy = manager.submit(sample_images * 10, weight=3.0, name="heavy")
+    light = manager.submit(sample_images * 10, weight=1.0, name="light")
+    
+    assert heavy.wait(timeout=30)
+    light_done_then = light.completed
+    assert light.wait(timeout=30)
+    manager.shutdown()
+    
+    # 40 heavy images at weight 3 leave room for about 13 light ones
+    assert 6 <= light_done_then <= 22
+    assert heavy.state == light.state == JOB_COMPLETED
+    assert [r.image_path for r in heavy.get_results()] == sample_images * 10
+    stats = light.get_statistics()
+    assert stats.total_images == stats.processed_images == 40
+
+
+def test_pause_resume_and_cancel(sample_images, make_processor):
+    """Paused jobs yield the detector to others; cancelled jobs stop early"""
+    manager = JobManager(make_processor(), max_workers=1)
+    paused = manager.submit(sample_images * 5)
+    assert manager.pause(paused.job_id)
+    other = manager.submit(sample_images * 5)
+    
+    assert other.wait(timeout=30)
+    assert paused.state == JOB_PAUSED
+    assert paused.completed <= 1  # At most the image running when it was paused
+    
+    assert manager.resume(paused.job_id)
+    assert paused.wait(timeout=30)
+    assert paused.completed == 20
+    
+    events = []
+    cancelled = manager.submit(sample_images * 50, event_callback=events.append)
+    while cancelled.completed < 3:
+        time.sleep(0.01)
+    assert manager.cancel(cancelled.job_id)
+    assert cancelled.wait(timeout=10)
+    manager.shutdown()
+    
+    assert cancelled.state == JOB_CANCELLED
+    assert 3 <= cancelled.completed < 200
+    assert all(r.success for r in cancelled.get_results())
+    assert events[-1].final and events[-1].status == "キャンセル"
+    assert not manager.cancel(cancelled.job_id)
+
+
+def test_memory_limit_pauses_dispatch(monkeypatch, sample_images, make_processor):
+    """Near the memory limit only one image runs at a time until usage drops"""
+    import core.memory_governor as memory_governor
+    
+    usage = {'bytes': 2 * 1024 ** 3}
+    monkeypatch.setattr(memory_governor, 'sample_process_tree_rss', lambda: usage['bytes'])
+    processor = make_processor(memory_limit_gb=1.0, max_workers=4, mock_delay=0.02)
+    detect = processor.detector.detect_single
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+    
+    def counted(path, **kwargs):
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        try:
+            return detect(path, **kwargs)
+        finally:
+            with lock:
+                running['now'] -= 1
+    
+    processor.detector.detect_single = counted
+    manager = JobManager(processor)
+    throttled = manager.submit(sample_images * 3)
+    assert throttled.wait(timeout=30)
+    assert running['max'] == 1
+    assert manager.memory_governor.throttle_events == 1
+    
+    usage['bytes'] = 0
+    running['max'] = 0
+    free = manager.submit(sample_images * 10)
+    assert free.wait(timeout=30)
+    manager.shutdown()
+    assert running['max'] > 1
@@ -0,0 +1,117 @@
+"""
+Tests for incremental re-runs using the file manifest
+"""
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.manifest import FileManifest
+from core.species_detector import DetectionResult, DetectionMode
+from utils.hashing import HashCache, hash_file
+
+
+def copy_images(tmp_path, images) -> list:
+    folder = tmp_path / "archive"
+    folder.mkdir()
+    for image in images:
+        shutil.copy(image, folder)
+    return sorted(str(p) for p in folder.iterdir())
+
+
+def test_result_round_trip():
+    """from_dict rebuilds what to_dict produced"""
+    result = DetectionResult("a.jpg", [{'common_name': 'Sika Deer', 'confidence': 0.9}],
+                             DetectionMode.MOCK, 1.5, True, metadata={'attempts': 1})
+    restored = DetectionResult.from_dict(result.to_dict())
+    assert restored == result
+
+
+def test_incremental_rerun_only_infers_changed_files(tmp_path, sample_images, make_processor):
+    """A second run reuses unchanged results and re-infers only modified files"""
+    images = copy_images(tmp_path, sample_images)
+    
+    first = make_processor().process_incremental(images)
+    assert [r.image_path for r in first] == images
+    
+    # Modify one image
+    with open(images[0], 'ab') as f:
+        f.write(b'\0')
+    
+    processor = make_processor()
+    inferred = []
+    original = processor.detector.detect_single
+    
+    def counting_detect(image_path, **kwargs):
+        inferred.append(image_path)
+        return original(image_path, **kwargs)
+    
+    processor.detector.detect_single = counting_detect
+    second = processor.process_incremental(images)
+    stats = processor.get_statistics()
+    
+    assert inferred == [images[0]]
+    assert [r.image_path for r in second] == images
+    assert all(r.success for r in second)
+    assert stats.total_images == len(images)
+    assert stats.processed_images == len(images)
+    assert stats.reused_results == len(images) - 1
+    assert [r.metadata.get('reused', False) for r in second] == [False] + [True] * (len(images) - 1)
+
+
+def test_model_change_invalidates_manifest(tmp_path, sample_images, make_processor):
+    """Results from another model version are not reused"""
+    images = copy_images(tmp_path, sample_images)
+    make_processor().process_incremental(images)
+    
+    processor = make_processor(model_version='6.0')
+    processor.process_incremental(images)
+    assert processor.get_statistics().reused_results == 0
+
+
+def test_threshold_change_reuses_raw_detections(tmp_path, sample_images, make_processor):
+    """A new confidence threshold re-filters stored raw detections instead of re-running"""
+    images = copy_images(tmp_path, sample_images)
+    first = make_processor().process_incremental(images)
+    
+    processor = make_processor(confidence_threshold=0.999)
+    second = processor.process_incremental(images)
+    
+    assert processor.get_statistics().reused_results == len(images)
+    assert all(r.detections == [] for r in second)
+    assert [r.raw_detections for r in second] == [r.raw_detections for r in first]
+
+
+def test_hash_reuses_touched_files(tmp_path, sample_images):
+    """With hashing, a new mtime with identical contents still reuses the result"""
+    images = copy_images(tmp_path, sample_images)
+    manifest = FileManifest(tmp_path / "m.sqlite", "v1", use_hash=True)
+    results = [DetectionResult(p, [], DetectionMode.MOCK, 0.1, True) for p in images]
+    assert manifest.record(results) == len(images)
+    
+    st = os.stat(images[1])
+    os.utime(images[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    
+    changed, reused = manifest.partition(images)
+    assert changed == []
+    assert set(reused) == set(images)
+    manifest.close()
+
+
+def test_hash_goes_through_shared_hash_cache(tmp_path, sample_images):
+    """Manifest digests are the hashing module's and land in the shared hash cache"""
+    images = copy_images(tmp_path, sample_images)
+    manifest = FileManifest.for_root(tmp_path / "cache", tmp_path / "archive", "v1", use_hash=True)
+    results = [DetectionResult(p, [], DetectionMode.MOCK, 0.1, True) for p in images]
+    manifest.record(results)
+    stored = manifest._rows([manifest._key(images[0])])[manifest._key(images[0])]
+    manifest.close()
+    
+    assert stored[2] == hash_file(images[0])
+    cache = HashCache(tmp_path / "cache" / "hashes.sqlite")
+    assert len(cache) == len(images)
+    cache.close()
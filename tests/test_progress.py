@@ -0,0 +1,67 @@
+"""
+Tests for rate-limited progress dispatch
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.progress import ProgressDispatcher, ProgressEvent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_updates_are_coalesced_to_max_rate():
+    """Only one update per interval is delivered; the newest one wins"""
+    clock = FakeClock()
+    received = []
+    dispatcher = ProgressDispatcher(event_callback=received.append, max_rate=10.0, clock=clock)
+    
+    for i in range(1, 11):
+        clock.now = i * 0.01
+        dispatcher.publish(ProgressEvent(current=i, total=100, status="処理中"))
+    
+    assert [e.current for e in received] == [1]
+    
+    clock.now = 0.2
+    dispatcher.poll()
+    assert [e.current for e in received] == [1, 10]
+    assert received[-1].coalesced == 8
+    assert dispatcher.coalesced == 8
+
+
+def test_final_event_is_always_delivered():
+    """A final event bypasses the rate limit and replaces pending updates"""
+    clock = FakeClock()
+    received = []
+    dispatcher = ProgressDispatcher(callback=lambda *args: received.append(args), max_rate=1.0, clock=clock)
+    
+    dispatcher.publish(ProgressEvent(current=1, total=3, status="処理中", filename="a.jpg"))
+    dispatcher.publish(ProgressEvent(current=2, total=3, status="処理中", filename="b.jpg"))
+    dispatcher.publish(ProgressEvent(current=3, total=3, status="完了", final=True))
+    
+    assert received == [(1, 3, "処理中", "a.jpg"), (3, 3, "完了", "")]
+
+
+def test_batch_progress_events(sample_images, make_processor):
+    """A fast batch delivers few events, ending with complete counts"""
+    processor = make_processor(mock_delay=0.0, progress_max_rate=2.0)
+    events = []
+    images = sample_images * 10
+    
+    processor.process_batch(images, event_callback=events.append)
+    
+    final = events[-1]
+    assert final.final and final.status == "完了"
+    assert final.current == len(images)
+    assert sum(final.status_counts.values()) == len(images)
+    assert final.eta is not None and final.eta.seconds == 0
+    assert len(events) < len(images)
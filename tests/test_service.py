@@ -0,0 +1,168 @@
+"""
+Tests for the local detection service and its pooled client
+"""
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from service.client import DetectionClient, ServiceError
+from service.server import DetectionService, MicroBatcher
+
+
+@pytest.fixture
+def service(make_processor):
+    """MOCK detection service on a free localhost port"""
+    processor = make_processor()
+    detection_service = DetectionService(processor, max_batch_size=8, max_delay=0.1)
+    server = detection_service.make_server('127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield detection_service, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    detection_service.close()
+    processor.cleanup()
+
+
+def test_batcher_coalesces_by_size_and_deadline():
+    """A full batch is dispatched at once; a partial one after the deadline"""
+    batches = []
+    
+    def process(paths):
+        batches.append(list(paths))
+        return [type('Result', (), {'image_path': p})() for p in paths]
+    
+    batcher = MicroBatcher(process, max_batch_size=3, max_delay=0.2)
+    futures = [batcher.submit(f"img{i}.jpg") for i in range(4)]
+    assert [f.result(timeout=5).image_path for f in futures] == [f"img{i}.jpg" for i in range(4)]
+    batcher.close()
+    
+    assert [len(b) for b in batches] == [3, 1]
+
+
+def test_concurrent_requests_share_batches(service, sample_images):
+    """Concurrent single-image requests are answered from fewer backend batches"""
+    detection_service, url = service
+    images = sample_images * 4
+    
+    with DetectionClient(url, pool_size=8) as client:
+        with ThreadPoolExecutor(max_workers=len(images)) as pool:
+            results = list(pool.map(client.detect, images))
+    
+    assert [r.image_path for r in results] == images
+    assert all(r.success for r in results)
+    assert detection_service.batcher.items == len(images)
+    assert detection_service.batcher.batches < len(images)
+    assert detection_service.batcher.largest_batch > 1
+
+
+def test_requests_and_jobs_share_one_worker_pool(service, sample_images):
+    """Micro-batches and batch jobs together never exceed max_workers detections"""
+    detection_service, url = service
+    detector = detection_service.processor.detector
+    detect = detector.detect_single
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+    
+    def counted(path, **kwargs):
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        try:
+            return detect(path, **kwargs)
+        finally:
+            with lock:
+                running['now'] -= 1
+    
+    detector.detect_single = counted
+    images = sample_images * 4
+    with DetectionClient(url, pool_size=8) as client:
+        job_id = client.submit_batch(sample_images * 10, name="archive")
+        with ThreadPoolExecutor(max_workers=len(images)) as pool:
+            results = list(pool.map(client.detect, images))
+        client.wait_for_job(job_id, poll_interval=0.05, timeout=30)
+        
+        assert all(r.success for r in results)
+        assert [job['name'] for job in client.list_jobs()] == ["archive"]
+    assert running['max'] <= detection_service.job_manager.max_workers
+
+
+def test_client_reuses_connections(service, sample_images):
+    """Sequential requests run over one keep-alive connection"""
+    _, url = service
+    with DetectionClient(url, pool_size=2) as client:
+        for image in sample_images:
+            assert client.detect(image, confidence_threshold=0.999).detections == []
+        assert client.health()['status'] == 'ok'
+        assert client.connections_opened == 1
+
+
+def test_upload_and_batch_job(service, sample_images):
+    """Image bytes can be uploaded and batch jobs report status and results"""
+    _, url = service
+    with DetectionClient(url) as client:
+        result = client.detect_bytes(Path(sample_images[0]).read_bytes(), filename="camera01.jpg")
+        assert result.success
+        assert result.image_path == "camera01.jpg"
+        
+        job_id = client.submit_batch(sample_images)
+        results = client.wait_for_job(job_id, poll_interval=0.05, timeout=30)
+        assert [r.image_path for r in results] == sample_images
+        status = client.job_status(job_id)
+        assert status['completed'] == status['total'] == len(sample_images)
+        
+        with pytest.raises(ServiceError) as error:
+            client.job_status("missing")
+        assert error.value.status == 404
+
+
+def test_job_actions(service, sample_images):
+    """Batch jobs can be paused, resumed and cancelled over HTTP"""
+    _, url = service
+    with DetectionClient(url) as client:
+        job_id = client.submit_batch(sample_images * 50, weight=2.0, name="archive")
+        assert client.pause_job(job_id)['state'] == 'paused'
+        assert client.resume_job(job_id)['state'] in ('queued', 'running')
+        assert client.cancel_job(job_id)['state'] == 'cancelled'
+        assert [job['name'] for job in client.list_jobs()] == ["archive"]
+        
+        with pytest.raises(ServiceError) as error:
+            client.resume_job(job_id)
+        assert error.value.status == 409
+
+
+def test_client_retries_only_idempotent_requests():
+    """A dropped connection repeats a GET but never a POST the server may have run"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    received = []
+    
+    def drop_connections():
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return
+            with connection:
+                received.append(connection.recv(65536).split(b' ', 1)[0])
+    
+    threading.Thread(target=drop_connections, daemon=True).start()
+    with DetectionClient(f"http://127.0.0.1:{listener.getsockname()[1]}") as client:
+        with pytest.raises(ConnectionError):
+            client.submit_batch(["a.jpg"])
+        assert received == [b'POST']
+        
+        received.clear()
+        with pytest.raises(ConnectionError):
+            client.health()
+        assert received == [b'GET', b'GET']
+    listener.close()
@@ -0,0 +1,139 @@
+"""
+Tests for processing statistics
+"""
+import sys
+import threading
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.stats import ProcessingStats, StatsAggregator, MAX_ERRORS
+from core.species_detector import DetectionResult, DetectionMode
+
+
+def make_result(success=True, species=("Sus scrofa",), path="img.jpg"):
+    """Build a minimal DetectionResult"""
+    return DetectionResult(
+        image_path=path,
+        detections=[{'common_name': s, 'confidence': 0.9} for s in species] if success else [],
+        mode=DetectionMode.MOCK,
+        processing_time=0.1,
+        success=success,
+        error_message=None if success else "boom"
+    )
+
+
+def test_merge_adds_counters_and_species():
+    """Merging shards adds counters and species counts"""
+    a, b = ProcessingStats(), ProcessingStats()
+    a.record_result(make_result(species=("Sus scrofa", "Cervus nippon")))
+    b.record_result(make_result(species=("Sus scrofa",)))
+    b.record_result(make_result(success=False))
+    
+    merged = ProcessingStats.merged([a, b])
+    
+    assert merged.processed_images == 3
+    assert merged.successful_detections == 2
+    assert merged.failed_detections == 1
+    assert merged.species_counts == {"Sus scrofa": 2, "Cervus nippon": 1}
+    assert list(merged.errors) == [{'image': 'img.jpg', 'error': 'boom'}]
+
+
+def test_inferred_images_leave_out_duplicates_and_skipped():
+    """Duplicates, rejected/quarantined skips and reused results are not inferred"""
+    stats = ProcessingStats()
+    for i in range(4):
+        stats.record_result(make_result(path=f"{i}.jpg"))
+    shared = make_result(path="copy.jpg")
+    shared.metadata['duplicate_of'] = "0.jpg"
+    stats.record_result(shared)
+    for i in range(2):
+        rejected = make_result(success=False, path=f"bad{i}.jpg")
+        rejected.metadata['pipeline_stage'] = 'skipped'
+        stats.record_result(rejected)
+    stats.processing_time = 2.0
+    
+    assert stats.processed_images == 7
+    assert stats.inferred_images == 4
+    assert stats.average_time_per_image == 0.5
+    assert stats.to_dict()['inferred_images'] == 4
+
+
+def test_error_ring_is_bounded():
+    """The error log keeps the newest entries and counts the overflow"""
+    stats = ProcessingStats()
+    for i in range(MAX_ERRORS + 25):
+        stats.record_result(make_result(success=False, path=f"{i}.jpg"))
+    
+    assert len(stats.errors) == MAX_ERRORS
+    assert stats.errors_dropped == 25
+    assert stats.errors[-1]['image'] == f"{MAX_ERRORS + 24}.jpg"
+    assert stats.to_dict()['errors_dropped'] == 25
+
+
+def test_dict_round_trip():
+    """Statistics survive to_dict/from_dict, as used for result shards on disk"""
+    stats = ProcessingStats(total_images=2, processing_time=1.5)
+    stats.record_result(make_result())
+    stats.record_result(make_result(success=False))
+    
+    restored = ProcessingStats.from_dict(stats.to_dict())
+    
+    assert restored.to_dict() == stats.to_dict()
+
+
+def test_aggregator_snapshot_from_many_threads():
+    """Concurrent workers record into shards and a snapshot sees every result"""
+    aggregator = StatsAggregator(total_images=800)
+    
+    def worker():
+        for _ in range(100):
+            aggregator.record_result(make_result())
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    snapshot = aggregator.snapshot()
+    assert snapshot.total_images == 800
+    assert snapshot.processed_images == 800
+    assert snapshot.species_counts == {"Sus scrofa": 800}
+    
+    # Snapshots are private copies
+    snapshot.species_counts.clear()
+    assert aggregator.snapshot().species_counts == {"Sus scrofa": 800}
+
+
+def test_latency_histogram_percentiles():
+    """Percentiles are within one log bucket of the exact values"""
+    from core.stats import LatencyHistogram
+    
+    hist = LatencyHistogram()
+    for i in range(1, 1001):
+        hist.record(i / 100.0)  # 0.01 s .. 10 s
+    
+    assert hist.count == 1000
+    assert hist.max == 10.0
+    assert 5.0 <= hist.percentile(50) <= 5.0 * LatencyHistogram.GROWTH
+    assert 9.9 <= hist.percentile(99) <= 10.0
+    assert hist.percentile(100) == 10.0
+
+
+def test_latency_histograms_merge_and_round_trip():
+    """Histograms from different shards merge and survive to_dict/from_dict"""
+    a, b = ProcessingStats(), ProcessingStats()
+    a.record_result(make_result(), latency=0.5, stage_times={'detect': 0.4})
+    b.record_result(make_result(), latency=40.0, stage_times={'detect': 39.0, 'queue': 0.5})
+    
+    merged = ProcessingStats.merged([a, b])
+    assert merged.latency.count == 2
+    assert merged.latency.max == 40.0
+    assert set(merged.stage_latency) == {'detect', 'queue'}
+    
+    restored = ProcessingStats.from_dict(merged.to_dict())
+    assert restored.to_dict()['latency'] == merged.to_dict()['latency']
+    assert restored.stage_latency['detect'].percentile(99) == merged.stage_latency['detect'].percentile(99)
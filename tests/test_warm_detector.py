@@ -0,0 +1,35 @@
+"""
+Tests for reusing a warm detector across runs
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.warm_detector import shared_detector_cache
+
+
+def test_runs_share_the_warm_detector(sample_images, make_processor):
+    """Later runs reuse the detector until a detector setting changes"""
+    cache = shared_detector_cache()
+    cache.clear()
+    loads = cache.loads
+    
+    first = make_processor(reuse_detector=True)
+    detector = first.detector
+    first.process_batch(sample_images)
+    first.cancel_processing()
+    first.cleanup()
+    
+    # A new run after a cancel gets the same detector, ready to work again
+    second = make_processor(reuse_detector=True, confidence_threshold=0.9, max_workers=1)
+    assert second.detector is detector
+    assert all(r.success for r in second.process_batch(sample_images))
+    assert cache.loads == loads + 1
+    
+    third = make_processor(reuse_detector=True, country_code='USA')
+    assert third.detector is not detector
+    assert cache.loads == loads + 2
+    cache.clear()
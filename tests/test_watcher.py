@@ -0,0 +1,145 @@
+"""
+Tests for watch-folder ingestion
+"""
+import csv
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.watcher import (ArrivalBatcher, FileSettler, InotifyWatcher, PollingWatcher,
+                          WatchFolderService)
+from utils.csv_exporter import CSVExporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_settler_waits_for_file_to_stop_growing(tmp_path):
+    """A file is only released after its size stayed stable for settle_seconds"""
+    clock = FakeClock()
+    settler = FileSettler(settle_seconds=2.0, clock=clock)
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"x" * 10)
+    
+    settler.add(str(path), 100.0)
+    assert settler.ready() == []
+    
+    clock.now = 1.5
+    with open(path, 'ab') as f:
+        f.write(b"y" * 10)
+    assert settler.ready() == []
+    
+    clock.now = 3.0
+    assert settler.ready() == []
+    clock.now = 3.6
+    ready = settler.ready()
+    assert [p for p, _ in ready] == [str(path)]
+    assert ready[0][1] > 100.0  # close time moved forward with the late write
+    assert len(settler) == 0
+
+
+def test_batcher_flushes_by_count_and_time():
+    """Batches are cut at max_files or once the oldest file waited max_wait"""
+    clock = FakeClock()
+    batcher = ArrivalBatcher(max_files=3, max_wait=5.0, clock=clock)
+    
+    batcher.add([(f"{i}.jpg", 0.0) for i in range(4)])
+    assert [p for p, _ in batcher.take()] == ["0.jpg", "1.jpg", "2.jpg"]
+    assert batcher.take() == []
+    
+    clock.now = 5.0
+    assert [p for p, _ in batcher.take()] == ["3.jpg"]
+    assert not batcher.due()
+
+
+def test_polling_watcher_reports_only_new_files(tmp_path):
+    """Existing files form the baseline; new images are reported, other files ignored"""
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    watcher = PollingWatcher(str(tmp_path), poll_interval=0.05)
+    
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "new.JPG").write_bytes(b"new")
+    (tmp_path / "notes.txt").write_text("ignored")
+    
+    arrivals = watcher.poll(timeout=0.5)
+    assert [Path(p).name for p, _ in arrivals] == ["new.JPG"]
+    assert watcher.poll(timeout=0.5) == []
+
+
+def test_inotify_watcher_sees_new_subdirectories(tmp_path):
+    """Files written into a directory created after start are reported"""
+    try:
+        watcher = InotifyWatcher(str(tmp_path))
+    except OSError:
+        pytest.skip("inotify not available")
+    
+    try:
+        (tmp_path / "card01").mkdir()
+        assert watcher.poll(1.0) == []  # directory event: starts watching card01
+        (tmp_path / "card01" / "IMG_0001.JPG").write_bytes(b"data")
+        
+        seen = set()
+        deadline = time.monotonic() + 2.0
+        while time.monotonic() < deadline and not seen:
+            seen |= {p for p, _ in watcher.poll(0.1)}
+        assert str(tmp_path / "card01" / "IMG_0001.JPG") in seen
+    finally:
+        watcher.close()
+
+
+def test_watch_service_ingests_and_appends(tmp_path, sample_images, make_processor):
+    """New images are processed once, appended to the rolling export and timed"""
+    watch_dir = tmp_path / "inbox"
+    watch_dir.mkdir()
+    processor = make_processor()
+    exporter = CSVExporter(str(tmp_path / "out"))
+    
+    service = WatchFolderService(processor, str(watch_dir), exporter,
+                                 settle_seconds=0.1, batch_max_files=len(sample_images),
+                                 batch_max_wait=0.2, poll_interval=0.05, use_inotify=False)
+    for image in sample_images:
+        shutil.copy(image, watch_dir)
+    
+    service.run(max_batches=1)
+    
+    assert service.stats.processed_images == len(sample_images)
+    assert service.ingest_latency.count == len(sample_images)
+    assert 'ingest' in service.stats.stage_latency
+    
+    exports = list((tmp_path / "out").glob("wildlife_detection_watch_*.csv"))
+    assert len(exports) == 1
+    with open(exports[0], newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    assert {r['Image File'] for r in rows} == {Path(p).name for p in sample_images}
+    
+    # Unchanged files reported again (e.g. after an inotify overflow) are skipped
+    for image in sample_images:
+        service.settler.add(str(watch_dir / Path(image).name), time.time())
+    for _ in range(10):
+        service.step(timeout=0.05)
+    assert service.batches == 1
+    assert service.stats.processed_images == len(sample_images)
+
+
+def test_watch_service_bounds_processed_memory(tmp_path, sample_images, make_processor):
+    """Only the most recently processed files are remembered"""
+    # One worker keeps completion order equal to input order
+    service = WatchFolderService(make_processor(max_workers=1), str(tmp_path), use_inotify=False,
+                                 remember_files=2)
+    service._process([(path, time.time()) for path in sample_images])
+    
+    assert list(service._processed) == sample_images[-2:]
+    assert not service._is_new(sample_images[-1])
+    assert service._is_new(sample_images[0])
@@ -13,6 +13,7 @@ import ast
 
 from core.species_detector import DetectionResult, DetectionMode
 from core.batch_processor import ProcessingStats
+from core.detection_table import DetectionTable
 
 
 class CSVExporter:
@@ -33,13 +34,16 @@ class CSVExporter:
         
     def export_all(self, 
                    results: List[DetectionResult], 
-                   stats: Optional[ProcessingStats] = None) -> Dict[str, str]:
+                   stats: Optional[ProcessingStats] = None,
+                   confidence_threshold: Optional[float] = None) -> Dict[str, str]:
         """
         Export all results to CSV files
         
         Args:
             results: List of detection results
             stats: Optional processing statistics
+            confidence_threshold: Re-filter the raw detections at this
+                threshold (default: keep the threshold used for processing)
             
         Returns:
             Dictionary of output file paths
@@ -47,6 +51,14 @@ class CSVExporter:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_files = {}
         
+        if confidence_threshold is not None:
+            table = DetectionTable(results)
+            results = table.apply(confidence_threshold)
+            if stats:
+                stats = stats.copy()
+                stats.species_counts = table.species_counts(confidence_threshold)
+                stats.total_detections = table.total_detections(confidence_threshold)
+        
         try:
             # Export detailed results
             details_file = self.export_detailed_results(results, timestamp)
@@ -60,6 +72,10 @@ class CSVExporter:
             species_file = self.export_species_stats(results, timestamp)
             output_files['species_stats'] = species_file
             
+            # Export duplicate groups if any
+            if any(r.metadata.get('duplicate_of') for r in results):
+                output_files['duplicates'] = self.export_duplicates(results, timestamp)
+            
             # Export errors if any
             if stats and stats.errors:
                 errors_file = self.export_errors(stats.errors, timestamp)
@@ -73,6 +89,20 @@ class CSVExporter:
             
         return output_files
     
+    DETAIL_FIELDS = [
+        'Image File', 
+        'Detection Count', 
+        'Species Name', 
+        'Scientific Name',
+        'Common Name',
+        'Category',
+        'Confidence', 
+        'Bounding Box',
+        'Processing Time (s)',
+        'Status',
+        'Error Message'
+    ]
+    
     def export_detailed_results(self, 
                                results: List[DetectionResult], 
                                timestamp: str) -> str:
@@ -81,61 +111,83 @@ class CSVExporter:
         filepath = self.output_directory / filename
         
         with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            fieldnames = [
-                'Image File', 
-                'Detection Count', 
-                'Species Name', 
-                'Scientific Name',
-                'Common Name',
-                'Category',
-                'Confidence', 
-                'Bounding Box',
-                'Processing Time (s)',
-                'Status',
-                'Error Message'
-            ]
-            
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=self.DETAIL_FIELDS)
             writer.writeheader()
             
             for result in results:
-                if not result.detections:
-                    # No detections or failed
-                    writer.writerow({
-                        'Image File': Path(result.image_path).name,
-                        'Detection Count': 0,
-                        'Species Name': 'No detection' if result.success else 'Error',
-                        'Scientific Name': '',
-                        'Common Name': '',
-                        'Category': '',
-                        'Confidence': '',
-                        'Bounding Box': '',
-                        'Processing Time (s)': f"{result.processing_time:.3f}",
-                        'Status': 'Success' if result.success else 'Failed',
-                        'Error Message': result.error_message or ''
-                    })
-                else:
-                    # Write row for each detection
-                    for detection in result.detections:
-                        bbox_str = self._format_bbox(detection.get('bbox', []))
-                        
-                        writer.writerow({
-                            'Image File': Path(result.image_path).name,
-                            'Detection Count': len(result.detections),
-                            'Species Name': detection.get('common_name', 'Unknown'),
-                            'Scientific Name': detection.get('scientific_name', ''),
-                            'Common Name': detection.get('english_name', ''),
-                            'Category': detection.get('category', ''),
-                            'Confidence': f"{detection.get('confidence', 0):.3f}",
-                            'Bounding Box': bbox_str,
-                            'Processing Time (s)': f"{result.processing_time:.3f}",
-                            'Status': 'Success',
-                            'Error Message': ''
-                        })
+                writer.writerows(self._detail_rows(result))
         
         self.logger.info(f"Detailed results exported to: {filepath}")
         return str(filepath)
     
+    def append_results(self, 
+                       results: List[DetectionResult], 
+                       date: Optional[datetime] = None) -> str:
+        """
+        Append detailed results to the rolling (daily) export
+        
+        Used by watch mode: each batch of arrivals is appended to
+        wildlife_detection_watch_YYYYMMDD.csv, and a new file starts every day.
+        
+        Args:
+            results: Detection results to append
+            date: Date selecting the file (default: today)
+            
+        Returns:
+            Path of the rolling export file
+        """
+        date = date or datetime.now()
+        filepath = self.output_directory / f"wildlife_detection_watch_{date.strftime('%Y%m%d')}.csv"
+        is_new = not filepath.exists() or filepath.stat().st_size == 0
+        
+        with open(filepath, 'a', newline='', encoding='utf-8-sig' if is_new else 'utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=self.DETAIL_FIELDS)
+            if is_new:
+                writer.writeheader()
+            for result in results:
+                writer.writerows(self._detail_rows(result))
+        
+        self.logger.debug(f"Appended {len(results)} result(s) to: {filepath}")
+        return str(filepath)
+    
+    def _detail_rows(self, result: DetectionResult) -> List[Dict[str, Any]]:
+        """Build the detailed-export rows of one result"""
+        if not result.detections:
+            # No detections or failed
+            return [{
+                'Image File': Path(result.image_path).name,
+                'Detection Count': 0,
+                'Species Name': 'No detection' if result.success else 'Error',
+                'Scientific Name': '',
+                'Common Name': '',
+                'Category': '',
+                'Confidence': '',
+                'Bounding Box': '',
+                'Processing Time (s)': f"{result.processing_time:.3f}",
+                'Status': 'Success' if result.success else 'Failed',
+                'Error Message': result.error_message or ''
+            }]
+        
+        # One row per detection
+        rows = []
+        for detection in result.detections:
+            bbox_str = self._format_bbox(detection.get('bbox', []))
+            
+            rows.append({
+                'Image File': Path(result.image_path).name,
+                'Detection Count': len(result.detections),
+                'Species Name': detection.get('common_name', 'Unknown'),
+                'Scientific Name': detection.get('scientific_name', ''),
+                'Common Name': detection.get('english_name', ''),
+                'Category': detection.get('category', ''),
+                'Confidence': f"{detection.get('confidence', 0):.3f}",
+                'Bounding Box': bbox_str,
+                'Processing Time (s)': f"{result.processing_time:.3f}",
+                'Status': 'Success',
+                'Error Message': ''
+            })
+        return rows
+    
     def export_summary(self, 
                       results: List[DetectionResult], 
                       stats: Optional[ProcessingStats],
@@ -169,9 +221,44 @@ class CSVExporter:
                 writer.writerow(['Processing Time (s)', f"{stats.processing_time:.2f}"])
                 writer.writerow(['Average Time per Image (s)', f"{stats.average_time_per_image:.3f}"])
                 writer.writerow(['Success Rate (%)', f"{stats.success_rate:.1f}"])
+                if stats.errors_dropped:
+                    writer.writerow(['Errors Not Logged (overflow)', stats.errors_dropped])
+                if stats.retries:
+                    writer.writerow(['Retries', stats.retries])
+                if stats.quarantined_images or stats.skipped_images:
+                    writer.writerow(['Quarantined Images', stats.quarantined_images])
+                    writer.writerow(['Skipped (Quarantined Earlier)', stats.skipped_images])
+                if stats.hedges_started:
+                    writer.writerow(['Hedged Stragglers', stats.hedges_started])
+                    writer.writerow(['Hedges Won', stats.hedges_won])
+                if stats.reused_results:
+                    writer.writerow(['Reused (Unchanged) Results', stats.reused_results])
+                if stats.rejected_files:
+                    writer.writerow(['Rejected Before Processing', stats.rejected_files])
+                    for reason, count in sorted(stats.rejection_reasons.items()):
+                        writer.writerow([f'  Rejected ({reason})', count])
+                if stats.duplicate_images:
+                    writer.writerow(['Duplicate Images (Result Shared)', stats.duplicate_images])
+                    writer.writerow(['Duplicate Bytes Saved (MB)', f"{stats.duplicate_bytes / (1024 * 1024):.1f}"])
                 
             writer.writerow([])
             
+            # Write latency percentiles
+            if stats and stats.latency.count:
+                writer.writerow(['Latency Percentiles (s)'])
+                writer.writerow(['Stage', 'Count', 'p50', 'p90', 'p99', 'Max'])
+                stages = [('overall', stats.latency)] + sorted(stats.stage_latency.items())
+                for stage, hist in stages:
+                    writer.writerow([
+                        stage,
+                        hist.count,
+                        f"{hist.percentile(50):.3f}",
+                        f"{hist.percentile(90):.3f}",
+                        f"{hist.percentile(99):.3f}",
+                        f"{hist.max:.3f}"
+                    ])
+                writer.writerow([])
+            
             # Write species summary
             if stats and stats.species_counts:
                 writer.writerow(['Species Detection Statistics'])
@@ -249,6 +336,26 @@ class CSVExporter:
         self.logger.info(f"Species statistics exported to: {filepath}")
         return str(filepath)
     
+    def export_duplicates(self, results: List[DetectionResult], timestamp: str) -> str:
+        """Export the images that shared the result of an identical file"""
+        filename = f"wildlife_detection_duplicates_{timestamp}.csv"
+        filepath = self.output_directory / filename
+        
+        with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            fieldnames = ['Image Path', 'Duplicate Of']
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            
+            for result in results:
+                if result.metadata.get('duplicate_of'):
+                    writer.writerow({
+                        'Image Path': result.image_path,
+                        'Duplicate Of': result.metadata['duplicate_of']
+                    })
+        
+        self.logger.info(f"Duplicate list exported to: {filepath}")
+        return str(filepath)
+    
     def export_errors(self, errors: List[Dict[str, str]], timestamp: str) -> str:
         """Export error log"""
         filename = f"wildlife_detection_errors_{timestamp}.csv"
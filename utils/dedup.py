@@ -0,0 +1,142 @@
+"""
+Exact-duplicate detection for Wildlife Detector AI
+Groups byte-identical images so each is inferred once
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .file_manager import FileManager
+from .hashing import ALGORITHM_FAST
+
+# Prefix hashed to split files of equal size before reading them in full
+PARTIAL_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DuplicateGroup:
+    """Byte-identical files; the first path is the one to process"""
+    size: int
+    paths: List[str]
+    
+    @property
+    def primary(self) -> str:
+        return self.paths[0]
+    
+    @property
+    def duplicates(self) -> List[str]:
+        return self.paths[1:]
+    
+    @property
+    def saved_bytes(self) -> int:
+        return self.size * (len(self.paths) - 1)
+
+
+@dataclass
+class DuplicateReport:
+    """Outcome of a duplicate search"""
+    unique_paths: List[str] = field(default_factory=list)
+    groups: List[DuplicateGroup] = field(default_factory=list)
+    partial_hashed: int = 0
+    full_hashed: int = 0
+    
+    @property
+    def duplicate_files(self) -> int:
+        return sum(len(g.paths) - 1 for g in self.groups)
+    
+    @property
+    def duplicate_bytes(self) -> int:
+        return sum(g.saved_bytes for g in self.groups)
+    
+    def primary_of(self) -> Dict[str, str]:
+        """{duplicate path: path whose result it shares}"""
+        return {path: group.primary for group in self.groups for path in group.duplicates}
+
+
+def _group_by_digest(candidates: Dict[Tuple, List[str]], file_manager: FileManager, workers: int,
+                     limit: int) -> Tuple[Dict[Tuple, List[str]], int]:
+    """Split candidate groups by content digest (of a prefix if limit); drop singletons"""
+    paths = [p for members in candidates.values() for p in members]
+    digests = file_manager.hash_files(paths, ALGORITHM_FAST, workers, limit)
+    groups: Dict[Tuple, List[str]] = {}
+    for key, members in candidates.items():
+        for path in members:
+            if path in digests:
+                groups.setdefault(key + (digests[path],), []).append(path)
+    return {key: members for key, members in groups.items() if len(members) > 1}, len(paths)
+
+
+def find_duplicates(image_paths: Iterable[Union[str, Path]],
+                    file_manager: Optional[FileManager] = None,
+                    workers: int = 4,
+                    partial_bytes: int = PARTIAL_BYTES) -> DuplicateReport:
+    """
+    Find byte-identical files
+    
+    Only files sharing a size are read: first a prefix of each, then the
+    whole file for those whose prefixes still match. Hard links to one file
+    are recognized from the inode without reading. Digests go through the
+    file manager's hash cache, so a re-run over the same archive reads
+    nothing.
+    
+    Args:
+        image_paths: Files to check
+        file_manager: FileManager hashing the files (its hash cache is used)
+        workers: Files hashed in parallel
+        partial_bytes: Prefix hashed in the first round
+    
+    Returns:
+        DuplicateReport; unique_paths keeps input order and holds the first
+        path of every group
+    """
+    file_manager = file_manager or FileManager()
+    paths = list(dict.fromkeys(str(p) for p in image_paths))
+    report = DuplicateReport()
+    
+    # Hard links are one file: group them by identity first
+    identities: Dict[Tuple[int, int], List[str]] = {}
+    sizes: Dict[str, int] = {}
+    by_size: Dict[Tuple, List[str]] = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        sizes[path] = st.st_size
+        if st.st_ino:
+            members = identities.setdefault((st.st_dev, st.st_ino), [])
+            members.append(path)
+            if len(members) > 1:
+                continue
+        if st.st_size:
+            by_size.setdefault((st.st_size,), []).append(path)
+    candidates = {key: members for key, members in by_size.items() if len(members) > 1}
+    
+    # Size, then prefix, then full contents; small files are settled by the prefix
+    candidates, report.partial_hashed = _group_by_digest(candidates, file_manager, workers, partial_bytes)
+    settled = {key: members for key, members in candidates.items() if key[0] <= partial_bytes}
+    remaining = {key: members for key, members in candidates.items() if key[0] > partial_bytes}
+    identical, report.full_hashed = _group_by_digest(remaining, file_manager, workers, 0)
+    identical.update(settled)
+    
+    # Expand hard links; the first path in input order is processed
+    order = {path: index for index, path in enumerate(paths)}
+    links = {members[0]: members for members in identities.values() if len(members) > 1}
+    grouped = [members for members in identical.values()]
+    in_groups = {path for members in grouped for path in members}
+    grouped.extend([first] for first in links if first not in in_groups)
+    for members in grouped:
+        expanded = sorted((p for m in members for p in links.get(m, [m])), key=order.__getitem__)
+        report.groups.append(DuplicateGroup(sizes[expanded[0]], expanded))
+    report.groups.sort(key=lambda g: order[g.primary])
+    
+    duplicates = set(report.primary_of())
+    report.unique_paths = [p for p in paths if p not in duplicates]
+    if report.groups:
+        logger.info(f"Found {report.duplicate_files} duplicate file(s) in {len(report.groups)} group(s), "
+                    f"{report.duplicate_bytes / (1024 * 1024):.1f}MB")
+    return report
@@ -0,0 +1,253 @@
+"""
+Image discovery utilities for Wildlife Detector AI
+Single-pass os.scandir walker with optional parallel directory listing
+"""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .file_sniffer import NON_IMAGE_EXTENSIONS, sniff_kind
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif')
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImageEntry:
+    """An image found during discovery (stat fields are -1/0 unless requested)"""
+    path: str
+    size: int = -1
+    mtime_ns: int = 0
+    inode: int = 0
+    device: int = 0
+
+
+def normalize_extensions(extensions: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Lower-case extensions with a leading dot, as a tuple for str.endswith"""
+    if extensions is None:
+        return IMAGE_EXTENSIONS
+    return tuple(e.lower() if e.startswith('.') else f'.{e.lower()}' for e in extensions)
+
+
+def path_sort_key(path: str) -> List[str]:
+    """Sort key giving the same order as sorting Path objects"""
+    return path.split(os.sep)
+
+
+def _scan_directory(directory: str, extensions: Tuple[str, ...],
+                    with_stat: bool, sniff_unknown: bool = False) -> Tuple[List[ImageEntry], List[str]]:
+    """
+    List one directory
+    
+    With sniff_unknown, files with other extensions (none, .jpe, .JPG_ ...)
+    are included when their magic bytes say they are images.
+    
+    Returns:
+        (images in the directory, subdirectories to descend into)
+    """
+    images = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    # d_type from readdir: no stat call for the common case
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    name = entry.name.lower()
+                    if name.endswith(extensions):
+                        if not entry.is_file():
+                            continue
+                    elif not (sniff_unknown and not name.endswith(NON_IMAGE_EXTENSIONS)
+                              and entry.is_file() and sniff_kind(entry.path)):
+                        continue
+                    if with_stat:
+                        st = entry.stat()
+                        images.append(ImageEntry(entry.path, st.st_size, st.st_mtime_ns,
+                                                 st.st_ino, st.st_dev))
+                    else:
+                        images.append(ImageEntry(entry.path))
+                except OSError:
+                    continue  # Vanished or unreadable entry
+    except OSError as e:
+        logger.warning(f"Cannot list {directory}: {e}")
+    return images, subdirs
+
+
+def _scan_tree(root: str, extensions: Tuple[str, ...], recursive: bool,
+               workers: int, with_stat: bool,
+               sniff_unknown: bool = False) -> Iterator[Tuple[List[ImageEntry], List[str]]]:
+    """Yield (images, subdirectories to be listed) of each directory as it is listed"""
+    if workers <= 1:
+        stack = [root]
+        while stack:
+            images, subdirs = _scan_directory(stack.pop(), extensions, with_stat, sniff_unknown)
+            if not recursive:
+                subdirs = []
+            yield images, subdirs
+            stack.extend(sorted(subdirs, reverse=True))
+        return
+    
+    # Directory listings are I/O bound (and slow on network shares):
+    # several are kept in flight, each subdirectory submitted once found
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='discovery') as executor:
+        pending = {executor.submit(_scan_directory, root, extensions, with_stat, sniff_unknown)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                images, subdirs = future.result()
+                if not recursive:
+                    subdirs = []
+                yield images, subdirs
+                pending.update(executor.submit(_scan_directory, d, extensions, with_stat,
+                                               sniff_unknown)
+                               for d in subdirs)
+
+
+def walk_images(directory: Union[str, Path],
+                extensions: Optional[Iterable[str]] = None,
+                recursive: bool = True,
+                workers: int = 1,
+                with_stat: bool = False,
+                sniff_unknown: bool = False) -> List[ImageEntry]:
+    """
+    Find image files in one pass over the tree
+    
+    Extensions match case-insensitively. Symlinked directories are not
+    followed (like Path.rglob); symlinked files are included.
+    
+    Args:
+        directory: Root directory
+        extensions: Extensions to match (default: IMAGE_EXTENSIONS)
+        recursive: Descend into subdirectories
+        workers: Directories listed in parallel
+        with_stat: Fill in size, mtime, inode and device
+        sniff_unknown: Also include files with other extensions whose
+            magic bytes identify an image
+    
+    Returns:
+        Entries sorted by path
+    """
+    entries = []
+    for images, _ in _scan_tree(str(directory), normalize_extensions(extensions), recursive,
+                                workers, with_stat, sniff_unknown):
+        entries.extend(images)
+    entries.sort(key=lambda e: path_sort_key(e.path))
+    return entries
+
+
+def iter_images(directory: Union[str, Path],
+                extensions: Optional[Iterable[str]] = None,
+                recursive: bool = True,
+                workers: int = 1,
+                with_stat: bool = False,
+                sniff_unknown: bool = False) -> Iterator[ImageEntry]:
+    """
+    Yield image files as their directories are listed
+    
+    Same matching as walk_images, but nothing waits for the whole tree:
+    images come directory by directory (sorted within each directory).
+    """
+    for images, _ in _scan_tree(str(directory), normalize_extensions(extensions), recursive,
+                                workers, with_stat, sniff_unknown):
+        images.sort(key=lambda e: e.path)
+        yield from images
+
+
+class DiscoveryFeed:
+    """
+    Background discovery feeding a processing pipeline
+    
+    The tree is walked on its own thread while the consumer iterates over
+    the paths found so far; iteration blocks only when the consumer has
+    caught up with discovery. estimate_total() extrapolates the final count
+    from the directories still waiting to be listed, so progress displays
+    have a total long before the walk ends.
+    """
+    
+    def __init__(self, directory: Union[str, Path],
+                 extensions: Optional[Iterable[str]] = None,
+                 recursive: bool = True,
+                 workers: int = 1,
+                 sniff_unknown: bool = False):
+        """
+        Start discovery
+        
+        Args:
+            directory: Root directory
+            extensions: Extensions to match (default: IMAGE_EXTENSIONS)
+            recursive: Descend into subdirectories
+            workers: Directories listed in parallel
+            sniff_unknown: Also include files with other extensions whose
+                magic bytes identify an image
+        """
+        self.directory = str(directory)
+        self.found = 0
+        self.listed_directories = 0
+        self.known_directories = 1
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(normalize_extensions(extensions), recursive, workers, sniff_unknown),
+            name="discovery-feed", daemon=True)
+        self._thread.start()
+    
+    def _run(self, extensions: Tuple[str, ...], recursive: bool, workers: int,
+             sniff_unknown: bool):
+        try:
+            for images, subdirs in _scan_tree(self.directory, extensions, recursive, workers,
+                                              False, sniff_unknown):
+                if self._stop.is_set():
+                    break
+                images.sort(key=lambda e: e.path)
+                with self._lock:
+                    self.listed_directories += 1
+                    self.known_directories += len(subdirs)
+                    self.found += len(images)
+                for entry in images:
+                    self._queue.put(entry.path)
+        except BaseException as e:
+            self.error = e
+            logger.error(f"Discovery of {self.directory} failed: {e}")
+        finally:
+            self.finished = True
+            self._queue.put(None)
+    
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            try:
+                path = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if path is None or self._stop.is_set():
+                return
+            yield path
+    
+    def estimate_total(self) -> int:
+        """Images found so far, plus an estimate for directories not listed yet"""
+        with self._lock:
+            if self.finished or not self.listed_directories:
+                return self.found
+            remaining = self.known_directories - self.listed_directories
+            return self.found + round(remaining * self.found / self.listed_directories)
+    
+    def stop(self):
+        """Stop discovery and end iteration"""
+        self._stop.set()
+    
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the walk to finish"""
+        self._thread.join(timeout)
@@ -7,15 +7,26 @@ import logging
 from pathlib import Path
 from typing import List, Optional, Union, Dict, Any
 from datetime import datetime
-import hashlib
+
+from .discovery import ImageEntry, walk_images
+from .hashing import ALGORITHM_SHA256, HashCache, hash_file, hash_files
+from .file_transfer import (METHOD_RENAME, MODE_COPY, MODE_LABELS, MODE_MOVE, ORGANIZE_MODES,
+                            transfer_file)
 
 
 class FileManager:
     """Handles file operations for the application"""
     
-    def __init__(self, base_path: Optional[str] = None):
+    def __init__(self, base_path: Optional[str] = None,
+                 hash_cache: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            base_path: Base directory for relative operations (default: cwd)
+            hash_cache: Optional SQLite file remembering digests of unchanged files
+        """
         self.base_path = Path(base_path) if base_path else Path.cwd()
         self.logger = logging.getLogger(__name__)
+        self.hash_cache = HashCache(hash_cache) if hash_cache else None
         
     def ensure_directory(self, directory: Union[str, Path]) -> Path:
         """Ensure a directory exists"""
@@ -25,24 +36,36 @@ class FileManager:
         
     def get_image_files(self, directory: Union[str, Path], 
                        extensions: Optional[List[str]] = None,
-                       recursive: bool = True) -> List[Path]:
-        """Get all image files in a directory"""
-        if extensions is None:
-            extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
-            
-        directory = Path(directory)
-        image_files = []
+                       recursive: bool = True,
+                       workers: int = 1,
+                       sniff_unknown: bool = False) -> List[Path]:
+        """
+        Get all image files in a directory
         
-        # Use rglob for recursive search, glob for non-recursive
-        glob_func = directory.rglob if recursive else directory.glob
+        Walks the tree once with os.scandir (extensions match in any case).
         
-        for ext in extensions:
-            image_files.extend(glob_func(f'*{ext}'))
-            image_files.extend(glob_func(f'*{ext.upper()}'))
+        Args:
+            directory: Directory to search
+            extensions: Extensions to match (default: common image formats)
+            recursive: Include subdirectories
+            workers: Directories listed in parallel (helps on network shares)
+            sniff_unknown: Also include files with other extensions whose
+                magic bytes identify an image
             
-        # Remove duplicates and sort
-        image_files = list(set(image_files))
-        return sorted(image_files)
+        Returns:
+            Sorted list of image paths
+        """
+        return [Path(entry.path) for entry in walk_images(directory, extensions, recursive, workers,
+                                                          sniff_unknown=sniff_unknown)]
+    
+    def get_image_entries(self, directory: Union[str, Path],
+                          extensions: Optional[List[str]] = None,
+                          recursive: bool = True,
+                          workers: int = 1,
+                          sniff_unknown: bool = False) -> List[ImageEntry]:
+        """Get image files with their size, mtime, inode and device"""
+        return walk_images(directory, extensions, recursive, workers, with_stat=True,
+                           sniff_unknown=sniff_unknown)
         
     def copy_with_structure(self, source: Path, dest_base: Path, 
                           preserve_structure: bool = True) -> Path:
@@ -63,17 +86,45 @@ class FileManager:
         
     def get_file_hash(self, file_path: Union[str, Path]) -> str:
         """Calculate SHA256 hash of a file"""
-        hash_sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+        if self.hash_cache is not None:
+            digests = self.hash_files([file_path], workers=1)
+            if str(file_path) in digests:
+                return digests[str(file_path)]
+        return hash_file(file_path, ALGORITHM_SHA256)
+    
+    def hash_files(self, file_paths: List[Union[str, Path]],
+                   algorithm: str = ALGORITHM_SHA256,
+                   workers: int = 4,
+                   limit: int = 0) -> Dict[str, str]:
+        """
+        Hash many files in parallel
+        
+        Unchanged files (same device, inode, size and mtime) take their
+        digest from the hash cache instead of being read again.
+        
+        Args:
+            file_paths: Files to hash
+            algorithm: 'sha256' or 'fast' (xxh3 if xxhash is installed, else SHA-256)
+            workers: Files hashed in parallel
+            limit: Hash only the first limit bytes of each file (0 = whole file)
+            
+        Returns:
+            {path: hex digest}; unreadable files are left out
+        """
+        return hash_files(file_paths, algorithm, workers, limit, self.hash_cache)
+    
+    def close(self):
+        """Close the hash cache"""
+        if self.hash_cache is not None:
+            self.hash_cache.close()
+            self.hash_cache = None
     
     def organize_images_by_species(self, 
                                  detection_results: List[Any],
                                  output_base: Optional[str] = None,
                                  copy_files: bool = True,
-                                 confidence_threshold: float = 0.5) -> Dict[str, Any]:
+                                 confidence_threshold: float = 0.5,
+                                 mode: Optional[str] = None) -> Dict[str, Any]:
         """
         Organize images into folders by detected species
         
@@ -82,10 +133,17 @@ class FileManager:
             output_base: Base directory for organized files
             copy_files: If True, copy files; if False, move files
             confidence_threshold: Minimum confidence for species assignment
+            mode: One of ORGANIZE_MODES ('move', 'copy', 'hardlink', 'reflink',
+                'symlink'); overrides copy_files. Link modes fall back to a
+                copy where the filesystem does not support them.
             
         Returns:
             Dictionary with organization results
         """
+        mode = mode or (MODE_COPY if copy_files else MODE_MOVE)
+        if mode not in ORGANIZE_MODES:
+            raise ValueError(f"Unknown organize mode: {mode}")
+        
         if output_base is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_base = self.base_path / f"organized_{timestamp}"
@@ -98,78 +156,41 @@ class FileManager:
         organized_count = 0
         total_count = len(detection_results)
         species_folders = {}
+        methods: Dict[str, int] = {}
         errors = []
         
         for result in detection_results:
             try:
-                if not result.success or not result.detections:
+                if not result.success or not (result.raw_detections or result.detections):
                     # No detection - put in "no_detection" folder
-                    species_folder = output_base / "no_detection"
-                    species_folder.mkdir(exist_ok=True)
-                    
-                    src_path = Path(result.image_path)
-                    if src_path.exists():
-                        dest_path = species_folder / src_path.name
-                        if copy_files:
-                            shutil.copy2(src_path, dest_path)
-                        else:
-                            shutil.move(str(src_path), str(dest_path))
-                        organized_count += 1
-                    continue
-                
-                # Get best detection above threshold
-                best_detection = None
-                for detection in result.detections:
-                    if detection.get('confidence', 0) >= confidence_threshold:
+                    folder_name = "no_detection"
+                else:
+                    # Get best detection above threshold (raw detections are
+                    # re-filtered, so any threshold works without re-inference)
+                    best_detection = None
+                    for detection in result.detections_above(confidence_threshold):
                         if best_detection is None or detection['confidence'] > best_detection['confidence']:
                             best_detection = detection
-                
-                if best_detection:
-                    # Create species folder
-                    species_name = best_detection.get('common_name', 'Unknown')
-                    # Sanitize folder name
-                    safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' 
-                                      for c in species_name).strip()
-                    
-                    species_folder = output_base / safe_name
-                    species_folder.mkdir(exist_ok=True)
                     
-                    # Track species folders
-                    if safe_name not in species_folders:
-                        species_folders[safe_name] = 0
-                    species_folders[safe_name] += 1
-                    
-                    # Copy or move file
-                    src_path = Path(result.image_path)
-                    if src_path.exists():
-                        # Handle duplicate filenames
-                        dest_path = species_folder / src_path.name
-                        if dest_path.exists():
-                            stem = src_path.stem
-                            suffix = src_path.suffix
-                            counter = 1
-                            while dest_path.exists():
-                                dest_path = species_folder / f"{stem}_{counter}{suffix}"
-                                counter += 1
+                    if best_detection:
+                        species_name = best_detection.get('common_name', 'Unknown')
+                        # Sanitize folder name
+                        folder_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' 
+                                              for c in species_name).strip()
                         
-                        if copy_files:
-                            shutil.copy2(src_path, dest_path)
-                        else:
-                            shutil.move(str(src_path), str(dest_path))
-                        organized_count += 1
-                else:
-                    # Low confidence - put in "low_confidence" folder
-                    species_folder = output_base / "low_confidence"
-                    species_folder.mkdir(exist_ok=True)
-                    
-                    src_path = Path(result.image_path)
-                    if src_path.exists():
-                        dest_path = species_folder / src_path.name
-                        if copy_files:
-                            shutil.copy2(src_path, dest_path)
-                        else:
-                            shutil.move(str(src_path), str(dest_path))
-                        organized_count += 1
+                        # Track species folders
+                        if folder_name not in species_folders:
+                            species_folders[folder_name] = 0
+                        species_folders[folder_name] += 1
+                    else:
+                        # Low confidence - put in "low_confidence" folder
+                        folder_name = "low_confidence"
+                
+                src_path = Path(result.image_path)
+                if src_path.exists():
+                    method = self._place_file(src_path, output_base / folder_name, mode)
+                    methods[method] = methods.get(method, 0) + 1
+                    organized_count += 1
                         
             except Exception as e:
                 self.logger.error(f"Error organizing {result.image_path}: {e}")
@@ -182,7 +203,8 @@ class FileManager:
             'total_images': total_count,
             'processed_images': organized_count,
             'species_folders': species_folders,
-            'operation': 'copy' if copy_files else 'move',
+            'operation': mode,
+            'methods': methods,
             'errors': errors
         }
         
@@ -193,7 +215,12 @@ class FileManager:
             f.write(f"{'=' * 50}\n\n")
             f.write(f"実行日時: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}\n")
             f.write(f"処理画像数: {organized_count}/{total_count}\n")
-            f.write(f"操作: {'コピー' if copy_files else '移動'}\n")
+            f.write(f"操作: {MODE_LABELS[mode]}\n")
+            # A same-filesystem move is a rename, not a fallback
+            expected = {mode, METHOD_RENAME} if mode == MODE_MOVE else {mode}
+            if set(methods) - expected:
+                used = ", ".join(f"{method}: {count}" for method, count in sorted(methods.items()))
+                f.write(f"実際の方法: {used}\n")
             f.write(f"信頼度閾値: {confidence_threshold:.2f}\n\n")
             
             f.write(f"種別フォルダ:\n")
@@ -209,6 +236,16 @@ class FileManager:
         
         return result_info
     
+    def _place_file(self, src_path: Path, folder: Path, mode: str) -> str:
+        """Put a file into a folder under a free name; return the method used"""
+        folder.mkdir(exist_ok=True)
+        dest_path = folder / src_path.name
+        counter = 1
+        while os.path.lexists(dest_path):
+            dest_path = folder / f"{src_path.stem}_{counter}{src_path.suffix}"
+            counter += 1
+        return transfer_file(src_path, dest_path, mode)
+    
     def create_backup(self, source_dir: Union[str, Path], 
                      backup_name: Optional[str] = None) -> Path:
         """Create a backup of a directory"""
@@ -0,0 +1,231 @@
+"""
+Image file sniffing for Wildlife Detector AI
+Magic-byte type detection and cheap structural checks run before inference
+"""
+import logging
+import os
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+KIND_JPEG = 'jpeg'
+KIND_PNG = 'png'
+KIND_BMP = 'bmp'
+KIND_TIFF = 'tiff'
+
+# Rejection reasons recorded in ProcessingStats.rejection_reasons
+REJECT_EMPTY = 'empty'
+REJECT_NOT_IMAGE = 'not_image'
+REJECT_TRUNCATED = 'truncated'
+REJECT_THUMBNAIL = 'thumbnail'
+REJECT_UNREADABLE = 'unreadable'
+
+# Extensions never worth opening when looking for images with odd names
+# (.THM files are JPEG thumbnails written next to camera videos)
+NON_IMAGE_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mts', '.m4v', '.wav', '.mp3', '.thm',
+                        '.txt', '.csv', '.json', '.xml', '.yaml', '.log', '.db',
+                        '.zip', '.pdf', '.ini')
+
+HEADER_BYTES = 32
+# Camera firmware appends text trailers (~16 KB) after the JPEG end marker
+TAIL_BYTES = 64 * 1024
+# JPEG header segments (EXIF with its embedded thumbnail) searched for the frame size
+JPEG_HEADER_LIMIT = 512 * 1024
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_IEND = b'IEND\xaeB`\x82'
+JPEG_SOI = b'\xff\xd8\xff'
+JPEG_EOI = b'\xff\xd9'
+# Start-of-frame markers (C4, C8 and CC are DHT, JPG and DAC)
+JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SniffResult:
+    """Outcome of sniffing one file (reason is None when it is accepted)"""
+    path: str
+    kind: Optional[str] = None
+    reason: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    
+    @property
+    def ok(self) -> bool:
+        return self.reason is None
+
+
+def detect_kind(header: bytes) -> Optional[str]:
+    """Image type from the first bytes of a file, or None"""
+    if header.startswith(JPEG_SOI):
+        return KIND_JPEG
+    if header.startswith(PNG_SIGNATURE):
+        return KIND_PNG
+    if header.startswith(b'BM') and len(header) >= 26:
+        return KIND_BMP
+    if header[:4] in (b'II*\x00', b'MM\x00*'):
+        return KIND_TIFF
+    return None
+
+
+def sniff_kind(path: str) -> Optional[str]:
+    """Image type of a file judged by its magic bytes (None if unreadable or not an image)"""
+    try:
+        with open(path, 'rb') as f:
+            return detect_kind(f.read(HEADER_BYTES))
+    except OSError:
+        return None
+
+
+def _jpeg_size(f) -> Tuple[int, int]:
+    """Frame size from the first SOF segment, skipping other segments by length"""
+    f.seek(2)
+    while f.tell() < JPEG_HEADER_LIMIT:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            break
+        code = marker[1]
+        if code == 0xFF:
+            f.seek(-1, os.SEEK_CUR)  # Fill byte
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue  # Markers without a length
+        length = f.read(2)
+        if len(length) < 2:
+            break
+        if code in JPEG_SOF:
+            frame = f.read(5)
+            if len(frame) < 5:
+                break
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        if code == 0xDA:
+            break  # Start of scan without a frame header
+        f.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+    return 0, 0
+
+
+def _check(f, kind: str, header: bytes, size: int) -> Tuple[Optional[str], int, int]:
+    """Structural check of an opened file: (rejection reason, width, height)"""
+    if kind == KIND_JPEG:
+        f.seek(max(0, size - TAIL_BYTES))
+        if f.read(TAIL_BYTES).rfind(JPEG_EOI) < 0:
+            return REJECT_TRUNCATED, 0, 0
+        width, height = _jpeg_size(f)
+        return None, width, height
+    
+    if kind == KIND_PNG:
+        if len(header) < 24 or header[12:16] != b'IHDR':
+            return REJECT_TRUNCATED, 0, 0
+        f.seek(max(0, size - 12))
+        if PNG_IEND not in f.read(12):
+            return REJECT_TRUNCATED, 0, 0
+        width, height = struct.unpack('>II', header[16:24])
+        return None, width, height
+    
+    if kind == KIND_BMP:
+        declared = struct.unpack('<I', header[2:6])[0]
+        if declared > size:
+            return REJECT_TRUNCATED, 0, 0
+        width, height = struct.unpack('<ii', header[18:26])
+        return None, abs(width), abs(height)
+    
+    # TIFF: only the byte order mark is checked
+    return None, 0, 0
+
+
+def sniff_file(path: str, min_dimension: int = 0) -> SniffResult:
+    """
+    Check that a file looks like a complete image
+    
+    JPEGs need an SOI marker and an EOI marker near the end, PNGs the
+    signature, an IHDR chunk and IEND, BMPs no more bytes declared than
+    present. Images whose larger side is below min_dimension (camera
+    thumbnails) are rejected when their size can be read from the header.
+    
+    Args:
+        path: File to check
+        min_dimension: Minimum length of the longer side in pixels (0 = no check)
+    
+    Returns:
+        SniffResult with the detected kind, or the rejection reason
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return SniffResult(path, reason=REJECT_EMPTY)
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_BYTES)
+            kind = detect_kind(header)
+            if kind is None:
+                return SniffResult(path, reason=REJECT_NOT_IMAGE)
+            reason, width, height = _check(f, kind, header, size)
+    except (OSError, struct.error):
+        return SniffResult(path, reason=REJECT_UNREADABLE)
+    
+    if reason is None and min_dimension and 0 < max(width, height) < min_dimension:
+        reason = REJECT_THUMBNAIL
+    return SniffResult(path, kind, reason, width, height)
+
+
+class FileSniffer:
+    """
+    Parallel sniffing pass in front of the processing queue
+    
+    Files are read on a thread pool (a header and the last few KB each), and
+    accepted paths come out in input order. Input is consumed with a bounded
+    window, so a slow stream such as a DiscoveryFeed is filtered as it
+    arrives. Rejections are counted by reason.
+    """
+    
+    def __init__(self, workers: int = 4, min_dimension: int = 0):
+        """
+        Args:
+            workers: Files read in parallel
+            min_dimension: Minimum length of the longer side in pixels (0 = no check)
+        """
+        self.workers = max(1, workers)
+        self.min_dimension = min_dimension
+        self.rejected: List[SniffResult] = []
+        self.reasons: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _record(self, result: SniffResult):
+        with self._lock:
+            self.rejected.append(result)
+            self.reasons[result.reason] = self.reasons.get(result.reason, 0) + 1
+        logger.debug(f"Rejected {result.path}: {result.reason}")
+    
+    def filter(self, paths: Iterable[str]) -> Iterator[str]:
+        """Yield the paths that pass, in input order"""
+        window = self.workers * 4
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sniff') as executor:
+            pending: Deque = deque()
+            for path in paths:
+                pending.append(executor.submit(sniff_file, path, self.min_dimension))
+                # Hand out finished heads without waiting for the stream to end
+                while pending and (len(pending) >= window or pending[0].done()):
+                    result = pending.popleft().result()
+                    if result.ok:
+                        yield result.path
+                    else:
+                        self._record(result)
+            while pending:
+                result = pending.popleft().result()
+                if result.ok:
+                    yield result.path
+                else:
+                    self._record(result)
+    
+    def check(self, paths: Iterable[str]) -> List[str]:
+        """Sniff all paths; return the accepted ones in input order"""
+        return list(self.filter(paths))
+    
+    @property
+    def rejected_count(self) -> int:
+        with self._lock:
+            return len(self.rejected)
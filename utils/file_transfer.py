@@ -0,0 +1,138 @@
+"""
+File placement for Wildlife Detector AI
+Copy, move and zero-copy link modes with automatic fallback
+"""
+import errno
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Union
+
+MODE_COPY = 'copy'
+MODE_MOVE = 'move'
+MODE_HARDLINK = 'hardlink'
+MODE_REFLINK = 'reflink'
+MODE_SYMLINK = 'symlink'
+ORGANIZE_MODES = (MODE_MOVE, MODE_COPY, MODE_HARDLINK, MODE_REFLINK, MODE_SYMLINK)
+
+# 振り分け結果・GUIでの表示名
+MODE_LABELS = {
+    MODE_MOVE: '移動',
+    MODE_COPY: 'コピー',
+    MODE_HARDLINK: 'ハードリンク',
+    MODE_REFLINK: 'リフリンク',
+    MODE_SYMLINK: 'シンボリックリンク',
+}
+
+# Methods reported by transfer_file (besides the modes themselves)
+METHOD_RENAME = 'rename'
+METHOD_COPY_FILE_RANGE = 'copy_file_range'
+
+# ioctl cloning one file's extents into another (Linux: Btrfs, XFS, bcachefs ...)
+FICLONE = 0x40049409
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+
+def _reflink(src: PathLike, dest: PathLike) -> str:
+    """
+    Copy-on-write clone, else an in-kernel copy
+    
+    Raises OSError when neither is available, leaving no destination file.
+    """
+    if sys.platform != 'linux':
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only supported on Linux")
+    import fcntl
+    
+    with open(src, 'rb') as fsrc, open(dest, 'xb') as fdest:
+        try:
+            try:
+                fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                method = MODE_REFLINK
+            except OSError:
+                # Server-side copy on NFS 4.2/SMB, reflink on some filesystems
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+                    if copied == 0:
+                        # Source shrank or the filesystem gave up: fall back to copy2
+                        raise OSError(errno.EIO, "copy_file_range stopped before the end of the file")
+                    remaining -= copied
+                method = METHOD_COPY_FILE_RANGE
+        except BaseException:
+            fdest.close()
+            os.unlink(dest)
+            raise
+    shutil.copystat(src, dest)
+    return method
+
+
+def _copy(src: PathLike, dest: PathLike, mode: str) -> str:
+    """Copy-like modes: each tries the cheaper method first and falls back"""
+    if mode == MODE_SYMLINK:
+        try:
+            os.symlink(os.path.abspath(src), dest)
+            return MODE_SYMLINK
+        except (OSError, NotImplementedError) as e:
+            # Windows needs developer mode or admin rights for symlinks
+            logger.debug(f"Symlink failed for {src}: {e}; trying a hard link")
+            mode = MODE_HARDLINK
+    if mode == MODE_HARDLINK:
+        try:
+            os.link(src, dest)
+            return MODE_HARDLINK
+        except OSError as e:
+            # Other device, FAT/exFAT, or too many links
+            logger.debug(f"Hard link failed for {src}: {e}; trying a reflink")
+            mode = MODE_REFLINK
+    if mode == MODE_REFLINK:
+        try:
+            return _reflink(src, dest)
+        except (OSError, AttributeError) as e:
+            logger.debug(f"Reflink failed for {src}: {e}; copying")
+    shutil.copy2(src, dest)
+    return MODE_COPY
+
+
+def same_device(src: PathLike, dest_dir: PathLike) -> bool:
+    """Whether a file and a directory are on the same filesystem"""
+    try:
+        return os.stat(src).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
+
+
+def transfer_file(src: PathLike, dest: PathLike, mode: str = MODE_COPY) -> str:
+    """
+    Place a file at a new path
+    
+    hardlink, reflink and symlink use no extra space for the data. Each
+    falls back when the filesystem refuses: symlink to hardlink, hardlink
+    to reflink, reflink to copy_file_range and then a normal copy. move
+    renames within a filesystem and copies then deletes across them.
+    
+    Args:
+        src: Source file
+        dest: Destination path (must not exist)
+        mode: One of ORGANIZE_MODES
+    
+    Returns:
+        Method actually used ('rename', 'move', 'hardlink', 'reflink',
+        'copy_file_range', 'symlink' or 'copy')
+    """
+    if mode not in ORGANIZE_MODES:
+        raise ValueError(f"Unknown organize mode: {mode}")
+    # The fallbacks must never overwrite (os.rename and copy2 would)
+    if os.path.lexists(dest):
+        raise FileExistsError(errno.EEXIST, "Destination exists", str(dest))
+    if mode == MODE_MOVE:
+        if same_device(src, Path(dest).parent):
+            os.rename(src, dest)
+            return METHOD_RENAME
+        shutil.move(str(src), str(dest))
+        return MODE_MOVE
+    return _copy(src, dest, mode)
@@ -0,0 +1,251 @@
+"""
+Content hashing for Wildlife Detector AI
+Bulk file hashing on a thread pool with a persistent stat-keyed hash cache
+"""
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional; the fast hash falls back to SHA-256 without it
+    xxhash = None
+
+ALGORITHM_SHA256 = 'sha256'
+# xxh3-128 when xxhash is installed: for deduplication, not security. The
+# fallback is SHA-256, since OpenSSL's (hardware accelerated on current CPUs)
+# outruns CPython's BLAKE2b by about 2x
+ALGORITHM_FAST = 'fast'
+
+# Files (or prefixes) at least this large are hashed through mmap
+MMAP_THRESHOLD = 4 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 150
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (device, inode, algorithm, length)
+)
+"""
+
+logger = logging.getLogger(__name__)
+
+# (device, inode, size, mtime_ns) of a file
+StatKey = Tuple[int, int, int, int]
+
+
+def algorithm_name(algorithm: str) -> str:
+    """Concrete hash behind an algorithm choice (stored with cached digests)"""
+    if algorithm == ALGORITHM_FAST and xxhash is not None:
+        return 'xxh3_128'
+    if algorithm in (ALGORITHM_FAST, ALGORITHM_SHA256):
+        return 'sha256'
+    raise ValueError(f"Unknown hash algorithm: {algorithm}")
+
+
+def _new_hasher(algorithm: str):
+    if algorithm_name(algorithm) == 'xxh3_128':
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+def hash_file(path: Union[str, Path], algorithm: str = ALGORITHM_SHA256, limit: int = 0) -> str:
+    """
+    Hash a file's contents
+    
+    Large files are mapped and hashed in one update call (hashlib releases
+    the GIL while it runs); smaller ones are read into a reused 1 MB buffer.
+    
+    Args:
+        path: File to hash
+        algorithm: ALGORITHM_SHA256 or ALGORITHM_FAST
+        limit: Hash only the first limit bytes (0 = whole file)
+    
+    Returns:
+        Hex digest
+    """
+    hasher = _new_hasher(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        length = min(size, limit) if limit else size
+        if length >= MMAP_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mapped:
+                    hasher.update(mapped)
+                return hasher.hexdigest()
+            except (OSError, ValueError):
+                hasher = _new_hasher(algorithm)  # Not mappable (some network filesystems)
+        
+        buffer = bytearray(min(BUFFER_SIZE, max(length, 1)))
+        view = memoryview(buffer)
+        remaining = length
+        while remaining > 0:
+            read = f.readinto(view[:min(remaining, len(buffer))])
+            if not read:
+                break
+            hasher.update(view[:read])
+            remaining -= read
+    return hasher.hexdigest()
+
+
+def stat_key(st: os.stat_result) -> StatKey:
+    """Cache key of a file: (device, inode, size, mtime_ns)"""
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class HashCache:
+    """
+    SQLite cache of file digests
+    
+    A digest is stored per file identity (device and inode), hash algorithm
+    and hashed length, together with the size and mtime it was computed
+    for. It is only returned while all of (device, inode, size, mtime_ns)
+    still match, so unchanged files are never read again and a rewritten
+    file replaces its old row instead of adding one.
+    """
+    
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Initialize cache
+        
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+    
+    def get_many(self, keys: Iterable[StatKey], algorithm: str, length: int = 0) -> Dict[StatKey, str]:
+        """
+        Look up cached digests
+        
+        Args:
+            keys: Stat keys of the files
+            algorithm: Algorithm choice the digests were made with
+            length: Hashed prefix length (0 = whole file)
+        
+        Returns:
+            {stat key: digest} for the keys with a valid entry
+        """
+        wanted = {(key[0], key[1]): key for key in keys}
+        name = algorithm_name(algorithm)
+        identities = list(wanted)
+        found = {}
+        with self._lock:
+            for i in range(0, len(identities), _QUERY_CHUNK):
+                chunk = identities[i:i + _QUERY_CHUNK]
+                condition = ' OR '.join(['(device = ? AND inode = ?)'] * len(chunk))
+                params = [value for identity in chunk for value in identity]
+                for device, inode, size, mtime_ns, digest in self._conn.execute(
+                        f"SELECT device, inode, size, mtime_ns, digest FROM hashes "
+                        f"WHERE algorithm = ? AND length = ? AND ({condition})",
+                        [name, length] + params):
+                    key = wanted[(device, inode)]
+                    if key[2] == size and key[3] == mtime_ns:
+                        found[key] = digest
+        return found
+    
+    def put_many(self, digests: Dict[StatKey, str], algorithm: str, length: int = 0):
+        """Store digests computed for the given stat keys"""
+        if not digests:
+            return
+        name = algorithm_name(algorithm)
+        rows = [(device, inode, name, length, size, mtime_ns, digest)
+                for (device, inode, size, mtime_ns), digest in digests.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes "
+                "(device, inode, algorithm, length, size, mtime_ns, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+    
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
+
+
+def hash_files(paths: Iterable[Union[str, Path]],
+               algorithm: str = ALGORITHM_SHA256,
+               workers: int = 4,
+               limit: int = 0,
+               cache: Optional[HashCache] = None) -> Dict[str, str]:
+    """
+    Hash many files in parallel, reusing cached digests of unchanged files
+    
+    Args:
+        paths: Files to hash
+        algorithm: ALGORITHM_SHA256 or ALGORITHM_FAST
+        workers: Files hashed in parallel
+        limit: Hash only the first limit bytes of each file (0 = whole file)
+        cache: Optional persistent cache
+    
+    Returns:
+        {path: hex digest}; unreadable files are left out
+    """
+    keys: Dict[str, tuple] = {}
+    for path in map(str, paths):
+        try:
+            keys[path] = stat_key(os.stat(path))
+        except OSError as e:
+            logger.warning(f"Cannot hash {path}: {e}")
+    
+    # Without inode numbers (some filesystems report 0) files cannot be told apart
+    keys = {path: key if key[1] else (path,) for path, key in keys.items()}
+    cached = {}
+    if cache is not None:
+        cached = cache.get_many([key for key in keys.values() if len(key) == 4], algorithm, limit)
+    digests = {path: cached[key] for path, key in keys.items() if key in cached}
+    # Hard links and repeated paths share a key: read each file once
+    todo: Dict[tuple, List[str]] = {}
+    for path, key in keys.items():
+        if key not in cached:
+            todo.setdefault(key, []).append(path)
+    
+    def compute(key: tuple) -> Tuple[tuple, Optional[str]]:
+        path = todo[key][0]
+        try:
+            return key, hash_file(path, algorithm, limit)
+        except OSError as e:
+            logger.warning(f"Cannot hash {path}: {e}")
+            return key, None
+    
+    computed: Dict[tuple, str] = {}
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='hash') as executor:
+            for key, digest in executor.map(compute, list(todo)):
+                if digest is not None:
+                    computed[key] = digest
+                    for path in todo[key]:
+                        digests[path] = digest
+    if cache is not None:
+        cache.put_many({key: digest for key, digest in computed.items() if len(key) == 4},
+                       algorithm, limit)
+    
+    logger.debug(f"Hashed {len(computed)} file(s), {len(cached)} from cache")
+    return digests